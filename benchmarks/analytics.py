@@ -0,0 +1,101 @@
+"""
+Benchmark de las consultas de analítica de defectos.
+
+Genera una flota sintética con `scripts.generate_fleet`, recalcula los
+agregados con `rollups.rebuild_rollups` y compara el tiempo de las consultas
+del tablero contra la misma consulta calculada recorriendo los reportes.
+
+Uso:
+    python -m benchmarks.analytics --reports 200000 --carriers 20 --trucks 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, apply_sqlite_pragmas  # noqa: E402
+from models import TruckInspectionItemsDB  # noqa: E402
+from rollups import ALL_TRUCKS, rebuild_rollups  # noqa: E402
+from scripts.generate_fleet import FleetProfile, generate_fleet  # noqa: E402
+
+DASHBOARD_QUERIES = {
+    "transportista, mensual, 12 meses": (
+        "SELECT d.period_start, d.unit, d.item_key, i.inspections, d.defects "
+        "FROM defect_rollups d JOIN inspection_rollups i USING (granularity, carrier, truck_number, period_start, unit) "
+        "WHERE d.granularity = 'month' AND d.carrier = :carrier AND d.truck_number = :all_trucks "
+        "AND d.period_start >= '2024-01-01' AND d.period_start < '2025-01-01'"
+    ),
+    "camión, diario, 90 días": (
+        "SELECT d.period_start, d.unit, d.item_key, i.inspections, d.defects "
+        "FROM defect_rollups d JOIN inspection_rollups i USING (granularity, carrier, truck_number, period_start, unit) "
+        "WHERE d.granularity = 'day' AND d.truck_number = :truck "
+        "AND d.period_start >= '2024-03-01' AND d.period_start < '2024-05-30'"
+    ),
+}
+
+# Lo mismo que la primera consulta, recorriendo los reportes
+SCAN_QUERY = (
+    "WITH items(bit, item_key) AS (VALUES {items}) "
+    "SELECT date(r.inspection_date, 'start of month'), items.item_key, COUNT(*), "
+    "SUM((ci.checks >> items.bit) & 1 = 0) "
+    "FROM inspection_reports r JOIN truck_inspection_items ci ON ci.report_id = r.id CROSS JOIN items "
+    "WHERE r.carrier = :carrier AND r.inspection_date >= '2024-01-01' AND r.inspection_date < '2025-01-01' "
+    "GROUP BY 1, 2"
+)
+
+
+def timed(connection, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        connection.execute(text(sql), params).all()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=200000)
+    parser.add_argument("--carriers", type=int, default=20)
+    parser.add_argument("--trucks", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'analytics.db')}")
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+        Base.metadata.create_all(bind=engine)
+
+        start = time.perf_counter()
+        generate_fleet(engine, args.reports, FleetProfile(carriers=args.carriers, trucks=args.trucks, days=args.days))
+        print(f"reportes={args.reports} generados en {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            rebuild_rollups(connection)
+        print(f"agregados recalculados en {time.perf_counter() - start:.1f}s")
+
+        params = {"carrier": "Carrier 3", "truck": "T-42", "all_trucks": ALL_TRUCKS}
+        with engine.connect() as connection:
+            for label, sql in DASHBOARD_QUERIES.items():
+                print(f"{label:35s} {timed(connection, sql, params, args.repeat):9.2f} ms (agregados)")
+            items = ", ".join(
+                f"({TruckInspectionItemsDB.ITEM_KEYS.index(key)}, '{key}')"
+                for key in TruckInspectionItemsDB.DEFECT_ITEM_KEYS
+            )
+            scan_ms = timed(connection, SCAN_QUERY.format(items=items), params, max(1, args.repeat // 10))
+            print(f"{'transportista, mensual, 12 meses':35s} {scan_ms:9.2f} ms (recorriendo reportes)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark de la carga masiva de reportes.
+
+Levanta la aplicación igual que `benchmarks.load_test` y envía `--reports`
+reportes sintéticos (dos trailers cada uno) en una sola solicitud NDJSON a
+`POST /bulk`. Como referencia, envía `--single` reportes uno por uno con el
+endpoint normal de creación. Reporta reportes por minuto de cada forma.
+
+Uso:
+    python -m benchmarks.bulk_ingest --reports 20000 --single 300
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks.load_test import API_PREFIX, REPO_DIR, seed, wait_until_ready
+
+USERNAME = "bench-driver"
+PASSWORD = "bench-password"
+
+
+def synthetic_report(i: int) -> dict:
+    # Importación local: `seed` debe fijar DATABASE_URL antes de que se cree el engine
+    from models import TRAILER_ITEM_KEYS, TRUCK_ITEM_KEYS
+
+    truck = random.randrange(500)
+    truck_items = {key: random.random() >= 0.03 for key in TRUCK_ITEM_KEYS}
+    if random.random() < 0.05:
+        truck_items["tires_photo"] = f"photo-{i}"
+    return {
+        "carrier": f"Carrier {truck % 20}",
+        "address": "Lat: 25.6866, Lng: -100.3161",
+        "inspection_date": (datetime(2024, 1, 1) + timedelta(minutes=random.randrange(365 * 24 * 60))).isoformat(),
+        "truck_number": f"T-{truck}",
+        "odometer_reading": 100000 + i,
+        "truck_inspection_items": truck_items,
+        "trailers": [
+            {
+                "trailer_number": f"TR-{truck}-{t}",
+                "inspection_items": {key: random.random() >= 0.05 for key in TRAILER_ITEM_KEYS},
+            }
+            for t in range(2)
+        ],
+        "remarks": None,
+    }
+
+
+def run(base_url: str, reports: int, single: int):
+    with httpx.Client(base_url=base_url, timeout=600) as client:
+        client.post("/users/", json={"username": USERNAME, "password": PASSWORD, "role": "user"}).raise_for_status()
+        response = client.post("/users/login", json={"username": USERNAME, "password": PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        start = time.perf_counter()
+        for i in range(single):
+            client.post(f"{API_PREFIX}/", json=synthetic_report(i), headers=headers).raise_for_status()
+        single_elapsed = time.perf_counter() - start
+
+        lines = [json.dumps(synthetic_report(i)).encode() + b"\n" for i in range(reports)]
+
+        def body():
+            # Se envía en fragmentos para que el servidor valide y guarde mientras llega el cuerpo
+            for first in range(0, len(lines), 100):
+                yield b"".join(lines[first:first + 100])
+
+        start = time.perf_counter()
+        response = client.post(f"{API_PREFIX}/bulk", content=body(),
+                               headers={**headers, "Content-Type": "application/x-ndjson"})
+        response.raise_for_status()
+        bulk_elapsed = time.perf_counter() - start
+        result = response.json()
+
+    return single_elapsed, bulk_elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--single", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=1000, help="BULK_BATCH_SIZE del servidor")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--app-dir", default=REPO_DIR, help="Directorio desde el que se levanta la aplicación")
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "bulk.db")
+        seed(f"sqlite:///{database_path}", 0)
+
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", PHOTO_STORAGE_DIR=os.path.join(tmp, "photos"),
+                   BULK_BATCH_SIZE=str(args.batch_size))
+        os.symlink(os.path.join(args.app_dir, "frontend"), os.path.join(tmp, "frontend"))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning",
+             "--app-dir", args.app_dir],
+            cwd=tmp,
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_ready(base_url, server)
+            single_elapsed, bulk_elapsed, result = run(base_url, args.reports, args.single)
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.single:
+        print(f"uno por uno: {args.single} reportes en {single_elapsed:.1f}s "
+              f"= {args.single / single_elapsed * 60:,.0f} reportes/min")
+    print(f"bulk NDJSON: {result['created']} creados, {result['failed']} fallidos en {bulk_elapsed:.1f}s "
+          f"= {result['created'] / bulk_elapsed * 60:,.0f} reportes/min")
+
+
+if __name__ == "__main__":
+    main()
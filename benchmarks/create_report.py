@@ -0,0 +1,109 @@
+"""
+Benchmark de ingesta de reportes de inspección.
+
+Compara el patrón anterior (commit + refresh por cada fila) contra una unidad de
+trabajo única armada por relaciones ORM, sobre una base SQLite en disco para que
+el costo de cada fsync quede incluido. `create_vehicle_inspection_report` ya no
+arma el grafo ORM: inserta tabla por tabla con `ingest.insert_reports`, igual
+que la carga masiva, así que además envía un número fijo de sentencias.
+
+Uso:
+    python -m benchmarks.create_report --reports 500 --trailers 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base  # noqa: E402
+from models import InspectionReportDB, TruckInspectionItemsDB, TrailerDB, TrailerInspectionItemsDB  # noqa: E402
+
+
+def _new_report():
+    return InspectionReportDB(
+        carrier="DFC - Duran Freight Corp",
+        address="Lat: 25.6866, Lng: -100.3161",
+        inspection_date=datetime.now(),
+        truck_number="T-100",
+        odometer_reading=120000,
+        remarks=None,
+    )
+
+
+def create_per_row_commits(db, trailers):
+    """Patrón anterior: commit y refresh después de cada fila."""
+    db_report = _new_report()
+    db.add(db_report)
+    db.commit()
+    db.refresh(db_report)
+
+    db_truck_items = TruckInspectionItemsDB(report_id=db_report.id, brake_service=True)
+    db.add(db_truck_items)
+    db.commit()
+    db.refresh(db_truck_items)
+
+    for i in range(trailers):
+        db_trailer = TrailerDB(report_id=db_report.id, trailer_number=f"TR-{i}")
+        db.add(db_trailer)
+        db.commit()
+        db.refresh(db_trailer)
+        db.add(TrailerInspectionItemsDB(trailer_id=db_trailer.id, doors=True))
+
+    db.commit()
+
+
+def create_unit_of_work(db, trailers):
+    """Un solo commit, con el grafo armado por relaciones."""
+    db_report = _new_report()
+    db_report.truck_inspection_items = TruckInspectionItemsDB(brake_service=True)
+    for i in range(trailers):
+        db_report.trailers.append(
+            TrailerDB(
+                trailer_number=f"TR-{i}",
+                inspection_items=TrailerInspectionItemsDB(doors=True),
+            )
+        )
+    db.add(db_report)
+    db.commit()
+
+
+def run(create, reports, trailers):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        start = time.perf_counter()
+        for _ in range(reports):
+            with session_factory() as db:
+                create(db, trailers)
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+
+    return reports / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=300)
+    parser.add_argument("--trailers", type=int, default=2)
+    args = parser.parse_args()
+
+    before = run(create_per_row_commits, args.reports, args.trailers)
+    after = run(create_unit_of_work, args.reports, args.trailers)
+
+    print(f"reportes={args.reports} trailers/reporte={args.trailers}")
+    print(f"commit por fila:     {before:8.1f} reportes/s")
+    print(f"unidad de trabajo:   {after:8.1f} reportes/s")
+    print(f"mejora:              {after / before:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Prueba de carga de los endpoints de lectura de reportes.
+
+Crea una base SQLite temporal con reportes de ejemplo, levanta la aplicación con
+uvicorn (un solo worker) y lanza solicitudes concurrentes al detalle y al
+listado de reportes durante un tiempo fijo. Reporta solicitudes por segundo.
+
+Uso:
+    python -m benchmarks.load_test --reports 2000 --concurrency 64 --duration 15
+
+Requiere `httpx` y `uvicorn`.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+API_PREFIX = "/vehicle_inspection_reports/vehicle-inspection-reports"
+ADMIN_USERNAME = "bench-admin"
+ADMIN_PASSWORD = "bench-password"
+
+
+def seed(database_url: str, reports: int):
+    """
+    Crea el esquema, un usuario admin y `reports` reportes sintéticos con `scripts.generate_fleet`.
+    """
+    os.environ["DATABASE_URL"] = database_url
+    from sqlalchemy import insert
+
+    from config import pwd_context
+    from database import Base, engine
+    from models import Role, User
+    from scripts.generate_fleet import FleetProfile, generate_fleet
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            dict(username=ADMIN_USERNAME, hashed_password=pwd_context.hash(ADMIN_PASSWORD), role=Role.ADMIN),
+        ])
+    generate_fleet(engine, reports, FleetProfile(carriers=4, trucks=500, trailer_weights=(0, 0, 1)))
+    engine.dispose()
+
+
+async def run_load(base_url: str, reports: int, concurrency: int, duration: float):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        response = await client.post("/users/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        completed = 0
+        errors = 0
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal completed, errors
+            while time.perf_counter() < deadline:
+                try:
+                    if random.random() < 0.8:
+                        response = await client.get(f"{API_PREFIX}/{random.randint(1, reports)}", headers=headers)
+                    else:
+                        response = await client.get(f"{API_PREFIX}/", params={"limit": 20}, headers=headers)
+                except httpx.TransportError:
+                    errors += 1
+                    continue
+                if response.status_code == 200:
+                    completed += 1
+                else:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return completed / elapsed, errors
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen):
+    for _ in range(100):
+        if server.poll() is not None:
+            raise RuntimeError("El servidor terminó antes de arrancar")
+        try:
+            httpx.get(f"{base_url}/docs", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("El servidor no respondió")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--app-dir", default=REPO_DIR, help="Directorio desde el que se levanta la aplicación")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "load.db")
+        seed(f"sqlite:///{database_path}", args.reports)
+        # Versiones anteriores del proyecto leen siempre ./database.db
+        os.symlink(database_path, os.path.join(tmp, "database.db"))
+
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", PHOTO_STORAGE_DIR=os.path.join(tmp, "photos"))
+        os.symlink(os.path.join(args.app_dir, "frontend"), os.path.join(tmp, "frontend"))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning",
+             "--app-dir", args.app_dir],
+            cwd=tmp,
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_ready(base_url, server)
+            throughput, errors = asyncio.run(run_load(base_url, args.reports, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"reportes={args.reports} concurrencia={args.concurrency} duración={args.duration}s")
+    print(f"{throughput:8.1f} solicitudes/s  errores={errors}")
+
+
+if __name__ == "__main__":
+    main()
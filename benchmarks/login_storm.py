@@ -0,0 +1,96 @@
+"""
+Latencia de lectura de reportes durante una ráfaga de logins.
+
+Levanta la aplicación igual que `benchmarks.load_test`, lanza `--logins`
+solicitudes de login simultáneas (como un cambio de turno) y, al mismo tiempo,
+un cliente que lee reportes uno tras otro. Reporta la latencia de las lecturas
+y cuánto tardó la ráfaga en completarse.
+
+Uso:
+    python -m benchmarks.login_storm --logins 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.load_test import ADMIN_PASSWORD, ADMIN_USERNAME, API_PREFIX, REPO_DIR, seed, wait_until_ready
+
+
+async def run_storm(base_url: str, reports: int, logins: int):
+    limits = httpx.Limits(max_connections=logins + 1, max_keepalive_connections=logins + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        credentials = {"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD}
+        response = await client.post("/users/login", json=credentials)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        storm_done = asyncio.Event()
+        latencies = []
+        statuses = {}
+
+        async def login():
+            response = await client.post("/users/login", json=credentials)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def reader():
+            while not storm_done.is_set():
+                start = time.perf_counter()
+                response = await client.get(f"{API_PREFIX}/{random.randint(1, reports)}", headers=headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        reader_task = asyncio.create_task(reader())
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        storm_elapsed = time.perf_counter() - start
+        storm_done.set()
+        await reader_task
+
+    return latencies, storm_elapsed, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=500)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--app-dir", default=REPO_DIR, help="Directorio desde el que se levanta la aplicación")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "storm.db")
+        seed(f"sqlite:///{database_path}", args.reports)
+
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", PHOTO_STORAGE_DIR=os.path.join(tmp, "photos"))
+        os.symlink(os.path.join(args.app_dir, "frontend"), os.path.join(tmp, "frontend"))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning",
+             "--app-dir", args.app_dir],
+            cwd=tmp,
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_ready(base_url, server)
+            latencies, storm_elapsed, statuses = asyncio.run(run_storm(base_url, args.reports, args.logins))
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+    print(f"logins={args.logins} ráfaga={storm_elapsed:.1f}s respuestas={statuses}")
+    print(f"lecturas={len(latencies)}  mediana={statistics.median(latencies) * 1000:.1f}ms  "
+          f"p95={p95 * 1000:.1f}ms  máx={latencies[-1] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Micro-benchmark de la conversión de reportes ORM a JSON de la API.
+
+Construye en memoria `--reports` reportes (dos trailers cada uno, algunas fotos)
+con `mappers.new_report` y mide cuánto tarda serializarlos todos, como lo hacen
+el listado, la exportación y el detalle: `mappers.to_report_read` seguido de
+`model_dump_json`. Como referencia mide la conversión anterior, que copiaba cada
+campo a mano, y la validación genérica de Pydantic con `from_attributes=True`;
+las dos leen cada item a través de sus propiedades.
+
+Uso:
+    python -m benchmarks.report_mapping --reports 10000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mappers import new_report, to_report_read  # noqa: E402
+from models import TRAILER_ITEM_KEYS, TRUCK_ITEM_KEYS  # noqa: E402
+from schemas import (  # noqa: E402
+    Trailer,
+    TrailerInspectionItems,
+    TruckInspectionItems,
+    VehicleInspectionReport,
+    VehicleInspectionReportRead,
+)
+
+
+def _items(item_keys, defect_rate: float) -> dict:
+    items = {key: random.random() >= defect_rate for key in item_keys}
+    for key in item_keys:
+        if random.random() < 0.05:
+            items[f"{key}_photo"] = f"photo-{random.randrange(10 ** 6)}"
+    return items
+
+
+def build_reports(count: int):
+    reports = []
+    for i in range(count):
+        data = VehicleInspectionReport.model_validate({
+            "carrier": f"Carrier {i % 20}",
+            "address": "Lat: 25.6866, Lng: -100.3161",
+            "inspection_date": datetime(2024, 1, 1) + timedelta(minutes=7 * i),
+            "truck_number": f"T-{i % 500}",
+            "odometer_reading": 100000 + i,
+            "truck_inspection_items": _items(TRUCK_ITEM_KEYS, 0.03),
+            "trailers": [
+                {"trailer_number": f"TR-{i % 800}-{t}", "inspection_items": _items(TRAILER_ITEM_KEYS, 0.05)}
+                for t in range(2)
+            ],
+        })
+        report = new_report(data)
+        report.id = i + 1
+        reports.append(report)
+    return reports
+
+
+def hand_written_report_read(report) -> VehicleInspectionReportRead:
+    """
+    La conversión anterior a `mappers.py`: copia cada campo a mano, leyendo cada
+    item a través de su propiedad. Se conserva solo como referencia.
+    """
+    db_truck_items = report.truck_inspection_items
+    truck_inspection = TruckInspectionItems()
+    if db_truck_items:
+        truck_inspection = TruckInspectionItems(
+            air_compressor=db_truck_items.air_compressor,
+            air_compressor_photo=db_truck_items.air_compressor_photo,
+            air_lines=db_truck_items.air_lines,
+            air_lines_photo=db_truck_items.air_lines_photo,
+            battery=db_truck_items.battery,
+            battery_photo=db_truck_items.battery_photo,
+            belts_and_hoses=db_truck_items.belts_and_hoses,
+            belts_and_hoses_photo=db_truck_items.belts_and_hoses_photo,
+            body=db_truck_items.body,
+            body_photo=db_truck_items.body_photo,
+            brake_accessories=db_truck_items.brake_accessories,
+            brake_accessories_photo=db_truck_items.brake_accessories_photo,
+            brake_parking=db_truck_items.brake_parking,
+            brake_parking_photo=db_truck_items.brake_parking_photo,
+            brake_service=db_truck_items.brake_service,
+            brake_service_photo=db_truck_items.brake_service_photo,
+            clutch=db_truck_items.clutch,
+            clutch_photo=db_truck_items.clutch_photo,
+            coupling_devices=db_truck_items.coupling_devices,
+            coupling_devices_photo=db_truck_items.coupling_devices_photo,
+            defroster_heater=db_truck_items.defroster_heater,
+            defroster_heater_photo=db_truck_items.defroster_heater_photo,
+            drive_line=db_truck_items.drive_line,
+            drive_line_photo=db_truck_items.drive_line_photo,
+            engine=db_truck_items.engine,
+            engine_photo=db_truck_items.engine_photo,
+            exhaust=db_truck_items.exhaust,
+            exhaust_photo=db_truck_items.exhaust_photo,
+            fifth_wheel=db_truck_items.fifth_wheel,
+            fifth_wheel_photo=db_truck_items.fifth_wheel_photo,
+            fluid_levels=db_truck_items.fluid_levels,
+            fluid_levels_photo=db_truck_items.fluid_levels_photo,
+            frame_and_assembly=db_truck_items.frame_and_assembly,
+            frame_and_assembly_photo=db_truck_items.frame_and_assembly_photo,
+            front_axle=db_truck_items.front_axle,
+            front_axle_photo=db_truck_items.front_axle_photo,
+            fuel_tanks=db_truck_items.fuel_tanks,
+            fuel_tanks_photo=db_truck_items.fuel_tanks_photo,
+            horn=db_truck_items.horn,
+            horn_photo=db_truck_items.horn_photo,
+            lights_head_stop=db_truck_items.lights_head_stop,
+            lights_head_stop_photo=db_truck_items.lights_head_stop_photo,
+            lights_tail_dash=db_truck_items.lights_tail_dash,
+            lights_tail_dash_photo=db_truck_items.lights_tail_dash_photo,
+            lights_turn_indicators=db_truck_items.lights_turn_indicators,
+            lights_turn_indicators_photo=db_truck_items.lights_turn_indicators_photo,
+            lights_clearance_marker=db_truck_items.lights_clearance_marker,
+            lights_clearance_marker_photo=db_truck_items.lights_clearance_marker_photo,
+            mirrors=db_truck_items.mirrors,
+            mirrors_photo=db_truck_items.mirrors_photo,
+            muffler=db_truck_items.muffler,
+            muffler_photo=db_truck_items.muffler_photo,
+            oil_pressure=db_truck_items.oil_pressure,
+            oil_pressure_photo=db_truck_items.oil_pressure_photo,
+            radiator=db_truck_items.radiator,
+            radiator_photo=db_truck_items.radiator_photo,
+            rear_end=db_truck_items.rear_end,
+            rear_end_photo=db_truck_items.rear_end_photo,
+            reflectors=db_truck_items.reflectors,
+            reflectors_photo=db_truck_items.reflectors_photo,
+            safety_fire_extinguisher=db_truck_items.safety_fire_extinguisher,
+            safety_fire_extinguisher_photo=db_truck_items.safety_fire_extinguisher_photo,
+            safety_flags_flares_fusees=db_truck_items.safety_flags_flares_fusees,
+            safety_flags_flares_fusees_photo=db_truck_items.safety_flags_flares_fusees_photo,
+            safety_reflective_triangles=db_truck_items.safety_reflective_triangles,
+            safety_reflective_triangles_photo=db_truck_items.safety_reflective_triangles_photo,
+            safety_spare_bulbs_and_fuses=db_truck_items.safety_spare_bulbs_and_fuses,
+            safety_spare_bulbs_and_fuses_photo=db_truck_items.safety_spare_bulbs_and_fuses_photo,
+            safety_spare_seal_beam=db_truck_items.safety_spare_seal_beam,
+            safety_spare_seal_beam_photo=db_truck_items.safety_spare_seal_beam_photo,
+            starter=db_truck_items.starter,
+            starter_photo=db_truck_items.starter_photo,
+            steering=db_truck_items.steering,
+            steering_photo=db_truck_items.steering_photo,
+            suspension_system=db_truck_items.suspension_system,
+            suspension_system_photo=db_truck_items.suspension_system_photo,
+            tire_chains=db_truck_items.tire_chains,
+            tire_chains_photo=db_truck_items.tire_chains_photo,
+            tires=db_truck_items.tires,
+            tires_photo=db_truck_items.tires_photo,
+            transmission=db_truck_items.transmission,
+            transmission_photo=db_truck_items.transmission_photo,
+            trip_recorder=db_truck_items.trip_recorder,
+            trip_recorder_photo=db_truck_items.trip_recorder_photo,
+            wheels_and_rims=db_truck_items.wheels_and_rims,
+            wheels_and_rims_photo=db_truck_items.wheels_and_rims_photo,
+            windows=db_truck_items.windows,
+            windows_photo=db_truck_items.windows_photo,
+            windshield_wipers=db_truck_items.windshield_wipers,
+            windshield_wipers_photo=db_truck_items.windshield_wipers_photo,
+            other=db_truck_items.other,
+            other_description=db_truck_items.other_description,
+            other_photo=db_truck_items.other_photo
+        )
+
+    trailer_list = []
+    for db_trailer in report.trailers:
+        db_trailer_items = db_trailer.inspection_items
+        trailer_items = TrailerInspectionItems()
+        if db_trailer_items:
+            trailer_items = TrailerInspectionItems(
+                brake_connections=db_trailer_items.brake_connections,
+                brake_connections_photo=db_trailer_items.brake_connections_photo,
+                brakes=db_trailer_items.brakes,
+                brakes_photo=db_trailer_items.brakes_photo,
+                coupling_devices=db_trailer_items.coupling_devices,
+                coupling_devices_photo=db_trailer_items.coupling_devices_photo,
+                coupling_king_pin=db_trailer_items.coupling_king_pin,
+                coupling_king_pin_photo=db_trailer_items.coupling_king_pin_photo,
+                doors=db_trailer_items.doors,
+                doors_photo=db_trailer_items.doors_photo,
+                hitch=db_trailer_items.hitch,
+                hitch_photo=db_trailer_items.hitch_photo,
+                landing_gear=db_trailer_items.landing_gear,
+                landing_gear_photo=db_trailer_items.landing_gear_photo,
+                lights_all=db_trailer_items.lights_all,
+                lights_all_photo=db_trailer_items.lights_all_photo,
+                reflectors_reflective_tape=db_trailer_items.reflectors_reflective_tape,
+                reflectors_reflective_tape_photo=db_trailer_items.reflectors_reflective_tape_photo,
+                roof=db_trailer_items.roof,
+                roof_photo=db_trailer_items.roof_photo,
+                suspension_system=db_trailer_items.suspension_system,
+                suspension_system_photo=db_trailer_items.suspension_system_photo,
+                tarpaulin=db_trailer_items.tarpaulin,
+                tarpaulin_photo=db_trailer_items.tarpaulin_photo,
+                tires=db_trailer_items.tires,
+                tires_photo=db_trailer_items.tires_photo,
+                wheels_and_rims=db_trailer_items.wheels_and_rims,
+                wheels_and_rims_photo=db_trailer_items.wheels_and_rims_photo,
+                other=db_trailer_items.other,
+                other_description=db_trailer_items.other_description,
+                other_photo=db_trailer_items.other_photo
+            )
+
+        trailer_list.append(
+            Trailer(
+                trailer_number=db_trailer.trailer_number,
+                inspection_items=trailer_items,
+            )
+        )
+
+    return VehicleInspectionReportRead(
+        id=report.id,
+        carrier=report.carrier,
+        address=report.address,
+        inspection_date=report.inspection_date,
+        truck_number=report.truck_number,
+        odometer_reading=report.odometer_reading,
+        truck_inspection_items=truck_inspection,
+        trailers=trailer_list,
+        remarks=report.remarks
+    )
+
+
+
+def timed(serialize, reports, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for report in reports:
+            serialize(report)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    reports = build_reports(args.reports)
+
+    modes = {
+        "copias a mano (antes)": lambda report: hand_written_report_read(report).model_dump_json(),
+        "mappers.to_report_read": lambda report: to_report_read(report).model_dump_json(),
+        "from_attributes": lambda report: VehicleInspectionReportRead.model_validate(
+            report, from_attributes=True).model_dump_json(),
+    }
+    for label, serialize in modes.items():
+        elapsed = timed(serialize, reports, args.repeat)
+        print(f"{label:25s} {elapsed * 1000:8.0f} ms  ({elapsed / args.reports * 1e6:.1f} µs/reporte)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark de lectura/escritura concurrente sobre SQLite.
+
+Compara la configuración por defecto de SQLite (journal de rollback, sin
+pragmas) contra los pragmas de `database.SQLITE_PRAGMAS` (WAL, synchronous
+NORMAL, busy_timeout, etc.). Varios hilos leen reportes completos mientras
+otros insertan reportes nuevos; se cuentan operaciones por segundo y errores
+"database is locked".
+
+Uso:
+    python -m benchmarks.sqlite_concurrency --readers 8 --writers 2 --duration 10
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import selectinload, sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, apply_sqlite_pragmas  # noqa: E402
+from models import InspectionReportDB, TruckInspectionItemsDB, TrailerDB, TrailerInspectionItemsDB  # noqa: E402
+
+
+def _new_report(i):
+    report = InspectionReportDB(
+        carrier=f"Carrier {i % 4}",
+        address="Lat: 25.6866, Lng: -100.3161",
+        inspection_date=datetime.now(),
+        truck_number=f"T-{i % 500}",
+        odometer_reading=100000 + i,
+        truck_inspection_items=TruckInspectionItemsDB(brake_service=True),
+    )
+    report.trailers.append(TrailerDB(trailer_number=f"TR-{i % 800}", inspection_items=TrailerInspectionItemsDB()))
+    return report
+
+
+def run(tuned, seed_reports, readers, writers, duration):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            connect_args={"check_same_thread": False},
+            pool_size=readers + writers,
+        )
+        if tuned:
+            event.listen(engine, "connect", apply_sqlite_pragmas)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autoflush=False, bind=engine)
+
+        with session_factory() as db:
+            db.add_all(_new_report(i) for i in range(seed_reports))
+            db.commit()
+
+        counts = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def reader():
+            while time.perf_counter() < deadline:
+                try:
+                    with session_factory() as db:
+                        db.scalar(
+                            select(InspectionReportDB)
+                            .options(
+                                selectinload(InspectionReportDB.truck_inspection_items),
+                                selectinload(InspectionReportDB.trailers).selectinload(TrailerDB.inspection_items),
+                            )
+                            .where(InspectionReportDB.id == random.randint(1, seed_reports))
+                        )
+                    key = "reads"
+                except OperationalError:
+                    key = "locked"
+                with lock:
+                    counts[key] += 1
+
+        def writer():
+            i = seed_reports
+            while time.perf_counter() < deadline:
+                try:
+                    with session_factory() as db:
+                        db.add(_new_report(i))
+                        db.commit()
+                    key = "writes"
+                except OperationalError:
+                    key = "locked"
+                i += 1
+                with lock:
+                    counts[key] += 1
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+
+    return counts["reads"] / elapsed, counts["writes"] / elapsed, counts["locked"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"reportes={args.reports} lectores={args.readers} escritores={args.writers} duración={args.duration}s")
+    for label, tuned in (("por defecto", False), ("pragmas", True)):
+        reads, writes, locked = run(tuned, args.reports, args.readers, args.writers, args.duration)
+        print(f"{label:12s} lecturas/s={reads:8.1f}  escrituras/s={writes:7.1f}  bloqueos={locked}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Suite de latencia de los endpoints principales.
+
+Genera una base SQLite del tamaño indicado (flota sintética con trailers,
+agregados y estado de unidades incluidos), levanta la aplicación con uvicorn y
+lanza una carga mixta y concurrente sobre:
+
+    create  POST /vehicle-inspection-reports/          (rol user)
+    list    GET  /vehicle-inspection-reports/          (rol admin, con y sin filtro)
+    detail  GET  /vehicle-inspection-reports/{id}      (rol admin)
+    login   POST /users/login
+    auth    GET  /users/me  (solo `get_current_user`)
+
+Por endpoint reporta p50/p95/p99, máximo, rendimiento y errores, y guarda el
+resultado en JSON para comparar dos corridas con `--compare`.
+
+Uso:
+    python -m benchmarks.suite --reports 100000 --output antes.json
+    python -m benchmarks.suite --reports 100000 --output despues.json --compare antes.json
+
+Con `--database` la base generada se conserva y se reutiliza en la siguiente
+corrida (generar 1M de reportes tarda varios minutos).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+from benchmarks.load_test import ADMIN_PASSWORD, ADMIN_USERNAME, API_PREFIX, REPO_DIR, wait_until_ready
+
+DRIVER_PASSWORD = "bench-password"
+DEFAULT_MIX = "create=10,list=20,detail=50,login=5,auth=15"
+
+
+def seed_database(database_path: str, reports: int, drivers: int):
+    """
+    Crea el esquema, los usuarios y `reports` reportes con `scripts.generate_fleet`.
+    """
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    from sqlalchemy import insert
+
+    from config import pwd_context
+    from database import Base, engine
+    from models import Role, User
+    from rollups import rebuild_rollups
+    from scripts.generate_fleet import FleetProfile, generate_fleet
+    from unit_status import rebuild_status
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        driver_hash = pwd_context.hash(DRIVER_PASSWORD)
+        connection.execute(insert(User), [
+            dict(username=ADMIN_USERNAME, hashed_password=pwd_context.hash(ADMIN_PASSWORD), role=Role.ADMIN),
+            *(dict(username=f"driver-{i}", hashed_password=driver_hash, role=Role.USER) for i in range(drivers)),
+        ])
+    generate_fleet(engine, reports, FleetProfile(trucks=max(1, reports // 100)))
+    with engine.begin() as connection:
+        rebuild_rollups(connection)
+        rebuild_status(connection)
+    engine.dispose()
+
+
+def synthetic_report() -> dict:
+    from models import TRAILER_ITEM_KEYS, TRUCK_ITEM_KEYS
+
+    truck = random.randrange(1000)
+    return {
+        "carrier": f"Carrier {truck % 20}",
+        "address": "Lat: 25.6866, Lng: -100.3161",
+        "inspection_date": datetime.now().isoformat(),
+        "truck_number": f"T-{truck}",
+        "odometer_reading": random.randrange(100000, 900000),
+        "truck_inspection_items": {key: random.random() >= 0.03 for key in TRUCK_ITEM_KEYS},
+        "trailers": [
+            {
+                "trailer_number": f"TR-{truck}-{t}",
+                "inspection_items": {key: random.random() >= 0.05 for key in TRAILER_ITEM_KEYS},
+            }
+            for t in range(2)
+        ],
+    }
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+
+    def record(self, endpoint: str, latency: float, status_code):
+        self.latencies.setdefault(endpoint, []).append(latency)
+        statuses = self.statuses.setdefault(endpoint, {})
+        statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    """
+    Percentil por rango más cercano de una lista ya ordenada.
+    """
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def run_mix(base_url: str, reports: int, drivers: int, weights: dict, concurrency: int,
+                  duration: float, warmup: float) -> Recorder:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def token(username: str, password: str) -> dict:
+            response = await client.post("/users/login", json={"username": username, "password": password})
+            response.raise_for_status()
+            return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        admin = await token(ADMIN_USERNAME, ADMIN_PASSWORD)
+        driver_headers = [await token(f"driver-{i}", DRIVER_PASSWORD) for i in range(drivers)]
+
+        def create():
+            return client.post(f"{API_PREFIX}/", json=synthetic_report(), headers=random.choice(driver_headers))
+
+        def list_reports():
+            params = {"limit": 20}
+            if random.random() < 0.5:
+                params["truck_number"] = f"T-{random.randrange(max(1, reports // 100))}"
+            return client.get(f"{API_PREFIX}/", params=params, headers=admin)
+
+        def detail():
+            return client.get(f"{API_PREFIX}/{random.randint(1, max(1, reports))}", headers=admin)
+
+        def login():
+            credentials = {"username": f"driver-{random.randrange(drivers)}", "password": DRIVER_PASSWORD}
+            return client.post("/users/login", json=credentials)
+
+        def auth():
+            return client.get("/users/me", headers=admin)
+
+        operations = {"create": create, "list": list_reports, "detail": detail, "login": login, "auth": auth}
+        unknown = set(weights) - set(operations)
+        if unknown:
+            raise SystemExit(f"Endpoints desconocidos en --mix: {', '.join(sorted(unknown))}")
+        names = list(weights)
+        cumulative = [weights[name] for name in names]
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        measure_from = start + warmup
+        deadline = measure_from + duration
+
+        async def worker():
+            while True:
+                begin = time.perf_counter()
+                if begin >= deadline:
+                    return
+                name = random.choices(names, weights=cumulative)[0]
+                try:
+                    response = await operations[name]()
+                    status_code = response.status_code
+                except httpx.TransportError as error:
+                    status_code = type(error).__name__
+                if begin >= measure_from:
+                    recorder.record(name, time.perf_counter() - begin, status_code)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder
+
+
+def summarize(recorder: Recorder, duration: float) -> dict:
+    endpoints = {}
+    for name in sorted(recorder.latencies):
+        ordered = sorted(recorder.latencies[name])
+        statuses = recorder.statuses[name]
+        ok = sum(count for status_code, count in statuses.items() if status_code.isdigit() and int(status_code) < 400)
+        endpoints[name] = {
+            "requests": len(ordered),
+            "errors": len(ordered) - ok,
+            "statuses": statuses,
+            "throughput_rps": round(ok / duration, 2),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+        }
+    return endpoints
+
+
+def git_revision(app_dir: str):
+    try:
+        return subprocess.run(["git", "-C", app_dir, "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(endpoints: dict, baseline: dict = None):
+    columns = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+    print(f"{'endpoint':8s} {'solicitudes':>11s} {'errores':>8s} " + " ".join(f"{c:>18s}" for c in columns))
+    for name, stats in endpoints.items():
+        cells = []
+        for column in columns:
+            cell = f"{stats[column]:.1f}"
+            previous = (baseline or {}).get(name, {}).get(column)
+            if previous:
+                cell += f" ({(stats[column] - previous) / previous * 100:+.0f}%)"
+            cells.append(f"{cell:>18s}")
+        print(f"{name:8s} {stats['requests']:11d} {stats['errors']:8d} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=10000)
+    parser.add_argument("--drivers", type=int, default=20, help="Usuarios con rol user")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Segundos medidos")
+    parser.add_argument("--warmup", type=float, default=3, help="Segundos iniciales sin medir")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Peso de cada endpoint en la carga")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", help="Base a conservar y reutilizar entre corridas")
+    parser.add_argument("--output", default="suite_results.json")
+    parser.add_argument("--compare", help="Resultado JSON de una corrida anterior")
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--app-dir", default=REPO_DIR, help="Directorio desde el que se levanta la aplicación")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    weights = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.abspath(args.database) if args.database else os.path.join(tmp, "suite.db")
+        if os.path.exists(database_path):
+            print(f"reutilizando {database_path}")
+        else:
+            start = time.perf_counter()
+            seed_database(database_path, args.reports, args.drivers)
+            print(f"reportes={args.reports} generados en {time.perf_counter() - start:.1f}s")
+
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", PHOTO_STORAGE_DIR=os.path.join(tmp, "photos"))
+        os.symlink(os.path.join(args.app_dir, "frontend"), os.path.join(tmp, "frontend"))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning",
+             "--app-dir", args.app_dir],
+            cwd=tmp,
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_ready(base_url, server)
+            recorder = asyncio.run(run_mix(base_url, args.reports, args.drivers, weights, args.concurrency,
+                                           args.duration, args.warmup))
+        finally:
+            server.terminate()
+            server.wait()
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(args.app_dir),
+            "reports": args.reports,
+            "drivers": args.drivers,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "mix": weights,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "cpus": os.cpu_count(),
+        },
+        "endpoints": summarize(recorder, args.duration),
+    }
+    with open(args.output, "w") as output:
+        json.dump(result, output, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as previous:
+            baseline = json.load(previous)["endpoints"]
+    print(f"reportes={args.reports} concurrencia={args.concurrency} duración={args.duration}s "
+          f"revisión={result['meta']['revision']}")
+    print_table(result["endpoints"], baseline)
+    print(f"resultado guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark del pipeline de miniaturas.
+
+Genera fotos JPEG sintéticas del tamaño de una cámara de teléfono y mide
+cuántas procesa `render_derivatives` por segundo y por núcleo, con 1..N
+procesos.
+
+Uso:
+    python -m benchmarks.thumbnails --photos 40 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _make_photos(count, width, height):
+    from PIL import Image, ImageFilter
+    import storage
+
+    refs = []
+    for i in range(count):
+        image = Image.effect_noise((width // 4, height // 4), 40 + i).convert("RGB")
+        image = image.resize((width, height)).filter(ImageFilter.GaussianBlur(2))
+        path = os.path.join(storage.PHOTO_STORAGE_DIR, f"source-{i}.jpg")
+        image.save(path, "JPEG", quality=90)
+        with open(path, "rb") as source:
+            refs.append(storage.save_photo(source))
+        os.remove(path)
+    return refs
+
+
+def _warm_up(_):
+    import thumbnails  # noqa: F401
+    return os.getpid()
+
+
+def _render(photo_ref):
+    import thumbnails
+    return thumbnails.render_derivatives(photo_ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        # Debe definirse antes de importar `storage`; los procesos del pool lo heredan
+        os.environ["PHOTO_STORAGE_DIR"] = storage_dir
+        refs = _make_photos(args.photos, args.width, args.height)
+
+        print(f"fotos={args.photos} tamaño={args.width}x{args.height}")
+        for workers in range(1, args.workers + 1):
+            with ProcessPoolExecutor(workers) as pool:
+                # Arranca los procesos antes de medir
+                list(pool.map(_warm_up, range(workers)))
+                start = time.perf_counter()
+                list(pool.map(_render, refs))
+                elapsed = time.perf_counter() - start
+            rate = args.photos / elapsed
+            print(f"procesos={workers:2d}  {rate:7.2f} fotos/s  {rate / workers:7.2f} fotos/s/núcleo")
+
+
+if __name__ == "__main__":
+    main()
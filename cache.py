@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Caché en memoria con expiración por tiempo y desalojo LRU.
+
+    Guarda como máximo `maxsize` entradas; al llenarse se descarta la usada hace
+    más tiempo. Cada entrada vence `ttl` segundos después de guardarse. La caché
+    es local al proceso: con varios workers, cada uno tiene la suya, y el TTL
+    acota cuánto tiempo puede servir un valor que otro proceso ya invalidó.
+
+    `generation` cambia con cada invalidación. Quien lee un valor de la base de
+    datos para guardarlo toma la generación antes de leer y la pasa a `set`: si
+    entretanto se invalidó la caché, el valor leído puede ser anterior a esa
+    escritura y no se guarda.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Compara `If-None-Match` con el ETag (comparación débil, como indica RFC 9110).
+    """
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
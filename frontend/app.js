@@ -18,6 +18,8 @@ createApp({
             selectedCarrier: '',
             address: '',
             inspectionDate: null,
+            // Se reutiliza en los reintentos del mismo reporte para que el servidor no lo duplique
+            submissionKey: null,
             truckNumber: '',
             odometer: 0,
             truckItems: [
@@ -149,29 +151,43 @@ createApp({
                 alert('La geolocalización no está soportada en este navegador.');
             }
         },
+        async uploadPhoto(file) {
+            const token = localStorage.getItem('accessToken');
+            const formData = new FormData();
+            formData.append('photo', file);
+
+            const response = await fetch('/photos/', {
+                method: 'POST',
+                headers: {
+                    'Authorization': `Bearer ${token}`
+                },
+                body: formData
+            });
+
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.detail || response.statusText);
+            }
+
+            const data = await response.json();
+            return data.photo_ref;
+        },
         takePhoto(index) {
             const fileInput = document.createElement('input');
             fileInput.type = 'file';
             fileInput.accept = 'image/*';
             fileInput.capture = 'environment';
 
-            fileInput.onchange = (event) => {
+            fileInput.onchange = async (event) => {
                 const file = event.target.files[0];
                 if (file) {
-                    // Guardar localmente
-                    this.truckItems[index].photo = URL.createObjectURL(file);
-
-                    /* TODO Subir a servidor
-                    const formData = new FormData();
-                    formData.append('photo', file);
-                    fetch('/upload-endpoint', {
-                        method: 'POST',
-                        body: formData
-                    })
-                    .then(
-                        TODO
-                     );
-                    * */
+                    try {
+                        this.truckItems[index].photo = await this.uploadPhoto(file);
+                        this.truckItems[index].preview = URL.createObjectURL(file);
+                    } catch (error) {
+                        console.error('Error al subir la foto:', error);
+                        alert('No se pudo subir la foto.');
+                    }
                 }
             };
 
@@ -197,10 +213,16 @@ createApp({
             fileInput.accept = 'image/*';
             fileInput.capture = 'environment';
 
-            fileInput.onchange = (event) => {
+            fileInput.onchange = async (event) => {
                 const file = event.target.files[0];
                 if (file) {
-                    this.trailers[trailerIndex].items[itemIndex].photo = URL.createObjectURL(file);
+                    try {
+                        this.trailers[trailerIndex].items[itemIndex].photo = await this.uploadPhoto(file);
+                        this.trailers[trailerIndex].items[itemIndex].preview = URL.createObjectURL(file);
+                    } catch (error) {
+                        console.error('Error al subir la foto:', error);
+                        alert('No se pudo subir la foto.');
+                    }
                 }
             };
             fileInput.click();
@@ -216,12 +238,18 @@ createApp({
                 const truckInspectionItems = {};
                 this.truckItems.forEach(item => {
                     truckInspectionItems[item.key] = item.value;
+                    if (item.photo) {
+                        truckInspectionItems[`${item.key}_photo`] = item.photo;
+                    }
                 });
 
                 const trailersData = this.trailers.map((trailer) => {
                     const trailerInspectionItems = {};
                     trailer.items.forEach(tItem => {
                         trailerInspectionItems[tItem.key] = tItem.value;
+                        if (tItem.photo) {
+                            trailerInspectionItems[`${tItem.key}_photo`] = tItem.photo;
+                        }
                     });
 
                     return {
@@ -241,11 +269,16 @@ createApp({
                     trailers: trailersData
                 };
 
+                if (!this.submissionKey) {
+                    this.submissionKey = crypto.randomUUID();
+                }
+
                 const response = await fetch('/reports', {
                     method: 'POST',
                     headers: {
                         'Authorization': `Bearer ${token}`,
-                        'Content-Type': 'appl'
+                        'Content-Type': 'appl',
+                        'Idempotency-Key': this.submissionKey
                     },
                     body: JSON.stringify(reportData)
                 });
@@ -256,6 +289,7 @@ createApp({
                     return;
                 }
 
+                this.submissionKey = null;
                 alert('Reporte guardado exitosamienta!');
             } catch (error) {
                 console.error('Error al enviar el reporte:, error');
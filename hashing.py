@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from config import pwd_context
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool de hilos propio y de tamaño fijo.
+
+    bcrypt libera el GIL, así que los hilos no compiten con el event loop, y al
+    no usar el threadpool de AnyIO una ráfaga de logins no deja sin hilos al
+    resto de los endpoints. Como máximo hay `workers + max_queue` operaciones
+    entre en curso y en espera; las demás se rechazan con 503 para que el
+    cliente reintente más tarde.
+
+    Los contadores solo se modifican desde el event loop, por lo que no
+    necesitan lock.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._workers = workers
+        self._capacity = workers + max_queue
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    async def _run(self, fn, *args):
+        if self._pending >= self._capacity:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="El servidor está ocupado, intente de nuevo.",
+                headers={"Retry-After": "1"},
+            )
+
+        enqueued_at = time.perf_counter()
+
+        def job():
+            return time.perf_counter() - enqueued_at, fn(*args)
+
+        self._pending += 1
+        try:
+            queue_wait, result = await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self._pending -= 1
+
+        self.completed += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verifica la contraseña; si el hash usa un costo distinto al configurado,
+        devuelve también el hash regenerado.
+        """
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self._workers,
+            "capacity": self._capacity,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg_seconds": self.queue_wait_total / self.completed if self.completed else 0.0,
+            "queue_wait_max_seconds": self.queue_wait_max,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_QUEUE_SIZE)
@@ -0,0 +1,144 @@
+"""
+Claves de idempotencia para la creación de reportes.
+
+Un cliente que reintenta una solicitud (por ejemplo, después de un timeout en
+una conexión celular) envía la misma `Idempotency-Key`; si la solicitud original
+ya terminó, se devuelve la respuesta guardada sin tocar las tablas de reportes.
+
+La fila de la clave se inserta antes que cualquier otra escritura. En SQLite
+eso toma el lock de escritura, así que un duplicado concurrente espera a que la
+transacción original termine y entonces encuentra la clave con su respuesta.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.sqlite import insert
+
+from database import AsyncSessionLocal
+from models import IdempotencyKeyDB
+
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+logger = logging.getLogger(__name__)
+
+
+def request_fingerprint(endpoint: str, body: bytes) -> bytes:
+    """
+    Hash del endpoint y el cuerpo, para detectar una clave reutilizada con otra solicitud.
+    """
+    return hashlib.sha256(endpoint.encode() + b"\0" + body).digest()
+
+
+def _expired_before() -> datetime:
+    return datetime.now() - timedelta(hours=IDEMPOTENCY_KEY_TTL)
+
+
+async def claim_key(db, user_id: int, key: str, request_hash: Optional[bytes]) -> Optional[IdempotencyKeyDB]:
+    """
+    Registra la clave en la transacción de la sesión.
+
+    Devuelve None si la solicitud debe procesarse (la clave es nueva o había
+    vencido) o la fila existente si ya se usó.
+    """
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"La clave de idempotencia debe tener entre 1 y {IDEMPOTENCY_KEY_MAX_LENGTH} caracteres."
+        )
+    stmt = insert(IdempotencyKeyDB).values(
+        user_id=user_id, key=key, request_hash=request_hash, created_at=datetime.now(),
+    )
+    # Una clave vencida que todavía no se purgó se reemplaza como si fuera nueva
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKeyDB.user_id, IdempotencyKeyDB.key],
+        set_=dict(
+            request_hash=stmt.excluded.request_hash,
+            status_code=None,
+            response_body=None,
+            created_at=stmt.excluded.created_at,
+        ),
+        where=IdempotencyKeyDB.created_at < _expired_before(),
+    )
+    result = await db.execute(stmt)
+    if result.rowcount == 1:
+        return None
+    return await db.get(IdempotencyKeyDB, (user_id, key), populate_existing=True)
+
+
+async def store_response(db, user_id: int, key: str, status_code: int, body: str,
+                         request_hash: Optional[bytes] = None):
+    """
+    Guarda la respuesta de la clave en la transacción de la sesión.
+    """
+    values = dict(status_code=status_code, response_body=body)
+    if request_hash is not None:
+        values["request_hash"] = request_hash
+    await db.execute(
+        update(IdempotencyKeyDB)
+        .where(IdempotencyKeyDB.user_id == user_id, IdempotencyKeyDB.key == key)
+        .values(**values)
+    )
+
+
+async def release_key(db, user_id: int, key: str):
+    """
+    Elimina una clave cuya solicitud falló sin guardar nada, para que se pueda reintentar.
+    """
+    await db.execute(
+        delete(IdempotencyKeyDB).where(IdempotencyKeyDB.user_id == user_id, IdempotencyKeyDB.key == key)
+    )
+
+
+def replay_response(existing: IdempotencyKeyDB, request_hash: bytes) -> Response:
+    """
+    Respuesta guardada de la solicitud original, o un error si no se puede repetir.
+    """
+    if existing.status_code is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Una solicitud con la misma clave de idempotencia sigue en proceso."
+        )
+    # Sin hash, la solicitud original se interrumpió antes de leer todo el cuerpo y no se puede comparar
+    if existing.request_hash is not None and existing.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="La clave de idempotencia ya se usó con una solicitud diferente."
+        )
+    return Response(
+        content=existing.response_body,
+        status_code=existing.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+async def purge_expired_keys() -> int:
+    """
+    Elimina las claves vencidas; el índice por `created_at` evita recorrer la tabla.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(IdempotencyKeyDB).where(IdempotencyKeyDB.created_at < _expired_before())
+        )
+        await db.commit()
+        return result.rowcount
+
+
+async def purge_expired_keys_periodically():
+    """
+    Tarea de fondo de la aplicación: purga las claves vencidas cada `IDEMPOTENCY_PURGE_INTERVAL` segundos.
+    """
+    while True:
+        try:
+            await purge_expired_keys()
+        except Exception:
+            logger.exception("No se pudieron purgar las claves de idempotencia vencidas")
+        await asyncio.sleep(IDEMPOTENCY_PURGE_INTERVAL)
@@ -0,0 +1,258 @@
+"""
+Inserción masiva de reportes de inspección ya validados.
+
+En lugar de construir el grafo de objetos ORM de cada reporte, cada lote se
+inserta tabla por tabla con un solo `executemany` (reportes, items del camión,
+trailers, items de cada trailer y fotos), con los ids asignados como explica
+`_insert_with_ids`. Los agregados de analítica y el estado de las unidades se
+actualizan en la misma transacción, una vez por lote.
+
+Las entradas se leen de forma incremental (un arreglo JSON o NDJSON, una línea
+por reporte) y se validan una por una, así que un reporte inválido no impide
+guardar los demás.
+"""
+import codecs
+import json
+from typing import AsyncIterable, AsyncIterator, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import (
+    InspectionReportDB,
+    TrailerDB,
+    TrailerInspectionItemsDB,
+    TruckInspectionItemsDB,
+)
+from mappers import REPORT_FIELDS, TRAILER_CHECKLIST, TRUCK_CHECKLIST
+from rollups import RollupDelta
+from schemas import VehicleInspectionReport
+from unit_status import defect_bits, record_status_rows
+
+
+# (reporte validado, errores); exactamente uno de los dos es None
+ParsedItem = Tuple[Optional[VehicleInspectionReport], Optional[list]]
+
+
+class MalformedBody(ValueError):
+    """
+    El cuerpo no es un arreglo JSON bien formado; a partir de ese punto no se puede seguir leyendo.
+    """
+
+
+def _errors(exc: ValidationError) -> list:
+    return exc.errors(include_url=False, include_context=False, include_input=False)
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[ParsedItem]:
+    """
+    Valida un reporte por cada línea no vacía del cuerpo, a medida que llega.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _validate_json(line)
+    if buffer.strip():
+        yield _validate_json(buffer)
+
+
+def _validate_json(line: bytes) -> ParsedItem:
+    try:
+        return VehicleInspectionReport.model_validate_json(line), None
+    except ValidationError as exc:
+        return None, _errors(exc)
+
+
+_FIRST, _VALUE, _SEPARATOR = range(3)
+
+
+async def iter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[ParsedItem]:
+    """
+    Valida los elementos de un arreglo JSON a medida que llegan, sin esperar el cuerpo completo.
+
+    Exige exactamente una coma entre elementos. Si el arreglo está mal formado (comas sobrantes o
+    faltantes, JSON inválido o incompleto) lanza `MalformedBody` al llegar a ese punto.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+    finished = False
+    # Qué se espera después de "[" (FIRST), de una coma (VALUE) o de un elemento (SEPARATOR)
+    expected = _FIRST
+    chunks = chunks.__aiter__()
+    while not finished:
+        try:
+            chunk = await chunks.__anext__()
+            buffer = buffer[position:] + utf8.decode(chunk)
+            more = True
+        except StopAsyncIteration:
+            buffer = buffer[position:] + utf8.decode(b"", final=True)
+            more = False
+        position = 0
+
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            if position == len(buffer):
+                break
+            char = buffer[position]
+            if not started:
+                if char != "[":
+                    raise MalformedBody("Se esperaba un arreglo JSON o NDJSON.")
+                started = True
+                position += 1
+                continue
+            if char == "]":
+                if expected == _VALUE:
+                    raise MalformedBody("Coma sobrante antes del cierre del arreglo.")
+                finished = True
+                break
+            if char == ",":
+                if expected != _SEPARATOR:
+                    raise MalformedBody("Coma sobrante: se esperaba un elemento del arreglo.")
+                expected = _VALUE
+                position += 1
+                continue
+            if expected == _SEPARATOR:
+                raise MalformedBody("Falta una coma entre los elementos del arreglo.")
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as exc:
+                if more:
+                    break
+                raise MalformedBody(f"JSON inválido: {exc.msg}.")
+            position = end
+            expected = _SEPARATOR
+            try:
+                yield VehicleInspectionReport.model_validate(item), None
+            except ValidationError as exc:
+                yield None, _errors(exc)
+
+        if not more and not finished:
+            if started:
+                raise MalformedBody("El arreglo JSON está incompleto.")
+            return
+
+
+def _photo_rows(mapping, checklist_id: int, items_data) -> List[dict]:
+    return [
+        dict(checklist_id=checklist_id, item_key=item_key, photo_ref=photo_ref)
+        for item_key, photo_ref in mapping.photos(items_data).items()
+    ]
+
+
+async def _insert_with_ids(db: AsyncSession, model, rows: List[dict]) -> List[int]:
+    """
+    Inserta las filas y devuelve sus ids, en orden.
+
+    RETURNING con orden garantizado obliga a SQLAlchemy a ejecutar una sentencia
+    por fila en SQLite. En su lugar, la primera fila se inserta sola para obtener
+    su id; a partir de ahí la transacción tiene el lock de escritura, así que nadie
+    más puede insertar y los ids siguientes están libres y se asignan explícitamente
+    en un solo `executemany`.
+    """
+    if not rows:
+        return []
+    first_id = (await db.execute(insert(model).returning(model.id), rows[0])).scalar_one()
+    ids = list(range(first_id, first_id + len(rows)))
+    for row, row_id in zip(rows[1:], ids[1:]):
+        row["id"] = row_id
+    if len(rows) > 1:
+        await db.execute(insert(model), rows[1:])
+    return ids
+
+
+async def insert_reports(db: AsyncSession, reports: Sequence[VehicleInspectionReport]) -> List[int]:
+    """
+    Inserta los reportes en la transacción de la sesión y devuelve sus ids en el mismo orden.
+
+    No hace commit: el llamador decide el tamaño de la transacción.
+    """
+    if not reports:
+        return []
+
+    report_ids = await _insert_with_ids(db, InspectionReportDB, [
+        {name: getattr(report, name) for name in REPORT_FIELDS}
+        for report in reports
+    ])
+
+    truck_rows = [TRUCK_CHECKLIST.row(report.truck_inspection_items) for report in reports]
+    for row, report_id in zip(truck_rows, report_ids):
+        row["report_id"] = report_id
+    truck_checklist_ids = await _insert_with_ids(db, TruckInspectionItemsDB, truck_rows)
+
+    trailers = [(report_id, trailer) for report, report_id in zip(reports, report_ids) for trailer in report.trailers]
+    trailer_ids = await _insert_with_ids(db, TrailerDB, [
+        dict(report_id=report_id, trailer_number=trailer.trailer_number) for report_id, trailer in trailers
+    ])
+    trailer_rows = [TRAILER_CHECKLIST.row(trailer.inspection_items) for _, trailer in trailers]
+    for row, trailer_id in zip(trailer_rows, trailer_ids):
+        row["trailer_id"] = trailer_id
+    trailer_checklist_ids = await _insert_with_ids(db, TrailerInspectionItemsDB, trailer_rows)
+
+    truck_photo_rows = []
+    for report, checklist_id in zip(reports, truck_checklist_ids):
+        truck_photo_rows.extend(_photo_rows(TRUCK_CHECKLIST, checklist_id, report.truck_inspection_items))
+    if truck_photo_rows:
+        await db.execute(insert(TruckInspectionItemsDB.photo_class), truck_photo_rows)
+    trailer_photo_rows = []
+    for (_, trailer), checklist_id in zip(trailers, trailer_checklist_ids):
+        trailer_photo_rows.extend(_photo_rows(TRAILER_CHECKLIST, checklist_id, trailer.inspection_items))
+    if trailer_photo_rows:
+        await db.execute(insert(TrailerInspectionItemsDB.photo_class), trailer_photo_rows)
+
+    await _apply_derived(db, reports, report_ids, truck_rows, trailers, trailer_rows)
+    return report_ids
+
+
+def _is_newer(current, report, report_id: int) -> bool:
+    if current is None:
+        return True
+    # La base guarda las fechas sin zona horaria; se comparan igual para no mezclar fechas con y sin zona
+    return (current["inspection_date"].replace(tzinfo=None), current["report_id"]) < (
+        report.inspection_date.replace(tzinfo=None), report_id)
+
+
+async def _apply_derived(db, reports, report_ids, truck_rows, trailers, trailer_rows):
+    """
+    Agregados y estado de las unidades del lote; del estado solo se envía el reporte más reciente de cada unidad.
+    """
+    rollup_delta = RollupDelta()
+    latest_trucks = {}
+    for report, report_id, truck_row in zip(reports, report_ids, truck_rows):
+        rollup_delta.add_checklist(report.carrier, report.truck_number, report.inspection_date, "truck",
+                                   truck_row["checks"], TruckInspectionItemsDB.ITEM_KEYS)
+        if _is_newer(latest_trucks.get(report.truck_number), report, report_id):
+            latest_trucks[report.truck_number] = dict(
+                truck_number=report.truck_number,
+                report_id=report_id,
+                inspection_date=report.inspection_date,
+                odometer_reading=report.odometer_reading,
+                defects=defect_bits(truck_row["checks"], TruckInspectionItemsDB),
+            )
+
+    reports_by_id = dict(zip(report_ids, reports))
+    latest_trailers = {}
+    for (report_id, trailer), trailer_row in zip(trailers, trailer_rows):
+        report = reports_by_id[report_id]
+        rollup_delta.add_checklist(report.carrier, report.truck_number, report.inspection_date, "trailer",
+                                   trailer_row["checks"], TrailerInspectionItemsDB.ITEM_KEYS)
+        if _is_newer(latest_trailers.get(trailer.trailer_number), report, report_id):
+            latest_trailers[trailer.trailer_number] = dict(
+                trailer_number=trailer.trailer_number,
+                report_id=report_id,
+                truck_number=report.truck_number,
+                inspection_date=report.inspection_date,
+                defects=defect_bits(trailer_row["checks"], TrailerInspectionItemsDB),
+            )
+
+    await rollup_delta.apply(db)
+    await record_status_rows(db, list(latest_trucks.values()), list(latest_trailers.values()))
+
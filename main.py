@@ -1,19 +1,54 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from routers.users import router as users_router
 from routers.vehicle_inspection_reports import router as reports_router
-from database import Base, engine
+from routers.photos import router as photos_router
+from routers.stats import router as stats_router
+from routers.analytics import router as analytics_router
+from routers.fleet import router as fleet_router
+from routers.metrics import router as metrics_router
+from database import Base, async_engine, engine
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+from thumbnails import pipeline as thumbnail_pipeline
+from hashing import password_hasher
+from idempotency import purge_expired_keys_periodically
+from retention import purger as retention_purger
+from metrics import MetricsMiddleware, probe_threadpool_periodically
+from profiling import SQL_PROFILE, QueryProfilerMiddleware, install_query_profiler
 
 
 Base.metadata.create_all(bind=engine)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    purge_task = asyncio.create_task(purge_expired_keys_periodically())
+    probe_task = asyncio.create_task(probe_threadpool_periodically())
+    yield
+    probe_task.cancel()
+    purge_task.cancel()
+    retention_purger.shutdown()
+    thumbnail_pipeline.shutdown()
+    password_hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+if SQL_PROFILE:
+    install_query_profiler(engine, async_engine.sync_engine)
+    app.add_middleware(QueryProfilerMiddleware)
 
 
 app.include_router(users_router, prefix="/users", tags=["users"])
 app.include_router(reports_router, prefix="/vehicle_inspection_reports", tags=["reports"])
+app.include_router(photos_router, prefix="/photos", tags=["photos"])
+app.include_router(stats_router, prefix="/stats", tags=["stats"])
+app.include_router(analytics_router, prefix="/analytics", tags=["analytics"])
+app.include_router(fleet_router, tags=["fleet"])
+app.include_router(metrics_router, tags=["metrics"])
 
 
 app.mount("/frontend", StaticFiles(directory="frontend"), name="static")
@@ -0,0 +1,224 @@
+"""
+Conversión entre los modelos ORM de los reportes y los esquemas de la API.
+
+Los campos que se copian se derivan una sola vez, al importar, de las columnas
+de los modelos y de los campos de los esquemas. Si un campo del esquema no tiene
+contraparte en el modelo la importación falla, en lugar de perder el dato en
+silencio como pasaba con las copias escritas a mano.
+
+Las listas de verificación se leen directamente de `checks` y del diccionario de
+fotos, sin pasar por las propiedades de cada item.
+"""
+from models import (
+    InspectionReportDB,
+    TrailerDB,
+    TrailerInspectionItemsDB,
+    TruckInspectionItemsDB,
+)
+from schemas import (
+    TrailerInspectionItems,
+    TruckInspectionItems,
+    VehicleInspectionReport,
+    VehicleInspectionReportRead,
+    VehicleInspectionReportUpdate,
+)
+
+
+class ChecklistMapping:
+    """
+    Campos de una lista de verificación (modelo con `ChecklistMixin`) y su esquema.
+    """
+
+    def __init__(self, model, schema):
+        self.model = model
+        self.schema = schema
+        self.flags = tuple((item_key, 1 << bit) for bit, item_key in enumerate(model.ITEM_KEYS))
+        self.flag_masks = dict(self.flags)
+        self.photo_fields = {item_key: f"{item_key}_photo" for item_key in model.ITEM_KEYS}
+        self.photo_items = {field: item_key for item_key, field in self.photo_fields.items()}
+
+        expected = set(model.ITEM_KEYS) | set(self.photo_fields.values()) | {"other_description"}
+        if set(schema.model_fields) != expected:
+            raise RuntimeError(
+                f"{schema.__name__} no coincide con {model.__name__}: "
+                f"{sorted(set(schema.model_fields) ^ expected)}"
+            )
+        self.empty = {name: field.get_default() for name, field in schema.model_fields.items()}
+
+    def to_dict(self, checklist) -> dict:
+        """
+        Valores del esquema a partir de la lista guardada; sin lista, los valores por omisión.
+        """
+        data = dict(self.empty)
+        if checklist is None:
+            return data
+        checks = checklist.checks or 0
+        for item_key, mask in self.flags:
+            data[item_key] = checks & mask != 0
+        for item_key, photo in checklist.photos.items():
+            data[self.photo_fields[item_key]] = photo.photo_ref
+        data["other_description"] = checklist.other_description
+        return data
+
+    def photos(self, data) -> dict:
+        """
+        item_key -> photo_ref de las fotos presentes en el esquema.
+        """
+        photos = {}
+        for item_key, field in self.photo_fields.items():
+            photo_ref = getattr(data, field)
+            if photo_ref is not None:
+                photos[item_key] = photo_ref
+        return photos
+
+    def row(self, data) -> dict:
+        """
+        Columnas de la tabla de la lista, para inserciones con SQL directo.
+        """
+        return dict(checks=self.model.pack_checks(data), other_description=data.other_description)
+
+    def new(self, data):
+        checklist = self.model(**self.row(data))
+        checklist.photos = {
+            item_key: self.model.photo_class(item_key=item_key, photo_ref=photo_ref)
+            for item_key, photo_ref in self.photos(data).items()
+        }
+        return checklist
+
+    def full(self, data):
+        """
+        Esquema completo a partir de uno parcial; los campos omitidos toman su valor por omisión.
+        """
+        if data is None:
+            return self.schema()
+        return self.schema.model_validate(data.model_dump(exclude_unset=True))
+
+    def apply_changes(self, checklist, data) -> bool:
+        """
+        Aplica solo los campos enviados en una actualización parcial. Devuelve si algo cambió.
+        """
+        changed = False
+        checks = checklist.checks or 0
+        new_checks = checks
+        for name in data.model_fields_set:
+            value = getattr(data, name)
+            if name in self.flag_masks:
+                mask = self.flag_masks[name]
+                new_checks = new_checks | mask if value else new_checks & ~mask
+            elif name in self.photo_items:
+                changed |= self._set_photo(checklist, self.photo_items[name], value)
+            elif checklist.other_description != value:
+                checklist.other_description = value
+                changed = True
+        if new_checks != checks:
+            checklist.checks = new_checks
+            changed = True
+        return changed
+
+    def _set_photo(self, checklist, item_key: str, photo_ref) -> bool:
+        photo = checklist.photos.get(item_key)
+        if photo_ref is None:
+            if photo is None:
+                return False
+            del checklist.photos[item_key]
+        elif photo is None:
+            checklist.photos[item_key] = self.model.photo_class(item_key=item_key, photo_ref=photo_ref)
+        elif photo.photo_ref != photo_ref:
+            photo.photo_ref = photo_ref
+        else:
+            return False
+        return True
+
+
+TRUCK_CHECKLIST = ChecklistMapping(TruckInspectionItemsDB, TruckInspectionItems)
+TRAILER_CHECKLIST = ChecklistMapping(TrailerInspectionItemsDB, TrailerInspectionItems)
+
+_RELATIONSHIP_FIELDS = {"truck_inspection_items", "trailers"}
+REPORT_FIELDS = tuple(name for name in VehicleInspectionReport.model_fields if name not in _RELATIONSHIP_FIELDS)
+
+_missing = [name for name in REPORT_FIELDS if name not in InspectionReportDB.__table__.columns]
+if _missing:
+    raise RuntimeError(f"VehicleInspectionReport tiene campos sin columna en InspectionReportDB: {_missing}")
+
+
+def report_to_dict(report: InspectionReportDB) -> dict:
+    """
+    Valores de `VehicleInspectionReportRead` de un reporte con sus relaciones ya cargadas.
+    """
+    data = {name: getattr(report, name) for name in REPORT_FIELDS}
+    data["id"] = report.id
+    data["truck_inspection_items"] = TRUCK_CHECKLIST.to_dict(report.truck_inspection_items)
+    data["trailers"] = [
+        {
+            "trailer_number": trailer.trailer_number,
+            "inspection_items": TRAILER_CHECKLIST.to_dict(trailer.inspection_items),
+        }
+        for trailer in report.trailers
+    ]
+    return data
+
+
+def to_report_read(report: InspectionReportDB) -> VehicleInspectionReportRead:
+    return VehicleInspectionReportRead.model_validate(report_to_dict(report))
+
+
+def _new_trailer(trailer_number: str, items_data) -> TrailerDB:
+    return TrailerDB(trailer_number=trailer_number, inspection_items=TRAILER_CHECKLIST.new(items_data))
+
+
+def new_report(data: VehicleInspectionReport) -> InspectionReportDB:
+    """
+    Reporte nuevo con sus items y trailers, listo para `db.add`.
+    """
+    return InspectionReportDB(
+        **{name: getattr(data, name) for name in REPORT_FIELDS},
+        truck_inspection_items=TRUCK_CHECKLIST.new(data.truck_inspection_items),
+        # Colección inicializada: sigue cargada después del flush aunque no tenga trailers
+        trailers=[_new_trailer(trailer.trailer_number, trailer.inspection_items) for trailer in data.trailers],
+    )
+
+
+def apply_report_changes(report: InspectionReportDB, data: VehicleInspectionReportUpdate) -> bool:
+    """
+    Aplica una actualización parcial a un reporte con sus relaciones cargadas. Devuelve si algo cambió.
+
+    Solo se asignan los campos enviados que difieren del valor guardado, así que
+    el UPDATE de cada tabla incluye únicamente las columnas modificadas. Los
+    trailers de `trailers` que no están en el reporte se agregan y los de
+    `remove_trailers` se eliminan; el llamador ya validó que existan.
+    """
+    changed = False
+    for name in REPORT_FIELDS:
+        if name in data.model_fields_set:
+            value = getattr(data, name)
+            if getattr(report, name) != value:
+                setattr(report, name, value)
+                changed = True
+
+    if data.truck_inspection_items is not None:
+        changed |= _apply_checklist_changes(TRUCK_CHECKLIST, report, "truck_inspection_items",
+                                            data.truck_inspection_items)
+
+    trailers = {trailer.trailer_number: trailer for trailer in report.trailers}
+    for trailer_number in data.remove_trailers:
+        report.trailers.remove(trailers.pop(trailer_number))
+        changed = True
+    for trailer_data in data.trailers:
+        trailer = trailers.get(trailer_data.trailer_number)
+        if trailer is None:
+            report.trailers.append(
+                _new_trailer(trailer_data.trailer_number, TRAILER_CHECKLIST.full(trailer_data.inspection_items))
+            )
+            changed = True
+        elif trailer_data.inspection_items is not None:
+            changed |= _apply_checklist_changes(TRAILER_CHECKLIST, trailer, "inspection_items",
+                                                trailer_data.inspection_items)
+    return changed
+
+
+def _apply_checklist_changes(mapping: ChecklistMapping, owner, attribute: str, data) -> bool:
+    checklist = getattr(owner, attribute)
+    if checklist is None:
+        setattr(owner, attribute, mapping.new(mapping.full(data)))
+        return True
+    return mapping.apply_changes(checklist, data)
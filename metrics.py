@@ -0,0 +1,196 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+`MetricsMiddleware` es un middleware ASGI puro (sin `BaseHTTPMiddleware`, que
+agrega una tarea y una cola por solicitud) que cuenta las solicitudes por ruta,
+método y código de estado, y registra su latencia en un histograma. La ruta es
+la plantilla (`/vehicle-inspection-reports/{report_id}`), no la URL, para que el
+número de series no crezca con los ids.
+
+Todas las actualizaciones ocurren en el event loop, así que los contadores no
+necesitan lock; registrar una solicitud cuesta unos pocos microsegundos. Las
+métricas son locales al proceso: con varios workers, cada uno expone las suyas.
+"""
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left
+
+import anyio.to_thread
+
+METRICS_THREADPOOL_PROBE_INTERVAL = float(os.getenv("METRICS_THREADPOOL_PROBE_INTERVAL", "1"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUEUE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """
+    Histograma con límites fijos; cada observación incrementa un solo contador.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str = ""):
+        """
+        Líneas `_bucket` (acumuladas), `_sum` y `_count` del histograma.
+        """
+        separator = "," if labels else ""
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{{{labels}{separator}le="+Inf"}} {cumulative}'
+        suffix = f"{{{labels}}}" if labels else ""
+        yield f"{name}_sum{suffix} {self.sum}"
+        yield f"{name}_count{suffix} {cumulative}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metric_lines(name: str, metric_type: str, description: str, samples):
+    """
+    Encabezados HELP/TYPE de una métrica seguidos de sus muestras.
+
+    `samples` son pares (etiquetas, valor) o, si ya vienen formateadas, líneas completas.
+    """
+    yield f"# HELP {name} {description}"
+    yield f"# TYPE {name} {metric_type}"
+    for sample in samples:
+        if isinstance(sample, str):
+            yield sample
+            continue
+        labels, value = sample
+        if labels:
+            label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+            yield f"{name}{{{label_text}}} {value}"
+        else:
+            yield f"{name} {value}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        # (método, ruta) -> ({código de estado: solicitudes}, histograma de latencia)
+        self.routes = {}
+        self.in_flight = 0
+        self.threadpool_queue = Histogram(QUEUE_BUCKETS)
+
+    def observe_request(self, method: str, route: str, status_code: int, duration: float):
+        entry = self.routes.get((method, route))
+        if entry is None:
+            entry = self.routes[(method, route)] = ({}, Histogram(LATENCY_BUCKETS))
+        statuses, histogram = entry
+        statuses[status_code] = statuses.get(status_code, 0) + 1
+        histogram.observe(duration)
+
+    def lines(self):
+        routes = sorted(self.routes.items())
+        yield from metric_lines(
+            "http_requests_total", "counter", "Solicitudes HTTP terminadas por ruta, método y código de estado.",
+            (
+                ({"method": method, "route": route, "status": status_code}, count)
+                for (method, route), (statuses, _) in routes
+                for status_code, count in sorted(statuses.items())
+            ),
+        )
+        yield from metric_lines(
+            "http_request_duration_seconds", "histogram", "Latencia de las solicitudes HTTP por ruta y método.",
+            (
+                line
+                for (method, route), (_, histogram) in routes
+                for line in histogram.samples("http_request_duration_seconds",
+                                              f'method="{method}",route="{_escape(route)}"')
+            ),
+        )
+        yield from metric_lines("http_requests_in_flight", "gauge", "Solicitudes HTTP en curso.",
+                                [(None, self.in_flight)])
+
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        statistics = limiter.statistics()
+        yield from metric_lines("threadpool_threads", "gauge", "Hilos del threadpool de AnyIO.",
+                                [(None, limiter.total_tokens)])
+        yield from metric_lines("threadpool_threads_busy", "gauge", "Hilos del threadpool de AnyIO ocupados.",
+                                [(None, statistics.borrowed_tokens)])
+        yield from metric_lines("threadpool_tasks_waiting", "gauge",
+                                "Tareas esperando un hilo libre del threadpool de AnyIO.",
+                                [(None, statistics.tasks_waiting)])
+        yield from metric_lines(
+            "threadpool_queue_seconds", "histogram",
+            "Espera hasta obtener un hilo del threadpool, medida por una sonda periódica.",
+            self.threadpool_queue.samples("threadpool_queue_seconds"),
+        )
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status_code = 500
+        root_path = scope.get("root_path", "")
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            registry.in_flight -= 1
+            # El router deja la ruta resuelta en el scope; un Mount solo cambia root_path
+            route = scope.get("route")
+            if route is not None:
+                template = route.path
+            elif scope.get("root_path", "") != root_path:
+                template = scope["root_path"][len(root_path):]
+            else:
+                template = UNMATCHED_ROUTE
+            registry.observe_request(scope["method"], template, status_code, duration)
+
+
+async def probe_threadpool_periodically(registry: MetricsRegistry = registry):
+    """
+    Tarea de fondo de la aplicación: mide cuánto tarda en empezar un trabajo en el threadpool.
+
+    Los endpoints y dependencias síncronos corren en ese pool; si se satura, esta
+    espera crece antes de que se note en la latencia de cada ruta.
+    """
+    while True:
+        try:
+            enqueued_at = time.perf_counter()
+            started_at = await anyio.to_thread.run_sync(time.perf_counter)
+            registry.threadpool_queue.observe(started_at - enqueued_at)
+        except Exception:
+            logger.exception("No se pudo medir la espera del threadpool")
+        await asyncio.sleep(METRICS_THREADPOOL_PROBE_INTERVAL)
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Boolean, DateTime, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Date, DateTime, Text, Index, LargeBinary, event
+from sqlalchemy.orm import attribute_keyed_dict, relationship
 
 from database import Base
+from search import create_search_index
 from enum import Enum as PyEnum
 
 class Role(str, PyEnum):
@@ -18,161 +19,249 @@ class User(Base):
     role = Column(Enum(Role), default=Role.USER, nullable=False)
 
 
-class TruckInspectionItemsDB(Base):
+# Items de cada lista de verificación. La posición de cada item es su bit en la
+# columna `checks`, así que solo se agregan items al final, nunca se reordenan.
+TRUCK_ITEM_KEYS = (
+    "air_compressor",
+    "air_lines",
+    "battery",
+    "belts_and_hoses",
+    "body",
+    "brake_accessories",
+    "brake_parking",
+    "brake_service",
+    "clutch",
+    "coupling_devices",
+    "defroster_heater",
+    "drive_line",
+    "engine",
+    "exhaust",
+    "fifth_wheel",
+    "fluid_levels",
+    "frame_and_assembly",
+    "front_axle",
+    "fuel_tanks",
+    "horn",
+    "lights_head_stop",
+    "lights_tail_dash",
+    "lights_turn_indicators",
+    "lights_clearance_marker",
+    "mirrors",
+    "muffler",
+    "oil_pressure",
+    "radiator",
+    "rear_end",
+    "reflectors",
+    "safety_fire_extinguisher",
+    "safety_flags_flares_fusees",
+    "safety_reflective_triangles",
+    "safety_spare_bulbs_and_fuses",
+    "safety_spare_seal_beam",
+    "starter",
+    "steering",
+    "suspension_system",
+    "tire_chains",
+    "tires",
+    "transmission",
+    "trip_recorder",
+    "wheels_and_rims",
+    "windows",
+    "windshield_wipers",
+    "other",
+)
+
+TRAILER_ITEM_KEYS = (
+    "brake_connections",
+    "brakes",
+    "coupling_devices",
+    "coupling_king_pin",
+    "doors",
+    "hitch",
+    "landing_gear",
+    "lights_all",
+    "reflectors_reflective_tape",
+    "roof",
+    "suspension_system",
+    "tarpaulin",
+    "tires",
+    "wheels_and_rims",
+    "other",
+)
+
+
+# "other" solo habilita la descripción libre (y su foto) en el formulario; no es
+# un item que pase o falle, así que no cuenta como defecto
+UNCHECKED_ITEM_KEYS = frozenset({"other"})
+
+
+def _item_flag(bit: int):
+    """
+    Propiedad booleana respaldada por un bit de `checks` (1 = item en buen estado).
+    """
+    mask = 1 << bit
+
+    def get(self) -> bool:
+        return bool((self.checks or 0) & mask)
+
+    def set(self, value: bool):
+        if value:
+            self.checks = (self.checks or 0) | mask
+        else:
+            self.checks = (self.checks or 0) & ~mask
+
+    return property(get, set)
+
+
+def _item_photo(item_key: str):
+    """
+    Propiedad con la referencia de la foto de un item, guardada en la tabla de fotos.
+    """
+    def get(self):
+        photo = self.photos.get(item_key)
+        return photo.photo_ref if photo is not None else None
+
+    def set(self, photo_ref):
+        if photo_ref is None:
+            self.photos.pop(item_key, None)
+        elif item_key in self.photos:
+            self.photos[item_key].photo_ref = photo_ref
+        else:
+            self.photos[item_key] = self.photo_class(item_key=item_key, photo_ref=photo_ref)
+
+    return property(get, set)
+
+
+class ChecklistMixin:
+    """
+    Lista de verificación compacta: los items en buen estado o con defecto se guardan
+    como bits de `checks` y las fotos, que casi siempre faltan, en una tabla aparte
+    con una fila por foto.
+
+    Cada item sigue disponible como atributo (`brakes`, `brakes_photo`), así que el
+    resto del código y los esquemas de la API no cambian.
+    """
+    ITEM_KEYS = ()
+    # Items que cuentan como defecto cuando su bit está en 0, y sus bits
+    DEFECT_ITEM_KEYS = ()
+    DEFECT_MASK = 0
+    photo_class = None
+
+    checks = Column(Integer, nullable=False, default=0)
+    other_description = Column(String, nullable=True)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for bit, item_key in enumerate(cls.ITEM_KEYS):
+            setattr(cls, item_key, _item_flag(bit))
+            setattr(cls, f"{item_key}_photo", _item_photo(item_key))
+        cls.DEFECT_ITEM_KEYS = tuple(item_key for item_key in cls.ITEM_KEYS if item_key not in UNCHECKED_ITEM_KEYS)
+        cls.DEFECT_MASK = cls.item_mask(*cls.DEFECT_ITEM_KEYS)
+
+    @classmethod
+    def pack_checks(cls, source) -> int:
+        """
+        Calcula `checks` a partir de un objeto con un atributo booleano por item (por ejemplo, el esquema).
+        """
+        checks = 0
+        for bit, item_key in enumerate(cls.ITEM_KEYS):
+            if getattr(source, item_key):
+                checks |= 1 << bit
+        return checks
+
+    @classmethod
+    def item_mask(cls, *item_keys: str) -> int:
+        mask = 0
+        for item_key in item_keys:
+            mask |= 1 << cls.ITEM_KEYS.index(item_key)
+        return mask
+
+    @classmethod
+    def items_failed(cls, *item_keys: str):
+        """
+        Condición SQL: al menos uno de los items quedó marcado con defecto.
+        """
+        mask = cls.item_mask(*item_keys)
+        return cls.checks.bitwise_and(mask) != mask
+
+
+class TruckInspectionPhotoDB(Base):
+    __tablename__ = "truck_inspection_photos"
+
+    checklist_id = Column(Integer, ForeignKey("truck_inspection_items.id", ondelete="CASCADE"), primary_key=True)
+    item_key = Column(String, primary_key=True)
+    photo_ref = Column(String, nullable=False)
+
+
+class TrailerInspectionPhotoDB(Base):
+    __tablename__ = "trailer_inspection_photos"
+
+    checklist_id = Column(Integer, ForeignKey("trailer_inspection_items.id", ondelete="CASCADE"), primary_key=True)
+    item_key = Column(String, primary_key=True)
+    photo_ref = Column(String, nullable=False)
+
+
+class TruckInspectionItemsDB(ChecklistMixin, Base):
     __tablename__ = "truck_inspection_items"
+    ITEM_KEYS = TRUCK_ITEM_KEYS
+    photo_class = TruckInspectionPhotoDB
 
     id = Column(Integer, primary_key=True, index=True)
-    report_id = Column(Integer, ForeignKey("inspection_reports.id"))
-    air_compressor = Column(Boolean, default=False)
-    air_compressor_photo = Column(String, nullable=True)
-    air_lines = Column(Boolean, default=False)
-    air_lines_photo = Column(String, nullable=True)
-    battery = Column(Boolean, default=False)
-    battery_photo = Column(String, nullable=True)
-    belts_and_hoses = Column(Boolean, default=False)
-    belts_and_hoses_photo = Column(String, nullable=True)
-    body = Column(Boolean, default=False)
-    body_photo = Column(String, nullable=True)
-    brake_accessories = Column(Boolean, default=False)
-    brake_accessories_photo = Column(String, nullable=True)
-    brake_parking = Column(Boolean, default=False)
-    brake_parking_photo = Column(String, nullable=True)
-    brake_service = Column(Boolean, default=False)
-    brake_service_photo = Column(String, nullable=True)
-    clutch = Column(Boolean, default=False)
-    clutch_photo = Column(String, nullable=True)
-    coupling_devices = Column(Boolean, default=False)
-    coupling_devices_photo = Column(String, nullable=True)
-    defroster_heater = Column(Boolean, default=False)
-    defroster_heater_photo = Column(String, nullable=True)
-    drive_line = Column(Boolean, default=False)
-    drive_line_photo = Column(String, nullable=True)
-    engine = Column(Boolean, default=False)
-    engine_photo = Column(String, nullable=True)
-    exhaust = Column(Boolean, default=False)
-    exhaust_photo = Column(String, nullable=True)
-    fifth_wheel = Column(Boolean, default=False)
-    fifth_wheel_photo = Column(String, nullable=True)
-    fluid_levels = Column(Boolean, default=False)
-    fluid_levels_photo = Column(String, nullable=True)
-    frame_and_assembly = Column(Boolean, default=False)
-    frame_and_assembly_photo = Column(String, nullable=True)
-    front_axle = Column(Boolean, default=False)
-    front_axle_photo = Column(String, nullable=True)
-    fuel_tanks = Column(Boolean, default=False)
-    fuel_tanks_photo = Column(String, nullable=True)
-    horn = Column(Boolean, default=False)
-    horn_photo = Column(String, nullable=True)
-    lights_head_stop = Column(Boolean, default=False)
-    lights_head_stop_photo = Column(String, nullable=True)
-    lights_tail_dash = Column(Boolean, default=False)
-    lights_tail_dash_photo = Column(String, nullable=True)
-    lights_turn_indicators = Column(Boolean, default=False)
-    lights_turn_indicators_photo = Column(String, nullable=True)
-    lights_clearance_marker = Column(Boolean, default=False)
-    lights_clearance_marker_photo = Column(String, nullable=True)
-    mirrors = Column(Boolean, default=False)
-    mirrors_photo = Column(String, nullable=True)
-    muffler = Column(Boolean, default=False)
-    muffler_photo = Column(String, nullable=True)
-    oil_pressure = Column(Boolean, default=False)
-    oil_pressure_photo = Column(String, nullable=True)
-    radiator = Column(Boolean, default=False)
-    radiator_photo = Column(String, nullable=True)
-    rear_end = Column(Boolean, default=False)
-    rear_end_photo = Column(String, nullable=True)
-    reflectors = Column(Boolean, default=False)
-    reflectors_photo = Column(String, nullable=True)
-    safety_fire_extinguisher = Column(Boolean, default=False)
-    safety_fire_extinguisher_photo = Column(String, nullable=True)
-    safety_flags_flares_fusees = Column(Boolean, default=False)
-    safety_flags_flares_fusees_photo = Column(String, nullable=True)
-    safety_reflective_triangles = Column(Boolean, default=False)
-    safety_reflective_triangles_photo = Column(String, nullable=True)
-    safety_spare_bulbs_and_fuses = Column(Boolean, default=False)
-    safety_spare_bulbs_and_fuses_photo = Column(String, nullable=True)
-    safety_spare_seal_beam = Column(Boolean, default=False)
-    safety_spare_seal_beam_photo = Column(String, nullable=True)
-    starter = Column(Boolean, default=False)
-    starter_photo = Column(String, nullable=True)
-    steering = Column(Boolean, default=False)
-    steering_photo = Column(String, nullable=True)
-    suspension_system = Column(Boolean, default=False)
-    suspension_system_photo = Column(String, nullable=True)
-    tire_chains = Column(Boolean, default=False)
-    tire_chains_photo = Column(String, nullable=True)
-    tires = Column(Boolean, default=False)
-    tires_photo = Column(String, nullable=True)
-    transmission = Column(Boolean, default=False)
-    transmission_photo = Column(String, nullable=True)
-    trip_recorder = Column(Boolean, default=False)
-    trip_recorder_photo = Column(String, nullable=True)
-    wheels_and_rims = Column(Boolean, default=False)
-    wheels_and_rims_photo = Column(String, nullable=True)
-    windows = Column(Boolean, default=False)
-    windows_photo = Column(String, nullable=True)
-    windshield_wipers = Column(Boolean, default=False)
-    windshield_wipers_photo = Column(String, nullable=True)
-    other = Column(Boolean, default=False)
-    other_photo = Column(String, nullable=True)
-    other_description = Column(String, nullable=True)
+    report_id = Column(Integer, ForeignKey("inspection_reports.id", ondelete="CASCADE"), index=True)
 
     report = relationship("InspectionReportDB", back_populates="truck_inspection_items")
+    photos = relationship(
+        TruckInspectionPhotoDB,
+        collection_class=attribute_keyed_dict("item_key"),
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        passive_deletes=True,
+    )
 
 
-class TrailerInspectionItemsDB(Base):
+class TrailerInspectionItemsDB(ChecklistMixin, Base):
     __tablename__ = "trailer_inspection_items"
+    ITEM_KEYS = TRAILER_ITEM_KEYS
+    photo_class = TrailerInspectionPhotoDB
 
     id = Column(Integer, primary_key=True, index=True)
-    trailer_id = Column(Integer, ForeignKey("trailers.id"))
-    brake_connections = Column(Boolean, default=False)
-    brake_connections_photo = Column(String, nullable=True)
-    brakes = Column(Boolean, default=False)
-    brakes_photo = Column(String, nullable=True)
-    coupling_devices = Column(Boolean, default=False)
-    coupling_devices_photo = Column(String, nullable=True)
-    coupling_king_pin = Column(Boolean, default=False)
-    coupling_king_pin_photo = Column(String, nullable=True)
-    doors = Column(Boolean, default=False)
-    doors_photo = Column(String, nullable=True)
-    hitch = Column(Boolean, default=False)
-    hitch_photo = Column(String, nullable=True)
-    landing_gear = Column(Boolean, default=False)
-    landing_gear_photo = Column(String, nullable=True)
-    lights_all = Column(Boolean, default=False)
-    lights_all_photo = Column(String, nullable=True)
-    reflectors_reflective_tape = Column(Boolean, default=False)
-    reflectors_reflective_tape_photo = Column(String, nullable=True)
-    roof = Column(Boolean, default=False)
-    roof_photo = Column(String, nullable=True)
-    suspension_system = Column(Boolean, default=False)
-    suspension_system_photo = Column(String, nullable=True)
-    tarpaulin = Column(Boolean, default=False)
-    tarpaulin_photo = Column(String, nullable=True)
-    tires = Column(Boolean, default=False)
-    tires_photo = Column(String, nullable=True)
-    wheels_and_rims = Column(Boolean, default=False)
-    wheels_and_rims_photo = Column(String, nullable=True)
-    other = Column(Boolean, default=False)
-    other_photo = Column(String, nullable=True)
-    other_description = Column(String, nullable=True)
+    trailer_id = Column(Integer, ForeignKey("trailers.id", ondelete="CASCADE"), index=True)
 
     trailer = relationship("TrailerDB", back_populates="inspection_items")
+    photos = relationship(
+        TrailerInspectionPhotoDB,
+        collection_class=attribute_keyed_dict("item_key"),
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        passive_deletes=True,
+    )
 
 
 class TrailerDB(Base):
     __tablename__ = "trailers"
+    __table_args__ = (
+        # Filtro por trailer del listado: de cada número de trailer salen directamente sus reportes
+        Index("ix_trailers_number_report", "trailer_number", "report_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    report_id = Column(Integer, ForeignKey("inspection_reports.id"))
-    trailer_number = Column(String, index=True)
+    report_id = Column(Integer, ForeignKey("inspection_reports.id", ondelete="CASCADE"), index=True)
+    trailer_number = Column(String)
 
     report = relationship("InspectionReportDB", back_populates="trailers")
-    inspection_items = relationship("TrailerInspectionItemsDB", uselist=False, back_populates="trailer", cascade="all, delete-orphan")
+    inspection_items = relationship(
+        "TrailerInspectionItemsDB", uselist=False, back_populates="trailer", cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
 
 
 class InspectionReportDB(Base):
     __tablename__ = "inspection_reports"
+    __table_args__ = (
+        # Índices para la paginación por cursor (inspection_date, id), con y sin filtro
+        Index("ix_inspection_reports_date_id", "inspection_date", "id"),
+        Index("ix_inspection_reports_carrier_date_id", "carrier", "inspection_date", "id"),
+        Index("ix_inspection_reports_truck_date_id", "truck_number", "inspection_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     carrier = Column(String, index=True)
@@ -181,6 +270,109 @@ class InspectionReportDB(Base):
     truck_number = Column(String, index=True)
     odometer_reading = Column(Integer)
     remarks = Column(Text, nullable=True)
+    # Se incrementa en cada modificación; es la base del ETag del reporte
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Las filas hijas se eliminan con ON DELETE CASCADE; el ORM no las carga para borrarlas
+    truck_inspection_items = relationship(
+        "TruckInspectionItemsDB", uselist=False, back_populates="report", cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    trailers = relationship("TrailerDB", back_populates="report", cascade="all, delete-orphan", passive_deletes=True)
+
+    # El UPDATE lleva WHERE version = <la que se leyó>: si otra escritura ya la cambió no toca filas y
+    # el flush lanza StaleDataError. La versión se incrementa a mano, porque editar solo las filas hijas
+    # no genera un UPDATE del reporte.
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+
+class InspectionRollupDB(Base):
+    """
+    Inspecciones por periodo, transportista, camión y tipo de unidad (camión o trailer).
+
+    Se mantiene junto con `DefectRollupDB` en la misma transacción que crea,
+    modifica o elimina cada reporte (ver `rollups.py`).
+    """
+    __tablename__ = "inspection_rollups"
+    __table_args__ = (
+        Index("ix_inspection_rollups_truck", "granularity", "truck_number", "period_start"),
+    )
+
+    granularity = Column(String, primary_key=True)
+    carrier = Column(String, primary_key=True)
+    truck_number = Column(String, primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    unit = Column(String, primary_key=True)
+    inspections = Column(Integer, nullable=False, default=0)
+
+
+class DefectRollupDB(Base):
+    """
+    Items marcados con defecto por periodo, transportista, camión, tipo de unidad e item.
+    """
+    __tablename__ = "defect_rollups"
+    __table_args__ = (
+        Index("ix_defect_rollups_truck", "granularity", "truck_number", "period_start"),
+    )
+
+    granularity = Column(String, primary_key=True)
+    carrier = Column(String, primary_key=True)
+    truck_number = Column(String, primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    unit = Column(String, primary_key=True)
+    item_key = Column(String, primary_key=True)
+    defects = Column(Integer, nullable=False, default=0)
+
+
+class TruckStatusDB(Base):
+    """
+    Última inspección de cada camión, para consultar su estado sin buscar entre los reportes.
+
+    `defects` tiene un bit por item de `TRUCK_ITEM_KEYS` marcado con defecto ("other" nunca cuenta).
+    Se mantiene en cada escritura de reportes (ver `unit_status.py`).
+    """
+    __tablename__ = "truck_status"
+
+    truck_number = Column(String, primary_key=True)
+    report_id = Column(Integer, ForeignKey("inspection_reports.id", ondelete="CASCADE"), nullable=False, index=True)
+    inspection_date = Column(DateTime, nullable=False)
+    odometer_reading = Column(Integer)
+    defects = Column(Integer, nullable=False, default=0)
+
+
+class TrailerStatusDB(Base):
+    """
+    Última inspección de cada trailer; `defects` usa los bits de `TRAILER_ITEM_KEYS`.
+    """
+    __tablename__ = "trailer_status"
+
+    trailer_number = Column(String, primary_key=True)
+    report_id = Column(Integer, ForeignKey("inspection_reports.id", ondelete="CASCADE"), nullable=False, index=True)
+    truck_number = Column(String)
+    inspection_date = Column(DateTime, nullable=False)
+    defects = Column(Integer, nullable=False, default=0)
+
+
+class IdempotencyKeyDB(Base):
+    """
+    Respuesta guardada de una solicitud con encabezado `Idempotency-Key`, por usuario.
+
+    `request_hash` identifica el endpoint y el cuerpo; `status_code` es nulo
+    mientras la solicitud original sigue en proceso. Las filas vencen según
+    `IDEMPOTENCY_KEY_TTL` (ver `idempotency.py`).
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(LargeBinary, nullable=True)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+
 
-    truck_inspection_items = relationship("TruckInspectionItemsDB", uselist=False, back_populates="report", cascade="all, delete-orphan")
-    trailers = relationship("TrailerDB", back_populates="report", cascade="all, delete-orphan")
\ No newline at end of file
+# Índice FTS5 de observaciones y descripciones de defectos (ver `search.py`)
+event.listen(Base.metadata, "after_create", create_search_index)
@@ -0,0 +1,176 @@
+"""
+Perfil de las consultas SQL de cada solicitud.
+
+Con `SQL_PROFILE=1` se registran eventos en los engines de `database.py` que
+cuentan las sentencias y el tiempo de SQL de la solicitud en curso (se
+identifica con una ContextVar que fija `QueryProfilerMiddleware`). La respuesta
+lleva los totales en `X-SQL-Queries` y `Server-Timing`, y una misma forma de
+sentencia repetida `SQL_N_PLUS_ONE_THRESHOLD` veces o más se marca como
+probable N+1 en `X-SQL-Repeated` y en el log.
+
+Las rutas declaran su presupuesto de consultas con la dependencia
+`query_budget`. Excederlo se registra como advertencia; con
+`SQL_QUERY_BUDGET_STRICT=1` (pensado para las pruebas) la respuesta se
+reemplaza por un 500 que indica la ruta y el conteo.
+
+Sin `SQL_PROFILE` no se instala nada y `query_budget` no hace nada.
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Depends
+from sqlalchemy import event
+
+SQL_PROFILE = os.getenv("SQL_PROFILE", "0") == "1"
+SQL_QUERY_BUDGET_STRICT = os.getenv("SQL_QUERY_BUDGET_STRICT", "0") == "1"
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+logger = logging.getLogger(__name__)
+
+# Listas IN expandidas: "IN (?, ?, ?)" y "IN (?)" son la misma forma
+_EXPANDED_PARAMETERS = re.compile(r"\(\?(?:, \?)+\)")
+
+
+class QueryProfile:
+    """
+    Sentencias ejecutadas durante una solicitud.
+    """
+
+    __slots__ = ("queries", "sql_time", "shapes", "budget", "allow_repeats")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.shapes = Counter()
+        self.budget: Optional[int] = None
+        self.allow_repeats = False
+
+    def record(self, statement: str, duration: float):
+        self.queries += 1
+        self.sql_time += duration
+        self.shapes[_EXPANDED_PARAMETERS.sub("(?)", statement)] += 1
+
+    def repeated(self) -> list:
+        """
+        Formas de sentencia que se repitieron lo suficiente para parecer un N+1.
+        """
+        if self.allow_repeats:
+            return []
+        return [(shape, count) for shape, count in self.shapes.items() if count >= SQL_N_PLUS_ONE_THRESHOLD]
+
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.queries > self.budget
+
+
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _current_profile.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started_at = conn.info.pop("query_start", None)
+    if profile is not None and started_at is not None:
+        profile.record(statement, time.perf_counter() - started_at)
+
+
+def install_query_profiler(*engines):
+    """
+    Registra los eventos de perfil en los engines síncronos indicados (para uno
+    asíncrono, su `sync_engine`).
+    """
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def query_budget(max_queries: Optional[int] = None, allow_repeats: bool = False):
+    """
+    Dependencia de ruta que declara cuántas sentencias SQL puede ejecutar una solicitud.
+
+    `allow_repeats` desactiva la detección de N+1 para rutas que repiten la misma
+    sentencia a propósito, como la carga masiva por lotes.
+
+        @router.get("/", dependencies=[query_budget(8)])
+    """
+    async def declare_budget():
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.budget = max_queries
+            profile.allow_repeats = allow_repeats
+
+    return Depends(declare_budget)
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = _current_profile.set(profile)
+        request = f"{scope['method']} {scope['path']}"
+        replaced = False
+
+        async def send_wrapper(message):
+            nonlocal replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start":
+                # Al empezar la respuesta el endpoint ya terminó; un cuerpo en streaming puede sumar consultas
+                route = getattr(scope.get("route"), "path", request)
+                if profile.over_budget():
+                    logger.warning("%s ejecutó %d consultas SQL (presupuesto %d)", route, profile.queries,
+                                   profile.budget)
+                    if SQL_QUERY_BUDGET_STRICT:
+                        replaced = True
+                        await _send_budget_error(send, route, profile)
+                        return
+                repeated = profile.repeated()
+                for shape, count in repeated:
+                    logger.warning("Posible N+1 en %s: %d veces %s", route, count, shape[:200])
+                headers = list(message.get("headers", []))
+                headers.append((b"x-sql-queries", str(profile.queries).encode()))
+                headers.append((b"server-timing",
+                                f'sql;desc="{profile.queries} queries";dur={profile.sql_time * 1000:.2f}'.encode()))
+                if repeated:
+                    headers.append((b"x-sql-repeated", str(len(repeated)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+
+
+async def _send_budget_error(send, route: str, profile: QueryProfile):
+    body = json.dumps({
+        "detail": f"{route} excedió su presupuesto de consultas SQL: {profile.queries} de {profile.budget}.",
+        "queries": profile.queries,
+        "budget": profile.budget,
+        "repeated": [{"statement": shape, "count": count} for shape, count in profile.repeated()],
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 500,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
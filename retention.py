@@ -0,0 +1,180 @@
+"""
+Eliminación de reportes y purga por antigüedad.
+
+Las tablas hijas de `inspection_reports` (items, trailers, fotos y el estado de
+las unidades) tienen llaves foráneas con ON DELETE CASCADE, así que eliminar
+reportes es una sola sentencia DELETE; antes se leen solo las columnas que hacen
+falta para descontar los agregados.
+
+La purga elimina los reportes anteriores a una fecha en lotes de
+`RETENTION_PURGE_BATCH_SIZE`, cada uno en su propia transacción corta. SQLite
+tiene un solo escritor: entre lotes se suelta el lock de escritura al menos
+tanto tiempo como tomó el lote (y no menos de `RETENTION_PURGE_PAUSE`
+segundos), para que los reportes que envían los inspectores no esperen a que
+termine toda la purga.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import delete, select
+
+from database import AsyncSessionLocal
+from models import (
+    InspectionReportDB,
+    TrailerDB,
+    TrailerInspectionItemsDB,
+    TruckInspectionItemsDB,
+)
+from rollups import RollupDelta
+
+RETENTION_PURGE_BATCH_SIZE = int(os.getenv("RETENTION_PURGE_BATCH_SIZE", "250"))
+RETENTION_PURGE_PAUSE = float(os.getenv("RETENTION_PURGE_PAUSE", "0.05"))
+
+logger = logging.getLogger(__name__)
+
+
+async def delete_reports(db, report_ids: Iterable[int]):
+    """
+    Elimina reportes en la transacción de la sesión y descuenta sus agregados.
+
+    Devuelve los números de camión y de trailer afectados, para recalcular su
+    estado si hace falta. No hace commit.
+    """
+    report_ids = list(report_ids)
+    reports = (await db.execute(
+        select(
+            InspectionReportDB.id,
+            InspectionReportDB.carrier,
+            InspectionReportDB.truck_number,
+            InspectionReportDB.inspection_date,
+            TruckInspectionItemsDB.id.label("checklist_id"),
+            TruckInspectionItemsDB.checks,
+        )
+        .outerjoin(TruckInspectionItemsDB, TruckInspectionItemsDB.report_id == InspectionReportDB.id)
+        .where(InspectionReportDB.id.in_(report_ids))
+    )).all()
+    trailers = (await db.execute(
+        select(
+            TrailerDB.report_id,
+            TrailerDB.trailer_number,
+            TrailerInspectionItemsDB.id.label("checklist_id"),
+            TrailerInspectionItemsDB.checks,
+        )
+        .outerjoin(TrailerInspectionItemsDB, TrailerInspectionItemsDB.trailer_id == TrailerDB.id)
+        .where(TrailerDB.report_id.in_(report_ids))
+    )).all()
+    if not reports:
+        return set(), set()
+
+    rollup_delta = RollupDelta()
+    by_id = {}
+    for report in reports:
+        by_id[report.id] = report
+        if report.checklist_id is not None:
+            rollup_delta.add_checklist(report.carrier, report.truck_number, report.inspection_date, "truck",
+                                       report.checks, TruckInspectionItemsDB.ITEM_KEYS, -1)
+    for trailer in trailers:
+        report = by_id[trailer.report_id]
+        if trailer.checklist_id is not None:
+            rollup_delta.add_checklist(report.carrier, report.truck_number, report.inspection_date, "trailer",
+                                       trailer.checks, TrailerInspectionItemsDB.ITEM_KEYS, -1)
+
+    await db.execute(delete(InspectionReportDB).where(InspectionReportDB.id.in_(by_id)))
+    await rollup_delta.apply(db)
+    return {report.truck_number for report in reports}, {trailer.trailer_number for trailer in trailers}
+
+
+@dataclass
+class PurgeJob:
+    """
+    Avance de una purga en curso o terminada.
+    """
+    before: datetime
+    batch_size: int
+    started_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+    deleted: int = 0
+    batches: int = 0
+    error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+
+async def purge_reports_before(
+        job: PurgeJob,
+        pause: float = RETENTION_PURGE_PAUSE,
+        on_deleted: Optional[Callable[[list], None]] = None,
+):
+    """
+    Elimina los reportes con `inspection_date` anterior a `job.before`, del más antiguo al más reciente.
+
+    El estado de las unidades no se recalcula: si se elimina el último reporte
+    de una unidad, los anteriores ya se eliminaron en lotes previos, así que su
+    fila de estado se va en cascada con él. `on_deleted` recibe los ids de cada
+    lote (por ejemplo, para invalidar cachés).
+    """
+    try:
+        while True:
+            started_at = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                report_ids = (await db.scalars(
+                    select(InspectionReportDB.id)
+                    .where(InspectionReportDB.inspection_date < job.before)
+                    .order_by(InspectionReportDB.inspection_date, InspectionReportDB.id)
+                    .limit(job.batch_size)
+                )).all()
+                if not report_ids:
+                    break
+                await delete_reports(db, report_ids)
+                await db.commit()
+
+            job.deleted += len(report_ids)
+            job.batches += 1
+            if on_deleted is not None:
+                on_deleted(report_ids)
+            # La pausa crece con el lote: la purga tiene el lock de escritura a lo sumo la mitad del tiempo
+            await asyncio.sleep(max(pause, time.perf_counter() - started_at))
+    except Exception as exc:
+        logger.exception("La purga de reportes anteriores a %s se detuvo", job.before)
+        job.error = str(exc)
+    finally:
+        job.finished_at = datetime.now()
+        logger.info("Purga de reportes anteriores a %s: %d eliminados en %d lotes",
+                    job.before, job.deleted, job.batches)
+
+
+class RetentionPurger:
+    """
+    Ejecuta como máximo una purga a la vez en segundo plano y conserva el avance de la última.
+
+    Es local al proceso: con varios workers, cada uno tiene su propia purga.
+    """
+
+    def __init__(self):
+        self.job: Optional[PurgeJob] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, before: datetime, batch_size: int = RETENTION_PURGE_BATCH_SIZE,
+              on_deleted: Optional[Callable[[list], None]] = None) -> Optional[PurgeJob]:
+        """
+        Inicia una purga; devuelve None si ya hay una en curso.
+        """
+        if self.job is not None and self.job.running:
+            return None
+        self.job = PurgeJob(before=before, batch_size=batch_size)
+        self._task = asyncio.create_task(purge_reports_before(self.job, on_deleted=on_deleted))
+        return self.job
+
+    def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+purger = RetentionPurger()
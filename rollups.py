@@ -0,0 +1,176 @@
+"""
+Agregados de inspecciones y defectos para la analítica de la flota.
+
+Cada reporte suma, por día y por mes, una inspección por unidad (camión y cada
+trailer) y un defecto por cada item marcado con defecto. Las filas se guardan
+dos veces: con el número de camión y con `ALL_TRUCKS`, para que las consultas
+por transportista no tengan que sumar camión por camión.
+
+Los agregados se actualizan con deltas en la misma transacción que crea,
+modifica o elimina el reporte; `rebuild_rollups` los recalcula desde cero.
+"""
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.sqlite import insert
+
+from models import (
+    DefectRollupDB,
+    InspectionRollupDB,
+    TrailerInspectionItemsDB,
+    TruckInspectionItemsDB,
+    UNCHECKED_ITEM_KEYS,
+)
+
+GRANULARITIES = ("day", "month")
+ALL_TRUCKS = "*"
+
+
+def period_start(granularity: str, moment: datetime) -> date:
+    if granularity == "month":
+        return moment.date().replace(day=1)
+    return moment.date()
+
+
+class RollupDelta:
+    """
+    Cambios pendientes de los agregados; se suman reportes con signo +1 o -1 y se aplican juntos.
+    """
+
+    def __init__(self):
+        self.inspections = Counter()
+        self.defects = Counter()
+
+    def add_report(self, report, sign: int = 1):
+        if report.truck_inspection_items is not None:
+            self.add_checklist(report.carrier, report.truck_number, report.inspection_date, "truck",
+                               report.truck_inspection_items.checks, TruckInspectionItemsDB.ITEM_KEYS, sign)
+        for trailer in report.trailers:
+            if trailer.inspection_items is not None:
+                self.add_checklist(report.carrier, report.truck_number, report.inspection_date, "trailer",
+                                   trailer.inspection_items.checks, TrailerInspectionItemsDB.ITEM_KEYS, sign)
+
+    def add_checklist(self, carrier: str, truck_number: str, inspection_date: datetime, unit: str,
+                      checks: int, item_keys, sign: int = 1):
+        """
+        Suma una lista de verificación a partir de sus valores, sin necesidad de objetos ORM.
+        """
+        checks = checks or 0
+        defect_keys = [
+            item_key for bit, item_key in enumerate(item_keys)
+            if not checks >> bit & 1 and item_key not in UNCHECKED_ITEM_KEYS
+        ]
+        for granularity in GRANULARITIES:
+            start = period_start(granularity, inspection_date)
+            for truck_key in (truck_number, ALL_TRUCKS):
+                key = (granularity, carrier, truck_key, start, unit)
+                self.inspections[key] += sign
+                for item_key in defect_keys:
+                    self.defects[key + (item_key,)] += sign
+
+    def _rows(self):
+        inspection_rows = [
+            dict(granularity=k[0], carrier=k[1], truck_number=k[2], period_start=k[3], unit=k[4], inspections=v)
+            for k, v in self.inspections.items() if v
+        ]
+        defect_rows = [
+            dict(granularity=k[0], carrier=k[1], truck_number=k[2], period_start=k[3], unit=k[4], item_key=k[5],
+                 defects=v)
+            for k, v in self.defects.items() if v
+        ]
+        return inspection_rows, defect_rows
+
+    async def apply(self, db):
+        """
+        Aplica los deltas con upserts en la transacción de la sesión (`AsyncSession`).
+        """
+        inspection_rows, defect_rows = self._rows()
+        if inspection_rows:
+            await db.execute(_upsert(InspectionRollupDB, "inspections"), inspection_rows)
+        if defect_rows:
+            await db.execute(_upsert(DefectRollupDB, "defects"), defect_rows)
+
+
+def _upsert(model, counter: str):
+    # Sobre la tabla y no la clase: los deltas de una carga masiva son miles de filas
+    # y así no pasan por el procesamiento de inserciones masivas del ORM
+    stmt = insert(model.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[column.name for column in model.__table__.primary_key],
+        set_={counter: getattr(model.__table__.c, counter) + getattr(stmt.excluded, counter)},
+    )
+
+
+_UNIT_SOURCES = {
+    "truck": (TruckInspectionItemsDB, "JOIN truck_inspection_items ci ON ci.report_id = r.id"),
+    "trailer": (
+        TrailerInspectionItemsDB,
+        "JOIN trailers t ON t.report_id = r.id JOIN trailer_inspection_items ci ON ci.trailer_id = t.id",
+    ),
+}
+
+# (granularidad, camión, periodo) de cada agregado, calculado a partir de los totales por día y camión
+_ROLLUP_LEVELS = (
+    ("day", "truck_number", "period_start"),
+    ("day", f"'{ALL_TRUCKS}'", "period_start"),
+    ("month", "truck_number", "date(period_start, 'start of month')"),
+    ("month", f"'{ALL_TRUCKS}'", "date(period_start, 'start of month')"),
+)
+
+
+def rebuild_rollups(connection):
+    """
+    Vacía y recalcula los agregados a partir de los reportes, dentro de la transacción de `connection`.
+
+    Cada tabla de items se recorre una sola vez para obtener los totales por día
+    y camión (una suma por bit); los demás niveles se derivan de esos totales.
+    """
+    connection.execute(delete(DefectRollupDB))
+    connection.execute(delete(InspectionRollupDB))
+
+    for unit, (model, joins) in _UNIT_SOURCES.items():
+        bits = [model.ITEM_KEYS.index(item_key) for item_key in model.DEFECT_ITEM_KEYS]
+        connection.execute(text("DROP TABLE IF EXISTS temp.rollup_daily"))
+        connection.execute(text(
+            "CREATE TEMP TABLE rollup_daily AS "
+            "SELECT r.carrier AS carrier, r.truck_number AS truck_number, "
+            "date(r.inspection_date) AS period_start, COUNT(*) AS inspections, "
+            + ", ".join(f"SUM((ci.checks >> {bit}) & 1 = 0) AS d{bit}" for bit in bits)
+            + f" FROM inspection_reports r {joins} GROUP BY 1, 2, 3"
+        ))
+
+        items = ", ".join(f"({bit}, '{model.ITEM_KEYS[bit]}')" for bit in bits)
+        pick_defects = "CASE items.bit " + " ".join(f"WHEN {bit} THEN d{bit}" for bit in bits) + " END"
+        for granularity, truck_sql, period_sql in _ROLLUP_LEVELS:
+            totals = (
+                f"WITH totals AS (SELECT carrier, {truck_sql} AS truck_number, {period_sql} AS period_start, "
+                f"SUM(inspections) AS inspections, "
+                + ", ".join(f"SUM(d{bit}) AS d{bit}" for bit in bits)
+                + " FROM temp.rollup_daily GROUP BY 1, 2, 3) "
+            )
+            params = {"granularity": granularity, "unit": unit}
+            connection.execute(
+                text(
+                    totals
+                    + "INSERT INTO inspection_rollups "
+                    "(granularity, carrier, truck_number, period_start, unit, inspections) "
+                    "SELECT :granularity, carrier, truck_number, period_start, :unit, inspections FROM totals"
+                ),
+                params,
+            )
+            connection.execute(
+                text(
+                    totals
+                    + f", items(bit, item_key) AS (VALUES {items}) "
+                    "INSERT INTO defect_rollups "
+                    "(granularity, carrier, truck_number, period_start, unit, item_key, defects) "
+                    "SELECT :granularity, carrier, truck_number, period_start, :unit, item_key, defects "
+                    f"FROM (SELECT totals.*, items.item_key AS item_key, {pick_defects} AS defects "
+                    "FROM totals CROSS JOIN items) "
+                    "WHERE defects > 0"
+                ),
+                params,
+            )
+
+    connection.execute(text("DROP TABLE IF EXISTS temp.rollup_daily"))
@@ -0,0 +1,148 @@
+from datetime import date
+from enum import Enum
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from models import Role as RoleModel, DefectRollupDB, InspectionRollupDB, TRUCK_ITEM_KEYS, TRAILER_ITEM_KEYS
+from rollups import ALL_TRUCKS
+from schemas import DefectRate
+from security import get_current_user
+
+router = APIRouter()
+
+_ITEM_KEYS = set(TRUCK_ITEM_KEYS) | set(TRAILER_ITEM_KEYS)
+
+
+class Granularity(str, Enum):
+    DAY = "day"
+    MONTH = "month"
+
+
+class GroupBy(str, Enum):
+    CARRIER = "carrier"
+    TRUCK = "truck"
+
+
+class Unit(str, Enum):
+    TRUCK = "truck"
+    TRAILER = "trailer"
+
+
+def _item_condition(items: List[str]):
+    """
+    Filtro de items: nombres exactos o prefijos terminados en `*` (por ejemplo `lights_*`).
+    """
+    conditions = []
+    for item in items:
+        if item.endswith("*"):
+            prefix = item[:-1]
+            if not any(key.startswith(prefix) for key in _ITEM_KEYS):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Item de inspección desconocido: {item}"
+                )
+            conditions.append(DefectRollupDB.item_key.startswith(prefix, autoescape=True))
+        else:
+            if item not in _ITEM_KEYS:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Item de inspección desconocido: {item}"
+                )
+            conditions.append(DefectRollupDB.item_key == item)
+    return or_(*conditions)
+
+
+@router.get("/defect-rates", response_model=List[DefectRate])
+async def get_defect_rates(
+        granularity: Granularity = Granularity.MONTH,
+        group_by: GroupBy = GroupBy.CARRIER,
+        carrier: Optional[str] = None,
+        truck_number: Optional[str] = None,
+        unit: Optional[Unit] = None,
+        items: Optional[List[str]] = Query(None, alias="item"),
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        limit: int = Query(1000, ge=1, le=10000),
+        db: AsyncSession = Depends(get_async_db),
+        current_user=Depends(get_current_user),
+):
+    """
+    Porcentaje de inspecciones con defecto por item, por día o por mes.
+
+    Se agrupa por transportista o, con `group_by=truck` (o al indicar
+    `truck_number`), por camión. Los items sin defectos en el periodo no se
+    incluyen. Se lee de los agregados en `rollups.py`, no de los reportes.
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden ver la analítica."
+        )
+
+    query = (
+        select(
+            DefectRollupDB.period_start,
+            DefectRollupDB.carrier,
+            DefectRollupDB.truck_number,
+            DefectRollupDB.unit,
+            DefectRollupDB.item_key,
+            InspectionRollupDB.inspections,
+            DefectRollupDB.defects,
+        )
+        .join(
+            InspectionRollupDB,
+            and_(
+                InspectionRollupDB.granularity == DefectRollupDB.granularity,
+                InspectionRollupDB.carrier == DefectRollupDB.carrier,
+                InspectionRollupDB.truck_number == DefectRollupDB.truck_number,
+                InspectionRollupDB.period_start == DefectRollupDB.period_start,
+                InspectionRollupDB.unit == DefectRollupDB.unit,
+            ),
+        )
+        .where(DefectRollupDB.granularity == granularity.value, DefectRollupDB.defects > 0)
+    )
+
+    if truck_number is not None:
+        query = query.where(DefectRollupDB.truck_number == truck_number)
+    elif group_by == GroupBy.TRUCK:
+        query = query.where(DefectRollupDB.truck_number != ALL_TRUCKS)
+    else:
+        query = query.where(DefectRollupDB.truck_number == ALL_TRUCKS)
+
+    if carrier is not None:
+        query = query.where(DefectRollupDB.carrier == carrier)
+    if unit is not None:
+        query = query.where(DefectRollupDB.unit == unit.value)
+    if items:
+        query = query.where(_item_condition(items))
+    if date_from is not None:
+        query = query.where(DefectRollupDB.period_start >= date_from)
+    if date_to is not None:
+        query = query.where(DefectRollupDB.period_start < date_to)
+
+    query = query.order_by(
+        DefectRollupDB.period_start,
+        DefectRollupDB.carrier,
+        DefectRollupDB.truck_number,
+        DefectRollupDB.unit,
+        DefectRollupDB.item_key,
+    ).limit(limit)
+
+    rows = (await db.execute(query)).all()
+    return [
+        DefectRate(
+            period_start=row.period_start,
+            carrier=row.carrier,
+            truck_number=None if row.truck_number == ALL_TRUCKS else row.truck_number,
+            unit=row.unit,
+            item_key=row.item_key,
+            inspections=row.inspections,
+            defects=row.defects,
+            defect_rate=row.defects / row.inspections if row.inspections else 0.0,
+        )
+        for row in rows
+    ]
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from models import Role as RoleModel, TrailerStatusDB, TruckStatusDB, TRAILER_ITEM_KEYS, TRUCK_ITEM_KEYS
+from schemas import TrailerStatus, TruckStatus
+from security import get_current_user
+
+router = APIRouter()
+
+
+def _defect_keys(defects: int, item_keys) -> list:
+    return [item_key for bit, item_key in enumerate(item_keys) if defects >> bit & 1]
+
+
+@router.get("/trucks/{truck_number}/status", response_model=TruckStatus)
+async def get_truck_status(
+        truck_number: str,
+        db: AsyncSession = Depends(get_async_db),
+        current_user=Depends(get_current_user),
+):
+    """
+    Estado actual de un camión según su última inspección; `cleared` indica que no tiene defectos.
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden ver el estado de las unidades."
+        )
+
+    truck_status = await db.get(TruckStatusDB, truck_number)
+    if not truck_status:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No hay inspecciones registradas para el camión."
+        )
+
+    return TruckStatus(
+        truck_number=truck_status.truck_number,
+        report_id=truck_status.report_id,
+        inspection_date=truck_status.inspection_date,
+        odometer_reading=truck_status.odometer_reading,
+        defects=_defect_keys(truck_status.defects, TRUCK_ITEM_KEYS),
+        cleared=truck_status.defects == 0,
+    )
+
+
+@router.get("/trailers/{trailer_number}/status", response_model=TrailerStatus)
+async def get_trailer_status(
+        trailer_number: str,
+        db: AsyncSession = Depends(get_async_db),
+        current_user=Depends(get_current_user),
+):
+    """
+    Estado actual de un trailer según su última inspección.
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden ver el estado de las unidades."
+        )
+
+    trailer_status = await db.get(TrailerStatusDB, trailer_number)
+    if not trailer_status:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No hay inspecciones registradas para el trailer."
+        )
+
+    return TrailerStatus(
+        trailer_number=trailer_status.trailer_number,
+        report_id=trailer_status.report_id,
+        truck_number=trailer_status.truck_number,
+        inspection_date=trailer_status.inspection_date,
+        defects=_defect_keys(trailer_status.defects, TRAILER_ITEM_KEYS),
+        cleared=trailer_status.defects == 0,
+    )
@@ -0,0 +1,65 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response, status
+
+from hashing import password_hasher
+from metrics import metric_lines, registry
+from routers.vehicle_inspection_reports import report_cache
+from security import principal_cache
+
+# Si se define, /metrics exige `Authorization: Bearer <METRICS_TOKEN>` (bearer_token en Prometheus)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter()
+
+
+def _hasher_lines():
+    stats = password_hasher.stats()
+    yield from metric_lines("password_hash_workers", "gauge", "Hilos del pool de bcrypt.",
+                            [(None, stats["workers"])])
+    yield from metric_lines("password_hash_pending", "gauge", "Operaciones de bcrypt en curso o en espera.",
+                            [(None, stats["pending"])])
+    yield from metric_lines("password_hash_completed_total", "counter", "Operaciones de bcrypt terminadas.",
+                            [(None, stats["completed"])])
+    yield from metric_lines("password_hash_rejected_total", "counter",
+                            "Operaciones de bcrypt rechazadas con 503 por la cola llena.",
+                            [(None, stats["rejected"])])
+    yield from metric_lines("password_hash_queue_wait_seconds_total", "counter",
+                            "Espera acumulada en la cola de bcrypt.",
+                            [(None, password_hasher.queue_wait_total)])
+
+
+def _cache_lines(caches: dict):
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    for key, metric_type, description in (
+        ("size", "gauge", "Entradas en la caché."),
+        ("hits", "counter", "Aciertos de la caché."),
+        ("misses", "counter", "Fallos de la caché."),
+    ):
+        name = f"cache_{key}_total" if metric_type == "counter" else f"cache_{key}"
+        yield from metric_lines(name, metric_type, description,
+                                [({"cache": cache}, values[key]) for cache, values in stats.items()])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Métricas en formato de texto de Prometheus.
+    """
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas inválido.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    lines = [
+        *registry.lines(),
+        *_hasher_lines(),
+        *_cache_lines({"principal": principal_cache, "report": report_cache}),
+    ]
+    return Response(content="\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
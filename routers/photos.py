@@ -0,0 +1,274 @@
+import os
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from cache import etag_matches
+from schemas import PhotoUploadResponse
+from security import get_current_user
+from storage import (
+    MEDIA_TYPES,
+    PHOTO_MAX_BYTES,
+    PhotoTooLarge,
+    PhotoWriter,
+    UnsupportedPhotoType,
+    derivative_path,
+    is_valid_photo_ref,
+    photo_path,
+)
+from thumbnails import has_derivatives, pipeline
+
+router = APIRouter()
+
+# El nombre de cada archivo es el hash de su contenido, así que nunca cambia
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Mientras la versión reducida no existe se sirve el original, sin cachearlo a largo plazo
+FALLBACK_CACHE_CONTROL = "public, max-age=60"
+
+# Campo del formulario con la foto; el cuerpo se lee a mano, así que se describe aquí para OpenAPI
+PHOTO_FIELD = "photo"
+PHOTO_UPLOAD_OPENAPI = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object",
+    "required": [PHOTO_FIELD],
+    "properties": {PHOTO_FIELD: {"type": "string", "format": "binary"}},
+}}}}}
+
+
+class PhotoVariant(str, Enum):
+    THUMB = "thumb"
+    MEDIUM = "medium"
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """
+    FileResponse que entrega el archivo con las extensiones ASGI `http.response.pathsend`
+    o `http.response.zerocopysend` (sendfile) cuando el servidor las ofrece, en lugar
+    de leerlo por bloques en Python.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._extensions = scope.get("extensions") or {}
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if send_header_only:
+            return await super()._handle_simple(send, send_header_only)
+
+        if "http.response.pathsend" in self._extensions:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        elif "http.response.zerocopysend" in self._extensions:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            with open(self.path, "rb") as file:
+                await send({"type": "http.response.zerocopysend", "file": file, "more_body": False})
+        else:
+            await super()._handle_simple(send, send_header_only)
+
+    async def _handle_single_range(
+            self, send: Send, start: int, end: int, file_size: int, send_header_only: bool
+    ) -> None:
+        if send_header_only or "http.response.zerocopysend" not in self._extensions:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        with open(self.path, "rb") as file:
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": file,
+                "offset": start,
+                "count": end - start,
+                "more_body": False,
+            })
+
+
+class PhotoForm:
+    """
+    Callbacks de `MultipartParser` que separan los bloques del campo `photo` del resto del formulario.
+
+    Los callbacks no pueden esperar, así que los bloques se acumulan en `chunks` y quien
+    alimenta al parser los escribe después de cada `write`.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.found = False
+        self.complete = False
+        self._in_photo = False
+        self._disposition = b""
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        # Si el campo se repite, solo cuenta el primero
+        self._in_photo = options.get(b"name") == PHOTO_FIELD.encode() and not self.found
+        self.found = self.found or self._in_photo
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_photo:
+            self.chunks.append(data[start:end])
+
+    def on_part_end(self):
+        if self._in_photo:
+            self.complete = True
+        self._in_photo = False
+
+
+async def receive_photo(request: Request) -> str:
+    """
+    Lee el cuerpo multipart a medida que llega y escribe el campo `photo` directamente con
+    un `PhotoWriter`, en el threadpool para que la escritura a disco no bloquee otras solicitudes.
+    """
+    media_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if media_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Se esperaba un cuerpo multipart/form-data."
+        )
+
+    form = PhotoForm()
+    parser = MultipartParser(options[b"boundary"], form.callbacks())
+    writer = await run_in_threadpool(PhotoWriter)
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if form.chunks:
+                await run_in_threadpool(writer.write, b"".join(form.chunks))
+                form.chunks.clear()
+        parser.finalize()
+    except MultipartParseError:
+        writer.discard()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El cuerpo multipart está mal formado."
+        )
+    except BaseException:
+        writer.discard()
+        raise
+
+    if not form.complete:
+        writer.discard()
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Falta el archivo '{PHOTO_FIELD}' o llegó incompleto."
+        )
+    try:
+        return await run_in_threadpool(writer.finish)
+    except BaseException:
+        writer.discard()
+        raise
+
+
+@router.post("/", response_model=PhotoUploadResponse, status_code=status.HTTP_201_CREATED,
+             openapi_extra=PHOTO_UPLOAD_OPENAPI)
+async def upload_photo(
+        request: Request,
+        current_user=Depends(get_current_user),
+):
+    """
+    Subir la foto de un item de inspección (`multipart/form-data`, campo `photo`).
+
+    La referencia devuelta es la que se guarda en los campos `*_photo` del reporte.
+    El archivo se escribe una sola vez, en el almacenamiento, mientras llega (ver
+    `receive_photo`), en lugar de copiarse primero al archivo temporal de `UploadFile`;
+    una foto demasiado grande o de un formato no soportado se rechaza sin leer el resto.
+    Las versiones reducidas se generan después, en segundo plano.
+    """
+    try:
+        photo_ref = await receive_photo(request)
+    except PhotoTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"La foto excede el tamaño máximo de {PHOTO_MAX_BYTES} bytes."
+        )
+    except UnsupportedPhotoType:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Formato de imagen no soportado."
+        )
+
+    if not has_derivatives(photo_ref):
+        pipeline.submit(photo_ref)
+
+    return PhotoUploadResponse(photo_ref=photo_ref, url=f"/photos/{photo_ref}")
+
+
+@router.get("/{photo_ref}")
+async def get_photo(
+        photo_ref: str,
+        variant: Optional[PhotoVariant] = None,
+        if_none_match: Optional[str] = Header(None),
+):
+    """
+    Obtener una foto o una de sus versiones reducidas (`?variant=thumb|medium`).
+
+    El ETag se deriva del hash del contenido; soporta `If-None-Match` (304) y
+    solicitudes por rango para reanudar descargas.
+    """
+    if not is_valid_photo_ref(photo_ref):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Foto no encontrada."
+        )
+
+    digest, extension = photo_ref.split(".")
+    path = photo_path(photo_ref)
+    etag = f'"{digest}"'
+    media_type = MEDIA_TYPES[extension]
+    cache_control = IMMUTABLE_CACHE_CONTROL
+
+    if variant is not None:
+        variant_path = derivative_path(photo_ref, variant.value)
+        if os.path.isfile(variant_path):
+            path = variant_path
+            etag = f'"{digest}-{variant.value}"'
+            media_type = MEDIA_TYPES["webp"]
+        else:
+            cache_control = FALLBACK_CACHE_CONTROL
+
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Foto no encontrada."
+        )
+
+    return ZeroCopyFileResponse(path, media_type=media_type, headers=headers)
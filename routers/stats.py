@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from hashing import password_hasher
+from models import Role as RoleModel
+from routers.vehicle_inspection_reports import report_cache
+from security import get_current_user, principal_cache
+
+router = APIRouter()
+
+
+@router.get("/")
+async def get_stats(current_user=Depends(get_current_user)):
+    """
+    Métricas internas de la aplicación (colas, cachés, etc.).
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden ver las métricas."
+        )
+
+    return {
+        "password_hashing": password_hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "report_cache": report_cache.stats(),
+    }
@@ -1,52 +1,64 @@
 from datetime import timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from database import get_db
+from database import get_async_db
 from models import User as UserModel, Role as RoleModel
 from schemas import UserCreate, UserRead, UserUpdate, LoginRequest
-from config import pwd_context
-from security import create_access_token
+from hashing import password_hasher
+from profiling import query_budget
+from security import Principal, create_access_token, get_current_user, invalidate_principal
 
 router = APIRouter()
 
 
 @router.post("/", response_model=UserRead)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Crear un nuevo usuario"""
-    existing_user = db.query(UserModel).filter(UserModel.username == user.username).first()
+    existing_user = await db.scalar(select(UserModel).where(UserModel.username == user.username))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El usuario ya existe",
         )
 
-    hashed_password = pwd_context.hash(user.password)
+    # Cierra la transacción de lectura para no retener una conexión del pool mientras se calcula el hash
+    await db.commit()
+    hashed_password = await password_hasher.hash(user.password)
     db_user = UserModel(
         username=user.username,
         hashed_password=hashed_password,
         role=user.role,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return db_user
 
 
 @router.get("/", response_model=List[UserRead])
-def list_users(db: Session = Depends(get_db)):
+async def list_users(db: AsyncSession = Depends(get_async_db)):
     """Obtener una lista de usuarios"""
-    users = db.query(UserModel).all()
+    users = (await db.scalars(select(UserModel))).all()
     return users
 
 
+# Sin consultas cuando el usuario del token ya está en la caché de `get_current_user`
+@router.get("/me", response_model=UserRead, dependencies=[query_budget(1)])
+async def get_me(current_user: Principal = Depends(get_current_user)):
+    """
+    Obtener el usuario autenticado.
+    """
+    return current_user
+
+
 @router.get("/{user_id}", response_model=UserRead)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Obtener un usuario por ID.
     """
-    db_user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    db_user = await db.get(UserModel, user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -56,19 +68,25 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.patch("/{user_id}", response_model=UserRead)
-def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get_db)):
+async def update_user(user_id: int, user_update: UserUpdate, db: AsyncSession = Depends(get_async_db)):
     """
     Modificar información de un usuario.
     """
-    db_user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    # El hash se calcula antes de abrir la transacción para no retener una conexión del pool
+    hashed_password = None
+    if user_update.password is not None:
+        hashed_password = await password_hasher.hash(user_update.password)
+
+    db_user = await db.get(UserModel, user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado"
         )
+    previous_username = db_user.username
 
     if user_update.username is not None:
-        existing_user = db.query(UserModel).filter(UserModel.username == user_update.username).first()
+        existing_user = await db.scalar(select(UserModel).where(UserModel.username == user_update.username))
         if existing_user and existing_user.id != user_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -76,8 +94,8 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
             )
         db_user.username = user_update.username
 
-    if user_update.password is not None:
-        db_user.hashed_password = pwd_context.hash(user_update.password)
+    if hashed_password is not None:
+        db_user.hashed_password = hashed_password
 
     if user_update.role is not None:
         if user_update.role not in [RoleModel.USER, RoleModel.ADMIN]:
@@ -87,46 +105,56 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
             )
         db_user.role = user_update.role
 
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    invalidate_principal(previous_username)
     return db_user
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Eliminar un usuario por ID.
     """
-    db_user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    db_user = await db.get(UserModel, user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado"
         )
 
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    await db.commit()
+    invalidate_principal(db_user.username)
     return
 
 
-@router.post("/login")
-def login(user: LoginRequest, db: Session = Depends(get_db)):
+# Búsqueda del usuario y, si cambió el costo de bcrypt, el hash regenerado
+@router.post("/login", dependencies=[query_budget(2)])
+async def login(user: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Validar las credenciales de un usuario.
     """
-    db_user = db.query(UserModel).filter(UserModel.username == user.username).first()
+    db_user = await db.scalar(select(UserModel).where(UserModel.username == user.username))
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales inválidas."
         )
 
-    if not pwd_context.verify(user.password, db_user.hashed_password):
+    # Cierra la transacción de lectura para no retener una conexión del pool mientras se calcula el hash
+    await db.commit()
+    verified, new_hash = await password_hasher.verify_and_update(user.password, db_user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales inválidas."
         )
 
+    # El hash se generó con otro costo de bcrypt; se reemplaza por uno con el costo actual
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
+
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
         data={"sub": db_user.username},
@@ -1,831 +1,724 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from models import Role as RoleModel, InspectionReportDB, TruckInspectionItemsDB, TrailerDB, TrailerInspectionItemsDB
-from schemas import VehicleInspectionReport, TruckInspectionItems, TrailerInspectionItems, Trailer
-from database import get_db
+import base64
+import binascii
+import csv
+import hashlib
+import io
+import math
+import os
+from datetime import datetime
+from enum import Enum
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Optional, Tuple
+from models import (
+    Role as RoleModel,
+    InspectionReportDB,
+    TrailerDB,
+    TrailerInspectionItemsDB,
+    TruckInspectionItemsDB,
+)
+from schemas import (
+    MAX_TRAILERS,
+    VehicleInspectionReport,
+    VehicleInspectionReportPage,
+    VehicleInspectionReportUpdate,
+    BulkIngestResult,
+    BulkItemResult,
+    ReportSearchHit,
+    ReportSearchResults,
+    RetentionPurgeStatus,
+)
+from cache import TTLCache, etag_matches
+from database import AsyncSessionLocal, get_async_db
+from ingest import MalformedBody, insert_reports, iter_json_array, iter_ndjson
+from mappers import apply_report_changes, to_report_read
+from idempotency import claim_key, release_key, replay_response, request_fingerprint, store_response
+from retention import RETENTION_PURGE_BATCH_SIZE, delete_reports, purger
+from rollups import RollupDelta
+from search import match_expression, search_reports
+from unit_status import refresh_status
+from profiling import query_budget
 from security import get_current_user
 
 
 router = APIRouter(prefix="/vehicle-inspection-reports", tags=["Vehicle Inspection Reports"])
 
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "512"))
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "300"))
 
-@router.post("/", response_model=VehicleInspectionReport)
-def create_vehicle_inspection_report(
-        report_data: VehicleInspectionReport,
-        db: Session = Depends(get_db),
-        current_user=Depends(get_current_user),
-):
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BULK_MAX_REPORTS = int(os.getenv("BULK_MAX_REPORTS", "100000"))
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+LIST_MAX_LIMIT = 200
+# selectinload carga cada relación en bloques de este número de ids
+SELECTIN_CHUNK_SIZE = 500
+
+# Cuerpos JSON ya serializados de reportes individuales: report_id -> (version, body)
+report_cache = TTLCache(maxsize=REPORT_CACHE_SIZE, ttl=REPORT_CACHE_TTL)
+
+
+def _report_etag(report_id: int, version: int) -> str:
+    return f'"{report_id}-{version}"'
+
+
+def _select_reports_with_items():
     """
-    Crear un reporte de inspección de vehículo.
+    Consulta de reportes que carga items del camión, trailers e items de cada
+    trailer con selectin: una consulta por relación y por cada bloque de
+    SELECTIN_CHUNK_SIZE ids, no una por reporte.
     """
-    if current_user.role != RoleModel.USER:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo los usuarios con rol 'user' pueden crear reportes."
-        )
-
-    # 1) Crear el reporte principal
-    db_report = InspectionReportDB(
-        carrier=report_data.carrier,
-        address=report_data.address,
-        inspection_date=report_data.inspection_date,
-        truck_number=report_data.truck_number,
-        odometer_reading=report_data.odometer_reading,
-        remarks=report_data.remarks
-    )
-    db.add(db_report)
-    db.commit()
-    db.refresh(db_report)
-
-    # 2) Crear los items de inspección del camión
-    truck_items_data = report_data.truck_inspection_items
-    db_truck_items = TruckInspectionItemsDB(
-        report_id=db_report.id,
-        air_compressor=truck_items_data.air_compressor,
-        air_compressor_photo=truck_items_data.air_compressor_photo,
-        air_lines=truck_items_data.air_lines,
-        air_lines_photo=truck_items_data.air_lines_photo,
-        battery=truck_items_data.battery,
-        battery_photo=truck_items_data.battery_photo,
-        belts_and_hoses=truck_items_data.belts_and_hoses,
-        belts_and_hoses_photo=truck_items_data.belts_and_hoses_photo,
-        body=truck_items_data.body,
-        body_photo=truck_items_data.body_photo,
-        brake_accessories=truck_items_data.brake_accessories,
-        brake_accessories_photo=truck_items_data.brake_accessories_photo,
-        brake_parking=truck_items_data.brake_parking,
-        brake_parking_photo=truck_items_data.brake_parking_photo,
-        brake_service=truck_items_data.brake_service,
-        brake_service_photo=truck_items_data.brake_service_photo,
-        clutch=truck_items_data.clutch,
-        clutch_photo=truck_items_data.clutch_photo,
-        coupling_devices=truck_items_data.coupling_devices,
-        coupling_devices_photo=truck_items_data.coupling_devices_photo,
-        defroster_heater=truck_items_data.defroster_heater,
-        defroster_heater_photo=truck_items_data.defroster_heater_photo,
-        drive_line=truck_items_data.drive_line,
-        drive_line_photo=truck_items_data.drive_line_photo,
-        engine=truck_items_data.engine,
-        engine_photo=truck_items_data.engine_photo,
-        exhaust=truck_items_data.exhaust,
-        exhaust_photo=truck_items_data.exhaust_photo,
-        fifth_wheel=truck_items_data.fifth_wheel,
-        fifth_wheel_photo=truck_items_data.fifth_wheel_photo,
-        fluid_levels=truck_items_data.fluid_levels,
-        fluid_levels_photo=truck_items_data.fluid_levels_photo,
-        frame_and_assembly=truck_items_data.frame_and_assembly,
-        frame_and_assembly_photo=truck_items_data.frame_and_assembly_photo,
-        front_axle=truck_items_data.front_axle,
-        front_axle_photo=truck_items_data.front_axle_photo,
-        fuel_tanks=truck_items_data.fuel_tanks,
-        fuel_tanks_photo=truck_items_data.fuel_tanks_photo,
-        horn=truck_items_data.horn,
-        horn_photo=truck_items_data.horn_photo,
-        lights_head_stop=truck_items_data.lights_head_stop,
-        lights_head_stop_photo=truck_items_data.lights_head_stop_photo,
-        lights_tail_dash=truck_items_data.lights_tail_dash,
-        lights_tail_dash_photo=truck_items_data.lights_tail_dash_photo,
-        lights_turn_indicators=truck_items_data.lights_turn_indicators,
-        lights_turn_indicators_photo=truck_items_data.lights_turn_indicators_photo,
-        lights_clearance_marker=truck_items_data.lights_clearance_marker,
-        lights_clearance_marker_photo=truck_items_data.lights_clearance_marker_photo,
-        mirrors=truck_items_data.mirrors,
-        mirrors_photo=truck_items_data.mirrors_photo,
-        muffler=truck_items_data.muffler,
-        muffler_photo=truck_items_data.muffler_photo,
-        oil_pressure=truck_items_data.oil_pressure,
-        oil_pressure_photo=truck_items_data.oil_pressure_photo,
-        radiator=truck_items_data.radiator,
-        radiator_photo=truck_items_data.radiator_photo,
-        rear_end=truck_items_data.rear_end,
-        rear_end_photo=truck_items_data.rear_end_photo,
-        reflectors=truck_items_data.reflectors,
-        reflectors_photo=truck_items_data.reflectors_photo,
-        safety_fire_extinguisher=truck_items_data.safety_fire_extinguisher,
-        safety_fire_extinguisher_photo=truck_items_data.safety_fire_extinguisher_photo,
-        safety_flags_flares_fusees=truck_items_data.safety_flags_flares_fusees,
-        safety_flags_flares_fusees_photo=truck_items_data.safety_flags_flares_fusees_photo,
-        safety_reflective_triangles=truck_items_data.safety_reflective_triangles,
-        safety_reflective_triangles_photo=truck_items_data.safety_reflective_triangles_photo,
-        safety_spare_bulbs_and_fuses=truck_items_data.safety_spare_bulbs_and_fuses,
-        safety_spare_bulbs_and_fuses_photo=truck_items_data.safety_spare_bulbs_and_fuses_photo,
-        safety_spare_seal_beam=truck_items_data.safety_spare_seal_beam,
-        safety_spare_seal_beam_photo=truck_items_data.safety_spare_seal_beam_photo,
-        starter=truck_items_data.starter,
-        starter_photo=truck_items_data.starter_photo,
-        steering=truck_items_data.steering,
-        steering_photo=truck_items_data.steering_photo,
-        suspension_system=truck_items_data.suspension_system,
-        suspension_system_photo=truck_items_data.suspension_system_photo,
-        tire_chains=truck_items_data.tire_chains,
-        tire_chains_photo=truck_items_data.tire_chains_photo,
-        tires=truck_items_data.tires,
-        tires_photo=truck_items_data.tires_photo,
-        transmission=truck_items_data.transmission,
-        transmission_photo=truck_items_data.transmission_photo,
-        trip_recorder=truck_items_data.trip_recorder,
-        trip_recorder_photo=truck_items_data.trip_recorder_photo,
-        wheels_and_rims=truck_items_data.wheels_and_rims,
-        wheels_and_rims_photo=truck_items_data.wheels_and_rims_photo,
-        windows=truck_items_data.windows,
-        windows_photo=truck_items_data.windows_photo,
-        windshield_wipers=truck_items_data.windshield_wipers,
-        windshield_wipers_photo=truck_items_data.windshield_wipers_photo,
-        other=truck_items_data.other,
-        other_description=truck_items_data.other_description,
-        other_photo=truck_items_data.other_photo if hasattr(truck_items_data, "other_photo") else None
+    return select(InspectionReportDB).options(
+        selectinload(InspectionReportDB.truck_inspection_items),
+        selectinload(InspectionReportDB.trailers).selectinload(TrailerDB.inspection_items),
     )
 
-    db.add(db_truck_items)
-    db.commit()
-    db.refresh(db_truck_items)
 
-    # 3) Crear los items de inspección de cada trailer
-    for trailer in report_data.trailers:
-        db_trailer = TrailerDB(
-            report_id=trailer.report_id,
-            trailer_number=trailer.trailer_number,
-        )
-        db.add(db_trailer)
-        db.commit()
-        db.refresh(db_trailer)
-
-        trailer_items_data = trailer.inspection_items
-        db_trailer_inspection = TrailerInspectionItemsDB(
-            trailer_id=db_trailer.id,
-            brake_connections=trailer_items_data.brake_connections,
-            brake_connections_photo=trailer_items_data.brake_connections_photo,
-            brakes=trailer_items_data.brakes,
-            brakes_photo=trailer_items_data.brakes_photo,
-            coupling_devices=trailer_items_data.coupling_devices,
-            coupling_devices_photo=trailer_items_data.coupling_devices_photo,
-            coupling_king_pin=trailer_items_data.coupling_king_pin,
-            coupling_king_pin_photo=trailer_items_data.coupling_king_pin_photo,
-            doors=trailer_items_data.doors,
-            doors_photo=trailer_items_data.doors_photo,
-            hitch=trailer_items_data.hitch,
-            hitch_photo=trailer_items_data.hitch_photo,
-            landing_gear=trailer_items_data.landing_gear,
-            landing_gear_photo=trailer_items_data.landing_gear_photo,
-            lights_all=trailer_items_data.lights_all,
-            lights_all_photo=trailer_items_data.lights_all_photo,
-            reflectors_reflective_tape=trailer_items_data.reflectors_reflective_tape,
-            reflectors_reflective_tape_photo=trailer_items_data.reflectors_reflective_tape_photo,
-            roof=trailer_items_data.roof,
-            roof_photo=trailer_items_data.roof_photo,
-            suspension_system=trailer_items_data.suspension_system,
-            suspension_system_photo=trailer_items_data.suspension_system_photo,
-            tarpaulin=trailer_items_data.tarpaulin,
-            tarpaulin_photo=trailer_items_data.tarpaulin_photo,
-            tires=trailer_items_data.tires,
-            tires_photo=trailer_items_data.tires_photo,
-            wheels_and_rims=trailer_items_data.wheels_and_rims,
-            wheels_and_rims_photo=trailer_items_data.wheels_and_rims_photo,
-            other=trailer_items_data.other,
-            other_description=trailer_items_data.other_description,
-            other_photo=trailer_items_data.other_photo
+def _filter_reports(
+        query,
+        carrier: Optional[str],
+        truck_number: Optional[str],
+        trailer_number: Optional[str],
+        date_from: Optional[datetime],
+        date_to: Optional[datetime],
+):
+    """
+    Aplica los filtros opcionales del listado y la exportación de reportes.
+    """
+    if carrier is not None:
+        query = query.where(InspectionReportDB.carrier == carrier)
+    if truck_number is not None:
+        query = query.where(InspectionReportDB.truck_number == truck_number)
+    if trailer_number is not None:
+        # IN sobre ix_trailers_number_report; con any() SQLite recorría los reportes y buscaba sus trailers uno por uno
+        query = query.where(
+            InspectionReportDB.id.in_(select(TrailerDB.report_id).where(TrailerDB.trailer_number == trailer_number))
         )
+    if date_from is not None:
+        query = query.where(InspectionReportDB.inspection_date >= date_from)
+    if date_to is not None:
+        query = query.where(InspectionReportDB.inspection_date < date_to)
+    return query
 
-        db.add(db_trailer_inspection)
 
-    db.commit()
+def _encode_cursor(inspection_date: datetime, report_id: int) -> str:
+    """
+    Codifica la posición (inspection_date, id) del último reporte de una página.
+    """
+    raw = f"{inspection_date.isoformat()}|{report_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
 
-    return report_data
 
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decodifica un cursor generado por `_encode_cursor`.
+    """
+    try:
+        inspection_date, report_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(inspection_date), int(report_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido."
+        )
 
-@router.get("/", response_model=List[VehicleInspectionReport])
-def list_vehicle_inspection_reports(
-        db: Session = Depends(get_db),
+
+# Usuario, clave de idempotencia (2), reporte e items del camión (2), trailers e items de cada trailer
+# (2 y 2, ver `ingest._insert_with_ids`), fotos (2), agregados (2) y estado de las unidades (2)
+@router.post("/", response_model=VehicleInspectionReport, dependencies=[query_budget(15)])
+async def create_vehicle_inspection_report(
+        report_data: VehicleInspectionReport,
+        idempotency_key: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db),
         current_user=Depends(get_current_user),
 ):
     """
-    Listar todos los reportes de inspección de vehículo.
+    Crear un reporte de inspección de vehículo.
+
+    Con el encabezado `Idempotency-Key`, un reintento con la misma clave devuelve
+    la respuesta original en lugar de crear un reporte duplicado.
     """
-    if current_user.role != RoleModel.ADMIN:
+    if current_user.role != RoleModel.USER:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo los usuarios con rol 'admin' pueden ver los reportes."
+            detail="Solo los usuarios con rol 'user' pueden crear reportes."
         )
 
-    db_reports = db.query(InspectionReportDB).all()
-    results = []
+    response_body = report_data.model_dump_json()
+    if idempotency_key is not None:
+        request_hash = request_fingerprint("create", response_body.encode())
+        # Primera escritura de la transacción: un duplicado concurrente espera aquí hasta el commit
+        existing = await claim_key(db, current_user.id, idempotency_key, request_hash)
+        if existing is not None:
+            return replay_response(existing, request_hash)
+
+    # Igual que la carga masiva: una inserción por tabla, sin importar cuántos trailers tenga el
+    # reporte, y los agregados y el estado de las unidades en la misma transacción
+    await insert_reports(db, [report_data])
+    if idempotency_key is not None:
+        await store_response(db, current_user.id, idempotency_key, status.HTTP_200_OK, response_body)
+    await db.commit()
 
-    for report in db_reports:
-        db_truck_items = (
-            db.query(TruckInspectionItemsDB)
-            .filter_by(report_id=report.id)
-            .first()
-        )
-        truck_inspection = TruckInspectionItems()
-        if db_truck_items:
-            truck_inspection = TruckInspectionItems(
-                air_compressor=db_truck_items.air_compressor,
-                air_compressor_photo=db_truck_items.air_compressor_photo,
-                air_lines=db_truck_items.air_lines,
-                air_lines_photo=db_truck_items.air_lines_photo,
-                battery=db_truck_items.battery,
-                battery_photo=db_truck_items.battery_photo,
-                belts_and_hoses=db_truck_items.belts_and_hoses,
-                belts_and_hoses_photo=db_truck_items.belts_and_hoses_photo,
-                body=db_truck_items.body,
-                body_photo=db_truck_items.body_photo,
-                brake_accessories=db_truck_items.brake_accessories,
-                brake_accessories_photo=db_truck_items.brake_accessories_photo,
-                brake_parking=db_truck_items.brake_parking,
-                brake_parking_photo=db_truck_items.brake_parking_photo,
-                brake_service=db_truck_items.brake_service,
-                brake_service_photo=db_truck_items.brake_service_photo,
-                clutch=db_truck_items.clutch,
-                clutch_photo=db_truck_items.clutch_photo,
-                coupling_devices=db_truck_items.coupling_devices,
-                coupling_devices_photo=db_truck_items.coupling_devices_photo,
-                defroster_heater=db_truck_items.defroster_heater,
-                defroster_heater_photo=db_truck_items.defroster_heater_photo,
-                drive_line=db_truck_items.drive_line,
-                drive_line_photo=db_truck_items.drive_line_photo,
-                engine=db_truck_items.engine,
-                engine_photo=db_truck_items.engine_photo,
-                exhaust=db_truck_items.exhaust,
-                exhaust_photo=db_truck_items.exhaust_photo,
-                fifth_wheel=db_truck_items.fifth_wheel,
-                fifth_wheel_photo=db_truck_items.fifth_wheel_photo,
-                fluid_levels=db_truck_items.fluid_levels,
-                fluid_levels_photo=db_truck_items.fluid_levels_photo,
-                frame_and_assembly=db_truck_items.frame_and_assembly,
-                frame_and_assembly_photo=db_truck_items.frame_and_assembly_photo,
-                front_axle=db_truck_items.front_axle,
-                front_axle_photo=db_truck_items.front_axle_photo,
-                fuel_tanks=db_truck_items.fuel_tanks,
-                fuel_tanks_photo=db_truck_items.fuel_tanks_photo,
-                horn=db_truck_items.horn,
-                horn_photo=db_truck_items.horn_photo,
-                lights_head_stop=db_truck_items.lights_head_stop,
-                lights_head_stop_photo=db_truck_items.lights_head_stop_photo,
-                lights_tail_dash=db_truck_items.lights_tail_dash,
-                lights_tail_dash_photo=db_truck_items.lights_tail_dash_photo,
-                lights_turn_indicators=db_truck_items.lights_turn_indicators,
-                lights_turn_indicators_photo=db_truck_items.lights_turn_indicators_photo,
-                lights_clearance_marker=db_truck_items.lights_clearance_marker,
-                lights_clearance_marker_photo=db_truck_items.lights_clearance_marker_photo,
-                mirrors=db_truck_items.mirrors,
-                mirrors_photo=db_truck_items.mirrors_photo,
-                muffler=db_truck_items.muffler,
-                muffler_photo=db_truck_items.muffler_photo,
-                oil_pressure=db_truck_items.oil_pressure,
-                oil_pressure_photo=db_truck_items.oil_pressure_photo,
-                radiator=db_truck_items.radiator,
-                radiator_photo=db_truck_items.radiator_photo,
-                rear_end=db_truck_items.rear_end,
-                rear_end_photo=db_truck_items.rear_end_photo,
-                reflectors=db_truck_items.reflectors,
-                reflectors_photo=db_truck_items.reflectors_photo,
-                safety_fire_extinguisher=db_truck_items.safety_fire_extinguisher,
-                safety_fire_extinguisher_photo=db_truck_items.safety_fire_extinguisher_photo,
-                safety_flags_flares_fusees=db_truck_items.safety_flags_flares_fusees,
-                safety_flags_flares_fusees_photo=db_truck_items.safety_flags_flares_fusees_photo,
-                safety_reflective_triangles=db_truck_items.safety_reflective_triangles,
-                safety_reflective_triangles_photo=db_truck_items.safety_reflective_triangles_photo,
-                safety_spare_bulbs_and_fuses=db_truck_items.safety_spare_bulbs_and_fuses,
-                safety_spare_bulbs_and_fuses_photo=db_truck_items.safety_spare_bulbs_and_fuses_photo,
-                safety_spare_seal_beam=db_truck_items.safety_spare_seal_beam,
-                safety_spare_seal_beam_photo=db_truck_items.safety_spare_seal_beam_photo,
-                starter=db_truck_items.starter,
-                starter_photo=db_truck_items.starter_photo,
-                steering=db_truck_items.steering,
-                steering_photo=db_truck_items.steering_photo,
-                suspension_system=db_truck_items.suspension_system,
-                suspension_system_photo=db_truck_items.suspension_system_photo,
-                tire_chains=db_truck_items.tire_chains,
-                tire_chains_photo=db_truck_items.tire_chains_photo,
-                tires=db_truck_items.tires,
-                tires_photo=db_truck_items.tires_photo,
-                transmission=db_truck_items.transmission,
-                transmission_photo=db_truck_items.transmission_photo,
-                trip_recorder=db_truck_items.trip_recorder,
-                trip_recorder_photo=db_truck_items.trip_recorder_photo,
-                wheels_and_rims=db_truck_items.wheels_and_rims,
-                wheels_and_rims_photo=db_truck_items.wheels_and_rims_photo,
-                windows=db_truck_items.windows,
-                windows_photo=db_truck_items.windows_photo,
-                windshield_wipers=db_truck_items.windshield_wipers,
-                windshield_wipers_photo=db_truck_items.windshield_wipers_photo,
-                other=db_truck_items.other,
-                other_description=db_truck_items.other_description,
-                other_photo=db_truck_items.other_photo
-            )
-
-        db_trailers = db.query(TrailerDB).filter_by(report_id=report.id).all()
-        trailer_list = []
-        for db_trailer in db_trailers:
-            db_trailer_items = (
-                db.query(TrailerInspectionItemsDB)
-                .filter_by(trailer_id=db_trailer.id)
-                .first()
-            )
-            trailer_items = TrailerInspectionItems()
-            if db_trailer_items:
-                trailer_items = TrailerInspectionItems(
-                    brake_connections=db_trailer_items.brake_connections,
-                    brake_connections_photo=db_trailer_items.brake_connections_photo,
-                    brakes=db_trailer_items.brakes,
-                    brakes_photo=db_trailer_items.brakes_photo,
-                    coupling_devices=db_trailer_items.coupling_devices,
-                    coupling_devices_photo=db_trailer_items.coupling_devices_photo,
-                    coupling_king_pin=db_trailer_items.coupling_king_pin,
-                    coupling_king_pin_photo=db_trailer_items.coupling_king_pin_photo,
-                    doors=db_trailer_items.doors,
-                    doors_photo=db_trailer_items.doors_photo,
-                    hitch=db_trailer_items.hitch,
-                    hitch_photo=db_trailer_items.hitch_photo,
-                    landing_gear=db_trailer_items.landing_gear,
-                    landing_gear_photo=db_trailer_items.landing_gear_photo,
-                    lights_all=db_trailer_items.lights_all,
-                    lights_all_photo=db_trailer_items.lights_all_photo,
-                    reflectors_reflective_tape=db_trailer_items.reflectors_reflective_tape,
-                    reflectors_reflective_tape_photo=db_trailer_items.reflectors_reflective_tape_photo,
-                    roof=db_trailer_items.roof,
-                    roof_photo=db_trailer_items.roof_photo,
-                    suspension_system=db_trailer_items.suspension_system,
-                    suspension_system_photo=db_trailer_items.suspension_system_photo,
-                    tarpaulin=db_trailer_items.tarpaulin,
-                    tarpaulin_photo=db_trailer_items.tarpaulin_photo,
-                    tires=db_trailer_items.tires,
-                    tires_photo=db_trailer_items.tires_photo,
-                    wheels_and_rims=db_trailer_items.wheels_and_rims,
-                    wheels_and_rims_photo=db_trailer_items.wheels_and_rims_photo,
-                    other=db_trailer_items.other,
-                    other_description=db_trailer_items.other_description,
-                    other_photo=db_trailer_items.other_photo
-                )
-
-            trailer_list.append(
-                Trailer(
-                    trailer_number=db_trailer.trailer_number,
-                    inspection_items=trailer_items,
-                )
-            )
-
-        result_schema = VehicleInspectionReport(
-            carrier=report.carrier,
-            address=report.address,
-            inspection_date=report.inspection_date,
-            truck_number=report.truck_number,
-            odometer_reading=report.odometer_reading,
-            truck_inspection_items=truck_inspection,
-            trailers=trailer_list,
-            remarks=report.remarks
-        )
-        results.append(result_schema)
-
-    return results
+    return report_data
 
 
-@router.get("/{report_id}", response_model=VehicleInspectionReport)
-def get_vehicle_inspection_report(
-        report_id: int,
-        db: Session = Depends(get_db),
+# Las mismas inserciones se repiten en cada lote a propósito
+@router.post("/bulk", response_model=BulkIngestResult, dependencies=[query_budget(allow_repeats=True)])
+async def bulk_create_vehicle_inspection_reports(
+        request: Request,
+        idempotency_key: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db),
         current_user=Depends(get_current_user),
 ):
     """
-    Obtener un reporte de inspección de vehículo.
+    Crear reportes de inspección en lote, por ejemplo los capturados sin conexión o migrados de papel.
+
+    El cuerpo es un arreglo JSON de reportes o, con `Content-Type: application/x-ndjson`,
+    un reporte por línea. Los reportes se validan a medida que llegan y los válidos
+    se guardan en lotes de `BULK_BATCH_SIZE`, cada uno en su propia transacción, para
+    no bloquear las demás escrituras durante toda la carga. La respuesta indica, por
+    posición, el id creado o los errores de validación.
+
+    Un arreglo mal formado (por ejemplo, comas sobrantes o faltantes) se rechaza con 400
+    sin guardar nada, salvo que ya se hubiera guardado algún lote: entonces se guarda lo
+    leído hasta ese punto y la respuesta indica en qué posición se detuvo la lectura.
+
+    Con `Idempotency-Key`, la clave se registra (y se confirma) antes de leer el
+    cuerpo; un duplicado que llega mientras tanto recibe 409 y uno posterior, la
+    respuesta guardada.
     """
-    if current_user.role != RoleModel.ADMIN:
+    if current_user.role != RoleModel.USER:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo los usuarios con rol 'admin' pueden ver el reporte."
-        )
-
-    db_report = db.query(InspectionReportDB).filter_by(id=report_id).first()
-    if not db_report:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Reporte de inspección no encontrado."
-        )
-
-    db_truck_items = (
-        db.query(TruckInspectionItemsDB)
-        .filter_by(report_id=report_id)
-        .first()
-    )
-    truck_inspection = TruckInspectionItems()
-    if db_truck_items:
-        truck_inspection = TruckInspectionItems(
-            air_compressor=db_truck_items.air_compressor,
-            air_compressor_photo=db_truck_items.air_compressor_photo,
-            air_lines=db_truck_items.air_lines,
-            air_lines_photo=db_truck_items.air_lines_photo,
-            battery=db_truck_items.battery,
-            battery_photo=db_truck_items.battery_photo,
-            belts_and_hoses=db_truck_items.belts_and_hoses,
-            belts_and_hoses_photo=db_truck_items.belts_and_hoses_photo,
-            body=db_truck_items.body,
-            body_photo=db_truck_items.body_photo,
-            brake_accessories=db_truck_items.brake_accessories,
-            brake_accessories_photo=db_truck_items.brake_accessories_photo,
-            brake_parking=db_truck_items.brake_parking,
-            brake_parking_photo=db_truck_items.brake_parking_photo,
-            brake_service=db_truck_items.brake_service,
-            brake_service_photo=db_truck_items.brake_service_photo,
-            clutch=db_truck_items.clutch,
-            clutch_photo=db_truck_items.clutch_photo,
-            coupling_devices=db_truck_items.coupling_devices,
-            coupling_devices_photo=db_truck_items.coupling_devices_photo,
-            defroster_heater=db_truck_items.defroster_heater,
-            defroster_heater_photo=db_truck_items.defroster_heater_photo,
-            drive_line=db_truck_items.drive_line,
-            drive_line_photo=db_truck_items.drive_line_photo,
-            engine=db_truck_items.engine,
-            engine_photo=db_truck_items.engine_photo,
-            exhaust=db_truck_items.exhaust,
-            exhaust_photo=db_truck_items.exhaust_photo,
-            fifth_wheel=db_truck_items.fifth_wheel,
-            fifth_wheel_photo=db_truck_items.fifth_wheel_photo,
-            fluid_levels=db_truck_items.fluid_levels,
-            fluid_levels_photo=db_truck_items.fluid_levels_photo,
-            frame_and_assembly=db_truck_items.frame_and_assembly,
-            frame_and_assembly_photo=db_truck_items.frame_and_assembly_photo,
-            front_axle=db_truck_items.front_axle,
-            front_axle_photo=db_truck_items.front_axle_photo,
-            fuel_tanks=db_truck_items.fuel_tanks,
-            fuel_tanks_photo=db_truck_items.fuel_tanks_photo,
-            horn=db_truck_items.horn,
-            horn_photo=db_truck_items.horn_photo,
-            lights_head_stop=db_truck_items.lights_head_stop,
-            lights_head_stop_photo=db_truck_items.lights_head_stop_photo,
-            lights_tail_dash=db_truck_items.lights_tail_dash,
-            lights_tail_dash_photo=db_truck_items.lights_tail_dash_photo,
-            lights_turn_indicators=db_truck_items.lights_turn_indicators,
-            lights_turn_indicators_photo=db_truck_items.lights_turn_indicators_photo,
-            lights_clearance_marker=db_truck_items.lights_clearance_marker,
-            lights_clearance_marker_photo=db_truck_items.lights_clearance_marker_photo,
-            mirrors=db_truck_items.mirrors,
-            mirrors_photo=db_truck_items.mirrors_photo,
-            muffler=db_truck_items.muffler,
-            muffler_photo=db_truck_items.muffler_photo,
-            oil_pressure=db_truck_items.oil_pressure,
-            oil_pressure_photo=db_truck_items.oil_pressure_photo,
-            radiator=db_truck_items.radiator,
-            radiator_photo=db_truck_items.radiator_photo,
-            rear_end=db_truck_items.rear_end,
-            rear_end_photo=db_truck_items.rear_end_photo,
-            reflectors=db_truck_items.reflectors,
-            reflectors_photo=db_truck_items.reflectors_photo,
-            safety_fire_extinguisher=db_truck_items.safety_fire_extinguisher,
-            safety_fire_extinguisher_photo=db_truck_items.safety_fire_extinguisher_photo,
-            safety_flags_flares_fusees=db_truck_items.safety_flags_flares_fusees,
-            safety_flags_flares_fusees_photo=db_truck_items.safety_flags_flares_fusees_photo,
-            safety_reflective_triangles=db_truck_items.safety_reflective_triangles,
-            safety_reflective_triangles_photo=db_truck_items.safety_reflective_triangles_photo,
-            safety_spare_bulbs_and_fuses=db_truck_items.safety_spare_bulbs_and_fuses,
-            safety_spare_bulbs_and_fuses_photo=db_truck_items.safety_spare_bulbs_and_fuses_photo,
-            safety_spare_seal_beam=db_truck_items.safety_spare_seal_beam,
-            safety_spare_seal_beam_photo=db_truck_items.safety_spare_seal_beam_photo,
-            starter=db_truck_items.starter,
-            starter_photo=db_truck_items.starter_photo,
-            steering=db_truck_items.steering,
-            steering_photo=db_truck_items.steering_photo,
-            suspension_system=db_truck_items.suspension_system,
-            suspension_system_photo=db_truck_items.suspension_system_photo,
-            tire_chains=db_truck_items.tire_chains,
-            tire_chains_photo=db_truck_items.tire_chains_photo,
-            tires=db_truck_items.tires,
-            tires_photo=db_truck_items.tires_photo,
-            transmission=db_truck_items.transmission,
-            transmission_photo=db_truck_items.transmission_photo,
-            trip_recorder=db_truck_items.trip_recorder,
-            trip_recorder_photo=db_truck_items.trip_recorder_photo,
-            wheels_and_rims=db_truck_items.wheels_and_rims,
-            wheels_and_rims_photo=db_truck_items.wheels_and_rims_photo,
-            windows=db_truck_items.windows,
-            windows_photo=db_truck_items.windows_photo,
-            windshield_wipers=db_truck_items.windshield_wipers,
-            windshield_wipers_photo=db_truck_items.windshield_wipers_photo,
-            other=db_truck_items.other,
-            other_description=db_truck_items.other_description,
-            other_photo=db_truck_items.other_photo
+            detail="Solo los usuarios con rol 'user' pueden crear reportes."
         )
 
-    db_trailers = db.query(TrailerDB).filter_by(report_id=db_report.id).all()
-    trailer_list = []
-    for db_trailer in db_trailers:
-        db_trailer_items = (
-            db.query(TrailerInspectionItemsDB)
-            .filter_by(report_id=db_trailer.id)
-            .first()
-        )
-        trailer_items = TrailerInspectionItemsDB()
-        if db_trailer_items:
-            trailer_items = TrailerInspectionItems(
-                brake_connections=db_trailer_items.brake_connections,
-                brake_connections_photo=db_trailer_items.brake_connections_photo,
-                brakes=db_trailer_items.brakes,
-                brakes_photo=db_trailer_items.brakes_photo,
-                coupling_devices=db_trailer_items.coupling_devices,
-                coupling_devices_photo=db_trailer_items.coupling_devices_photo,
-                coupling_king_pin=db_trailer_items.coupling_king_pin,
-                coupling_king_pin_photo=db_trailer_items.coupling_king_pin_photo,
-                doors=db_trailer_items.doors,
-                doors_photo=db_trailer_items.doors_photo,
-                hitch=db_trailer_items.hitch,
-                hitch_photo=db_trailer_items.hitch_photo,
-                landing_gear=db_trailer_items.landing_gear,
-                landing_gear_photo=db_trailer_items.landing_gear_photo,
-                lights_all=db_trailer_items.lights_all,
-                lights_all_photo=db_trailer_items.lights_all_photo,
-                reflectors_reflective_tape=db_trailer_items.reflectors_reflective_tape,
-                reflectors_reflective_tape_photo=db_trailer_items.reflectors_reflective_tape_photo,
-                roof=db_trailer_items.roof,
-                roof_photo=db_trailer_items.roof_photo,
-                suspension_system=db_trailer_items.suspension_system,
-                suspension_system_photo=db_trailer_items.suspension_system_photo,
-                tarpaulin=db_trailer_items.tarpaulin,
-                tarpaulin_photo=db_trailer_items.tarpaulin_photo,
-                tires=db_trailer_items.tires,
-                tires_photo=db_trailer_items.tires_photo,
-                wheels_and_rims=db_trailer_items.wheels_and_rims,
-                wheels_and_rims_photo=db_trailer_items.wheels_and_rims_photo,
-                other=db_trailer_items.other,
-                other_description=db_trailer_items.other_description,
-                other_photo=db_trailer_items.other_photo
-            )
-
-        trailer_list.append(
-            Trailer(
-                trailer_number=db_trailer.trailer_number,
-                inspection_items=trailer_items,
-            )
-        )
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    parse = iter_ndjson if media_type in NDJSON_MEDIA_TYPES else iter_json_array
 
-    return VehicleInspectionReport(
-        carrier=db_report.carrier,
-        address=db_report.address,
-        inspection_date=db_report.inspection_date,
-        truck_number=db_report.truck_number,
-        odometer_reading=db_report.odometer_reading,
-        truck_inspection_items=truck_inspection,
-        trailers=trailer_list,
-        remarks=db_report.remarks
-    )
+    body_hash = hashlib.sha256()
 
+    async def body_chunks():
+        async for chunk in request.stream():
+            body_hash.update(chunk)
+            yield chunk
 
+    if idempotency_key is not None:
+        # El hash del cuerpo se conoce al terminar de leerlo; se guarda junto con la respuesta
+        existing = await claim_key(db, current_user.id, idempotency_key, None)
+        if existing is not None:
+            async for _ in body_chunks():
+                pass
+            return replay_response(existing, request_fingerprint("bulk", body_hash.digest()))
+        await db.commit()
 
-@router.patch("/{report_id}", response_model=VehicleInspectionReport)
-def update_vehicle_inspection_report(
-        report_id: int,
-        report_data: VehicleInspectionReport,
-        db: Session = Depends(get_db),
+    results = []
+    pending = []
+
+    async def save_pending():
+        try:
+            report_ids = await insert_reports(db, [report for _, report in pending])
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            errors = [{"type": "db_error", "loc": [], "msg": "No se pudo guardar el lote."}]
+            results.extend(BulkItemResult(index=index, errors=errors) for index, _ in pending)
+        else:
+            results.extend(BulkItemResult(index=index, id=report_id)
+                           for (index, _), report_id in zip(pending, report_ids))
+        pending.clear()
+
+    def summary() -> BulkIngestResult:
+        results.sort(key=lambda result: result.index)
+        created = sum(1 for result in results if result.id is not None)
+        return BulkIngestResult(created=created, failed=len(results) - created, results=results)
+
+    try:
+        index = 0
+        try:
+            async for report, errors in parse(body_chunks()):
+                if index == BULK_MAX_REPORTS:
+                    # Se informa dónde se detuvo la carga para que el cliente envíe el resto en otra solicitud
+                    results.append(BulkItemResult(index=index, errors=[{
+                        "type": "too_many_items", "loc": [],
+                        "msg": f"Se aceptan como máximo {BULK_MAX_REPORTS} reportes por solicitud.",
+                    }]))
+                    break
+                if errors is not None:
+                    results.append(BulkItemResult(index=index, errors=errors))
+                else:
+                    pending.append((index, report))
+                    if len(pending) >= BULK_BATCH_SIZE:
+                        await save_pending()
+                index += 1
+        except MalformedBody as exc:
+            if not any(result.id is not None for result in results):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+            # Ya hay lotes guardados: como con too_many_items, se indica dónde se detuvo la lectura
+            results.append(BulkItemResult(index=index, errors=[
+                {"type": "json_invalid", "loc": [], "msg": str(exc)},
+            ]))
+        if pending:
+            await save_pending()
+    except BaseException:
+        if idempotency_key is not None:
+            # Si ningún lote se guardó, la clave se libera para poder reintentar; si no, se guarda
+            # lo que alcanzó a crearse para que un reintento no duplique esos reportes
+            await db.rollback()
+            if any(result.id is not None for result in results):
+                await store_response(db, current_user.id, idempotency_key, status.HTTP_200_OK,
+                                     summary().model_dump_json())
+            else:
+                await release_key(db, current_user.id, idempotency_key)
+            await db.commit()
+        raise
+
+    result = summary()
+    if idempotency_key is not None:
+        await store_response(db, current_user.id, idempotency_key, status.HTTP_200_OK, result.model_dump_json(),
+                             request_hash=request_fingerprint("bulk", body_hash.digest()))
+        await db.commit()
+    return result
+
+
+# La página más grande (más el registro extra) cabe en un bloque de selectin: usuario, reportes, items y
+# fotos del camión y trailers son 5 consultas. Items y fotos de los trailers usan un bloque por cada
+# SELECTIN_CHUNK_SIZE trailers, con a lo sumo MAX_TRAILERS por reporte.
+@router.get("/", response_model=VehicleInspectionReportPage, dependencies=[query_budget(
+    5 + 2 * math.ceil((LIST_MAX_LIMIT + 1) * MAX_TRAILERS / SELECTIN_CHUNK_SIZE)
+)])
+async def list_vehicle_inspection_reports(
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=LIST_MAX_LIMIT),
+        carrier: Optional[str] = None,
+        truck_number: Optional[str] = None,
+        trailer_number: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        db: AsyncSession = Depends(get_async_db),
         current_user=Depends(get_current_user),
 ):
     """
-    Actualizar un reporte de inspección de vehículo.
+    Listar reportes de inspección de vehículo, del más reciente al más antiguo.
+
+    La paginación es por cursor sobre (inspection_date, id): `next_cursor` de una
+    página se envía como `cursor` para pedir la siguiente.
     """
     if current_user.role != RoleModel.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo los usuarios con rol 'admin' pueden editar reportes."
+            detail="Solo los usuarios con rol 'admin' pueden ver los reportes."
         )
 
-    db_report = db.query(InspectionReportDB).filter_by(id=report_id).first()
-    if not db_report:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Reporte de inspección no encontrado."
+    query = _filter_reports(
+        _select_reports_with_items(), carrier, truck_number, trailer_number, date_from, date_to
+    )
+    if cursor is not None:
+        query = query.where(
+            tuple_(InspectionReportDB.inspection_date, InspectionReportDB.id) < _decode_cursor(cursor)
         )
 
-    db_report.carrier = report_data.carrier
-    db_report.address = report_data.address
-    db_report.inspection_date = report_data.inspection_date
-    db_report.truck_number = report_data.truck_number
-    db_report.odometer_reading = report_data.odometer_reading
-    db_report.remarks = report_data.remarks
-
-    db_truck_items = (
-        db.query(TruckInspectionItemsDB)
-        .filter_by(report_id=db_report.id)
-        .first()
+    # Se pide un registro extra para saber si existe una página siguiente
+    query = (
+        query.order_by(InspectionReportDB.inspection_date.desc(), InspectionReportDB.id.desc())
+        .limit(limit + 1)
     )
+    db_reports = (await db.scalars(query)).all()
+    has_more = len(db_reports) > limit
+    db_reports = db_reports[:limit]
+    results = [to_report_read(report) for report in db_reports]
 
-    if db_truck_items:
-        t_items = report_data.truck_inspection_items
-        db_truck_items.air_compressor = t_items.air_compressor
-        db_truck_items.air_compressor_photo = t_items.air_compressor_photo
-
-        db_truck_items.air_lines = t_items.air_lines
-        db_truck_items.air_lines_photo = t_items.air_lines_photo
-
-        db_truck_items.battery = t_items.battery
-        db_truck_items.battery_photo = t_items.battery_photo
-
-        db_truck_items.belts_and_hoses = t_items.belts_and_hoses
-        db_truck_items.belts_and_hoses_photo = t_items.belts_and_hoses_photo
-
-        db_truck_items.body = t_items.body
-        db_truck_items.body_photo = t_items.body_photo
-
-        db_truck_items.brake_accessories = t_items.brake_accessories
-        db_truck_items.brake_accessories_photo = t_items.brake_accessories_photo
-
-        db_truck_items.brake_parking = t_items.brake_parking
-        db_truck_items.brake_parking_photo = t_items.brake_parking_photo
-
-        db_truck_items.brake_service = t_items.brake_service
-        db_truck_items.brake_service_photo = t_items.brake_service_photo
-
-        db_truck_items.clutch = t_items.clutch
-        db_truck_items.clutch_photo = t_items.clutch_photo
-
-        db_truck_items.coupling_devices = t_items.coupling_devices
-        db_truck_items.coupling_devices_photo = t_items.coupling_devices_photo
-
-        db_truck_items.defroster_heater = t_items.defroster_heater
-        db_truck_items.defroster_heater_photo = t_items.defroster_heater_photo
-
-        db_truck_items.drive_line = t_items.drive_line
-        db_truck_items.drive_line_photo = t_items.drive_line_photo
-
-        db_truck_items.engine = t_items.engine
-        db_truck_items.engine_photo = t_items.engine_photo
+    next_cursor = None
+    if has_more:
+        last = db_reports[-1]
+        next_cursor = _encode_cursor(last.inspection_date, last.id)
 
-        db_truck_items.exhaust = t_items.exhaust
-        db_truck_items.exhaust_photo = t_items.exhaust_photo
+    return VehicleInspectionReportPage(items=results, next_cursor=next_cursor)
 
-        db_truck_items.fifth_wheel = t_items.fifth_wheel
-        db_truck_items.fifth_wheel_photo = t_items.fifth_wheel_photo
 
-        db_truck_items.fluid_levels = t_items.fluid_levels
-        db_truck_items.fluid_levels_photo = t_items.fluid_levels_photo
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
 
-        db_truck_items.frame_and_assembly = t_items.frame_and_assembly
-        db_truck_items.frame_and_assembly_photo = t_items.frame_and_assembly_photo
 
-        db_truck_items.front_axle = t_items.front_axle
-        db_truck_items.front_axle_photo = t_items.front_axle_photo
+EXPORT_BATCH_SIZE = 500
 
-        db_truck_items.fuel_tanks = t_items.fuel_tanks
-        db_truck_items.fuel_tanks_photo = t_items.fuel_tanks_photo
+_CSV_HEADER = [
+    "report_id", "carrier", "address", "inspection_date", "truck_number", "odometer_reading",
+    "unit", "unit_number", "defects", "other_description", "remarks",
+]
 
-        db_truck_items.horn = t_items.horn
-        db_truck_items.horn_photo = t_items.horn_photo
 
-        db_truck_items.lights_head_stop = t_items.lights_head_stop
-        db_truck_items.lights_head_stop_photo = t_items.lights_head_stop_photo
-
-        db_truck_items.lights_tail_dash = t_items.lights_tail_dash
-        db_truck_items.lights_tail_dash_photo = t_items.lights_tail_dash_photo
-
-        db_truck_items.lights_turn_indicators = t_items.lights_turn_indicators
-        db_truck_items.lights_turn_indicators_photo = t_items.lights_turn_indicators_photo
-
-        db_truck_items.lights_clearance_marker = t_items.lights_clearance_marker
-        db_truck_items.lights_clearance_marker_photo = t_items.lights_clearance_marker_photo
-
-        db_truck_items.mirrors = t_items.mirrors
-        db_truck_items.mirrors_photo = t_items.mirrors_photo
-
-        db_truck_items.muffler = t_items.muffler
-        db_truck_items.muffler_photo = t_items.muffler_photo
-
-        db_truck_items.oil_pressure = t_items.oil_pressure
-        db_truck_items.oil_pressure_photo = t_items.oil_pressure_photo
-
-        db_truck_items.radiator = t_items.radiator
-        db_truck_items.radiator_photo = t_items.radiator_photo
-
-        db_truck_items.rear_end = t_items.rear_end
-        db_truck_items.rear_end_photo = t_items.rear_end_photo
+def _csv_rows(report: InspectionReportDB):
+    """
+    Una fila por unidad inspeccionada (camión y cada trailer) con sus items marcados con defecto.
 
-        db_truck_items.reflectors = t_items.reflectors
-        db_truck_items.reflectors_photo = t_items.reflectors_photo
+    En las listas de verificación True significa que el item está en buen estado.
+    """
+    base = [
+        report.id, report.carrier, report.address, report.inspection_date.isoformat(),
+        report.truck_number, report.odometer_reading,
+    ]
+    truck_items = report.truck_inspection_items
+    yield base + [
+        "truck",
+        report.truck_number,
+        "|".join(key for key in TruckInspectionItemsDB.DEFECT_ITEM_KEYS
+                 if truck_items and not getattr(truck_items, key)),
+        truck_items.other_description if truck_items else None,
+        report.remarks,
+    ]
+    for trailer in report.trailers:
+        trailer_items = trailer.inspection_items
+        yield base + [
+            "trailer",
+            trailer.trailer_number,
+            "|".join(key for key in TrailerInspectionItemsDB.DEFECT_ITEM_KEYS
+                     if trailer_items and not getattr(trailer_items, key)),
+            trailer_items.other_description if trailer_items else None,
+            report.remarks,
+        ]
+
+
+async def _stream_export(export_format: ExportFormat, filters: dict):
+    """
+    Genera el cuerpo de la exportación reporte por reporte.
 
-        db_truck_items.safety_fire_extinguisher = t_items.safety_fire_extinguisher
-        db_truck_items.safety_fire_extinguisher_photo = t_items.safety_fire_extinguisher_photo
+    Usa su propia sesión porque la de `get_async_db` se cierra antes de que la respuesta
+    termine de enviarse. Los reportes se leen en lotes de `EXPORT_BATCH_SIZE` con
+    un cursor del lado del servidor, y las relaciones de cada lote se cargan con
+    selectin, así que la memoria no depende del tamaño del resultado.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == ExportFormat.CSV:
+        writer.writerow(_CSV_HEADER)
+        yield buffer.getvalue()
+
+    async with AsyncSessionLocal() as db:
+        query = (
+            _filter_reports(_select_reports_with_items(), **filters)
+            .order_by(InspectionReportDB.inspection_date, InspectionReportDB.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for report in await db.stream_scalars(query):
+            if export_format == ExportFormat.NDJSON:
+                yield to_report_read(report).model_dump_json() + "\n"
+            else:
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(_csv_rows(report))
+                yield buffer.getvalue()
+
+
+@router.get("/export")
+async def export_vehicle_inspection_reports(
+        export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+        carrier: Optional[str] = None,
+        truck_number: Optional[str] = None,
+        trailer_number: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        current_user=Depends(get_current_user),
+):
+    """
+    Exportar reportes de inspección de vehículo como NDJSON o CSV.
 
-        db_truck_items.safety_flags_flares_fusees = t_items.safety_flags_flares_fusees
-        db_truck_items.safety_flags_flares_fusees_photo = t_items.safety_flags_flares_fusees_photo
+    La respuesta se transmite mientras se lee la base de datos, en orden
+    cronológico, con los mismos filtros que el listado.
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden exportar reportes."
+        )
 
-        db_truck_items.safety_reflective_triangles = t_items.safety_reflective_triangles
-        db_truck_items.safety_reflective_triangles_photo = t_items.safety_reflective_triangles_photo
+    filters = dict(
+        carrier=carrier,
+        truck_number=truck_number,
+        trailer_number=trailer_number,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    if export_format == ExportFormat.CSV:
+        media_type = "text/csv"
+    else:
+        media_type = "application/x-ndjson"
 
-        db_truck_items.safety_spare_bulbs_and_fuses = t_items.safety_spare_bulbs_and_fuses
-        db_truck_items.safety_spare_bulbs_and_fuses_photo = t_items.safety_spare_bulbs_and_fuses_photo
+    return StreamingResponse(
+        _stream_export(export_format, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="vehicle_inspection_reports.{export_format.value}"'},
+    )
 
-        db_truck_items.safety_spare_seal_beam = t_items.safety_spare_seal_beam
-        db_truck_items.safety_spare_seal_beam_photo = t_items.safety_spare_seal_beam_photo
 
-        db_truck_items.starter = t_items.starter
-        db_truck_items.starter_photo = t_items.starter_photo
+class SearchSort(str, Enum):
+    RELEVANCE = "relevance"
+    RECENT = "recent"
 
-        db_truck_items.steering = t_items.steering
-        db_truck_items.steering_photo = t_items.steering_photo
 
-        db_truck_items.suspension_system = t_items.suspension_system
-        db_truck_items.suspension_system_photo = t_items.suspension_system_photo
+@router.get("/search", response_model=ReportSearchResults, dependencies=[query_budget(2)])
+async def search_vehicle_inspection_reports(
+        q: str = Query(..., min_length=1, max_length=200),
+        limit: int = Query(20, ge=1, le=100),
+        offset: int = Query(0, ge=0, le=1000),
+        sort: SearchSort = SearchSort.RELEVANCE,
+        db: AsyncSession = Depends(get_async_db),
+        current_user=Depends(get_current_user),
+):
+    """
+    Buscar reportes por texto en las observaciones y en las descripciones de defectos.
 
-        db_truck_items.tire_chains = t_items.tire_chains
-        db_truck_items.tire_chains_photo = t_items.tire_chains_photo
+    Las palabras deben aparecer todas; el texto entre comillas se busca como
+    frase ("air leak"). Devuelve los ids de los reportes, del más relevante al
+    menos relevante (o del más reciente con `sort=recent`), con un fragmento del
+    texto donde las coincidencias están marcadas entre corchetes.
 
-        db_truck_items.tires = t_items.tires
-        db_truck_items.tires_photo = t_items.tires_photo
+    La relevancia se calcula solo sobre las `SEARCH_RANK_WINDOW` coincidencias
+    más recientes (2000 por omisión). Si hubo más, `truncated` es true: los
+    reportes más antiguos no aparecen aunque fueran más relevantes; con
+    `sort=recent` se pueden recorrer todas.
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden buscar reportes."
+        )
 
-        db_truck_items.transmission = t_items.transmission
-        db_truck_items.transmission_photo = t_items.transmission_photo
+    if not match_expression(q):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La búsqueda debe incluir al menos una palabra."
+        )
 
-        db_truck_items.trip_recorder = t_items.trip_recorder
-        db_truck_items.trip_recorder_photo = t_items.trip_recorder_photo
+    hits, truncated = await search_reports(db, q, limit, offset, recent=sort == SearchSort.RECENT)
+    return ReportSearchResults(items=[ReportSearchHit(**hit) for hit in hits], truncated=truncated)
 
-        db_truck_items.wheels_and_rims = t_items.wheels_and_rims
-        db_truck_items.wheels_and_rims_photo = t_items.wheels_and_rims_photo
 
-        db_truck_items.windows = t_items.windows
-        db_truck_items.windows_photo = t_items.windows_photo
+def _invalidate_reports(report_ids):
+    for report_id in report_ids:
+        report_cache.invalidate(report_id)
 
-        db_truck_items.windshield_wipers = t_items.windshield_wipers
-        db_truck_items.windshield_wipers_photo = t_items.windshield_wipers_photo
 
-        db_truck_items.other = t_items.other
-        db_truck_items.other_description = t_items.other_description
-        db_truck_items.other_photo = t_items.other_photo
+@router.post("/purge", response_model=RetentionPurgeStatus, status_code=status.HTTP_202_ACCEPTED)
+async def purge_vehicle_inspection_reports(
+        before: datetime,
+        batch_size: int = Query(RETENTION_PURGE_BATCH_SIZE, ge=1, le=5000),
+        current_user=Depends(get_current_user),
+):
+    """
+    Iniciar en segundo plano la eliminación de los reportes con fecha de inspección anterior a `before`.
 
-    else:
-        pass
+    Los reportes se eliminan en lotes de `batch_size`, cada uno en una
+    transacción corta, para no bloquear el envío de reportes mientras dura la
+    purga. El avance se consulta con GET /purge.
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden purgar reportes."
+        )
 
-    for new_trailer_data in report_data.trailers:
-        db_trailer = (
-            db.query(TrailerDB)
-            .filter_by(report_id=db_report.id, trailer_number=new_trailer_data.trailer_number)
-            .first()
+    if before > datetime.now(before.tzinfo):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha de corte no puede estar en el futuro."
         )
 
-        if db_trailer:
-            db_trailer_items = (
-                db.query(TrailerInspectionItemsDB)
-                .filter_by(trailer_id=db_trailer.id)
-                .first()
-            )
-            if db_trailer_items:
-                it = new_trailer_data.inspection_items
-                db_trailer_items.brake_connections = it.brake_connections
-                db_trailer_items.brake_connections_photo = it.brake_connections_photo
+    job = purger.start(before, batch_size, on_deleted=_invalidate_reports)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya hay una purga de reportes en curso."
+        )
+    return RetentionPurgeStatus.model_validate(job)
 
-                db_trailer_items.brakes = it.brakes
-                db_trailer_items.brakes_photo = it.brakes_photo
 
-                db_trailer_items.coupling_devices = it.coupling_devices
-                db_trailer_items.coupling_devices_photo = it.coupling_devices_photo
+@router.get("/purge", response_model=RetentionPurgeStatus)
+async def get_vehicle_inspection_report_purge(
+        current_user=Depends(get_current_user),
+):
+    """
+    Consultar el avance de la última purga de reportes.
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden consultar la purga de reportes."
+        )
 
-                db_trailer_items.coupling_king_pin = it.coupling_king_pin
-                db_trailer_items.coupling_king_pin_photo = it.coupling_king_pin_photo
+    if purger.job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No se ha iniciado ninguna purga de reportes."
+        )
+    return RetentionPurgeStatus.model_validate(purger.job)
 
-                db_trailer_items.doors = it.doors
-                db_trailer_items.doors_photo = it.doors_photo
 
-                db_trailer_items.hitch = it.hitch
-                db_trailer_items.hitch_photo = it.hitch_photo
+# Usuario, versión, reporte y sus cinco relaciones; con la caché de cuerpos basta la versión
+@router.get("/{report_id}", response_model=VehicleInspectionReport, dependencies=[query_budget(8)])
+async def get_vehicle_inspection_report(
+        report_id: int,
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db),
+        current_user=Depends(get_current_user),
+):
+    """
+    Obtener un reporte de inspección de vehículo.
 
-                db_trailer_items.landing_gear = it.landing_gear
-                db_trailer_items.landing_gear_photo = it.landing_gear_photo
+    La respuesta lleva un ETag basado en la versión del reporte; con
+    `If-None-Match` se responde 304 si no cambió. El cuerpo serializado se
+    guarda en `report_cache`, así que volver a abrir un reporte solo cuesta la
+    consulta de su versión.
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden ver el reporte."
+        )
 
-                db_trailer_items.lights_all = it.lights_all
-                db_trailer_items.lights_all_photo = it.lights_all_photo
+    # La versión se consulta siempre, así que otros procesos no pueden dejar una copia vieja en la caché
+    version = await db.scalar(select(InspectionReportDB.version).where(InspectionReportDB.id == report_id))
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reporte de inspección no encontrado."
+        )
 
-                db_trailer_items.reflectors_reflective_tape = it.reflectors_reflective_tape
-                db_trailer_items.reflectors_reflective_tape_photo = it.reflectors_reflective_tape_photo
+    etag = _report_etag(report_id, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-                db_trailer_items.roof = it.roof
-                db_trailer_items.roof_photo = it.roof_photo
+    cached = report_cache.get(report_id)
+    if cached is not None and cached[0] == version:
+        return Response(content=cached[1], media_type="application/json", headers=headers)
 
-                db_trailer_items.suspension_system = it.suspension_system
-                db_trailer_items.suspension_system_photo = it.suspension_system_photo
+    db_report = await db.scalar(_select_reports_with_items().where(InspectionReportDB.id == report_id))
+    if not db_report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reporte de inspección no encontrado."
+        )
 
-                db_trailer_items.tarpaulin = it.tarpaulin
-                db_trailer_items.tarpaulin_photo = it.tarpaulin_photo
+    body = to_report_read(db_report).model_dump_json(exclude={"id"}).encode()
+    report_cache.set(report_id, (db_report.version, body))
+    headers["ETag"] = _report_etag(report_id, db_report.version)
+    return Response(content=body, media_type="application/json", headers=headers)
 
-                db_trailer_items.tires = it.tires
-                db_trailer_items.tires_photo = it.tires_photo
 
-                db_trailer_items.wheels_and_rims = it.wheels_and_rims
-                db_trailer_items.wheels_and_rims_photo = it.wheels_and_rims_photo
+def _unit_signature(report: InspectionReportDB):
+    """
+    Lo que usan los agregados y el estado de las unidades; si no cambia, no hay que recalcularlos.
+    """
+    def checks(items):
+        return items.checks if items is not None else -1
+
+    return (
+        report.carrier,
+        report.inspection_date,
+        report.truck_number,
+        report.odometer_reading,
+        checks(report.truck_inspection_items),
+        sorted((trailer.trailer_number, checks(trailer.inspection_items)) for trailer in report.trailers),
+    )
 
-                db_trailer_items.other = it.other
-                db_trailer_items.other_description = it.other_description
-                db_trailer_items.other_photo = it.other_photo
-            else:
-                pass
 
-        else:
-            pass
+def _validate_trailer_changes(db_report: InspectionReportDB, report_data: VehicleInspectionReportUpdate):
+    current = {trailer.trailer_number for trailer in db_report.trailers}
+    updated = [trailer.trailer_number for trailer in report_data.trailers]
+    removed = report_data.remove_trailers
+    if len(set(updated)) != len(updated) or len(set(removed)) != len(removed) or set(updated) & set(removed):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cada trailer puede aparecer una sola vez entre 'trailers' y 'remove_trailers'."
+        )
+    missing = sorted(set(removed) - current)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Los trailers {', '.join(missing)} no pertenecen al reporte."
+        )
+    if len(current - set(removed) | set(updated)) > MAX_TRAILERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Un reporte puede tener a lo sumo {MAX_TRAILERS} trailers."
+        )
 
-    db.commit()
-    db.refresh(db_report)
 
-    return report_data
+@router.patch("/{report_id}", response_model=VehicleInspectionReport)
+async def update_vehicle_inspection_report(
+        report_id: int,
+        report_data: VehicleInspectionReportUpdate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user=Depends(get_current_user),
+):
+    """
+    Actualizar parcialmente un reporte de inspección de vehículo.
 
+    Solo se modifican los campos enviados, incluidos los items de cada lista de
+    verificación. Los trailers se identifican por número: los de `trailers` que
+    no están en el reporte se agregan y los de `remove_trailers` se eliminan.
+    Devuelve el reporte completo ya actualizado, o 409 si otra solicitud lo
+    modificó después de leerlo.
+    """
+    if current_user.role != RoleModel.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios con rol 'admin' pueden editar reportes."
+        )
 
-@router.delete("/{report_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_vehicle_inspection_report(
+    db_report = await db.scalar(_select_reports_with_items().where(InspectionReportDB.id == report_id))
+    if not db_report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reporte de inspección no encontrado."
+        )
+    _validate_trailer_changes(db_report, report_data)
+
+    # Se restan los valores actuales de los agregados y, si cambiaron, al final se suman los nuevos
+    rollup_delta = RollupDelta()
+    rollup_delta.add_report(db_report, -1)
+    signature = _unit_signature(db_report)
+    truck_numbers = {db_report.truck_number}
+    trailer_numbers = {trailer.trailer_number for trailer in db_report.trailers}
+
+    if not apply_report_changes(db_report, report_data):
+        return to_report_read(db_report)
+
+    db_report.version += 1
+    try:
+        # Primero el UPDATE condicionado a la versión leída, antes de tocar agregados y estados
+        await db.flush()
+    except StaleDataError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El reporte fue modificado por otra solicitud. Vuelva a cargarlo e intente de nuevo."
+        )
+    if _unit_signature(db_report) != signature:
+        rollup_delta.add_report(db_report)
+        await rollup_delta.apply(db)
+        truck_numbers.add(db_report.truck_number)
+        trailer_numbers.update(trailer.trailer_number for trailer in db_report.trailers)
+        await refresh_status(db, truck_numbers, trailer_numbers)
+    await db.commit()
+    report_cache.invalidate(report_id)
+
+    return to_report_read(db_report)
+
+
+# Usuario, lectura del reporte y de sus trailers (2), DELETE, agregados (2) y el estado de las unidades
+# recalculado con tres sentencias por tipo de unidad (ver `refresh_status`)
+@router.delete("/{report_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[query_budget(12)])
+async def delete_vehicle_inspection_report(
         report_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user=Depends(get_current_user),
 ):
     """
@@ -837,23 +730,14 @@ def delete_vehicle_inspection_report(
             detail="Solo los usuarios con rol 'admin' pueden eliminar reportes."
         )
 
-    db_report = db.query(InspectionReportDB).filter_by(id=report_id).first()
-    if not db_report:
+    # Los items, trailers y fotos se eliminan en cascada con el reporte (ON DELETE CASCADE)
+    truck_numbers, trailer_numbers = await delete_reports(db, [report_id])
+    if not truck_numbers:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Reporte de inspección no encontrado."
         )
 
-    db_truck_items = db.query(TruckInspectionItemsDB).filter_by(report_id=db_report.id).first()
-    if db_truck_items:
-        db.delete(db_truck_items)
-
-    db_trailers = db.query(TrailerDB).filter_by(report_id=db_report.id).all()
-    for trailer in db_trailers:
-        db_trailer_items = db.query(TrailerInspectionItemsDB).filter_by(trailer_id=trailer.id).first()
-        if db_trailer_items:
-            db.delete(db_trailer_items)
-        db.delete(trailer)
-
-    db.delete(db_report)
-    db.commit()
+    await refresh_status(db, truck_numbers, trailer_numbers)
+    await db.commit()
+    report_cache.invalidate(report_id)
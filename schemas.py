@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, create_model
 from enum import Enum
 
 
@@ -171,6 +171,11 @@ class Trailer(BaseModel):
     inspection_items: TrailerInspectionItems
 
 
+# Trailers por reporte. Un tractocamión arrastra a lo sumo cuatro; el límite deja margen y acota
+# el presupuesto de consultas de las rutas que leen reportes con sus trailers.
+MAX_TRAILERS = 8
+
+
 class VehicleInspectionReport(BaseModel):
     carrier: str
     address: str
@@ -178,5 +183,125 @@ class VehicleInspectionReport(BaseModel):
     truck_number: str
     odometer_reading: int
     truck_inspection_items: TruckInspectionItems
-    trailers: List[Trailer] = []
-    remarks: Optional[str] = None
\ No newline at end of file
+    trailers: List[Trailer] = Field([], max_length=MAX_TRAILERS)
+    remarks: Optional[str] = None
+
+def _partial(model, name: str, exclude=(), **extra_fields):
+    """
+    Versión de `model` para actualizaciones parciales: todos los campos son opcionales.
+
+    Se conserva el tipo de cada campo, así que un `null` solo se acepta donde el
+    campo original lo admite (fotos, descripción, observaciones). Los campos
+    enviados se distinguen de los omitidos con `model_fields_set`, y un campo
+    desconocido es un error en lugar de ignorarse sin aplicar nada.
+    """
+    fields = {
+        field_name: (field.annotation, None)
+        for field_name, field in model.model_fields.items()
+        if field_name not in exclude
+    }
+    return create_model(name, __config__=ConfigDict(extra="forbid"), **fields, **extra_fields)
+
+
+TruckInspectionItemsUpdate = _partial(TruckInspectionItems, "TruckInspectionItemsUpdate")
+TrailerInspectionItemsUpdate = _partial(TrailerInspectionItems, "TrailerInspectionItemsUpdate")
+
+
+class TrailerUpdate(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    trailer_number: str
+    inspection_items: Optional[TrailerInspectionItemsUpdate] = None
+
+
+# Los trailers se modifican por número; los que no están en el reporte se agregan
+VehicleInspectionReportUpdate = _partial(
+    VehicleInspectionReport,
+    "VehicleInspectionReportUpdate",
+    exclude=("truck_inspection_items", "trailers"),
+    truck_inspection_items=(Optional[TruckInspectionItemsUpdate], None),
+    trailers=(List[TrailerUpdate], []),
+    remove_trailers=(List[str], []),
+)
+
+
+class VehicleInspectionReportRead(VehicleInspectionReport):
+    id: int
+
+
+class VehicleInspectionReportPage(BaseModel):
+    items: List[VehicleInspectionReportRead]
+    next_cursor: Optional[str] = None
+
+
+class ReportSearchHit(BaseModel):
+    id: int
+    # bm25 de FTS5: más negativo es más relevante; nulo al ordenar por fecha
+    rank: Optional[float] = None
+    snippet: str
+
+
+class ReportSearchResults(BaseModel):
+    items: List[ReportSearchHit]
+    # Al ordenar por relevancia solo se ordenan las SEARCH_RANK_WINDOW coincidencias más recientes;
+    # true si hubo más y las más antiguas quedaron fuera de los resultados
+    truncated: bool = False
+
+
+class RetentionPurgeStatus(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    before: datetime
+    batch_size: int
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    deleted: int
+    batches: int
+    running: bool
+    error: Optional[str] = None
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    errors: Optional[List[dict]] = None
+
+
+class BulkIngestResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class PhotoUploadResponse(BaseModel):
+    photo_ref: str
+    url: str
+
+
+class DefectRate(BaseModel):
+    period_start: date
+    carrier: str
+    truck_number: Optional[str] = None
+    unit: str
+    item_key: str
+    inspections: int
+    defects: int
+    defect_rate: float
+
+
+class TruckStatus(BaseModel):
+    truck_number: str
+    report_id: int
+    inspection_date: datetime
+    odometer_reading: Optional[int] = None
+    defects: List[str]
+    cleared: bool
+
+
+class TrailerStatus(BaseModel):
+    trailer_number: str
+    report_id: int
+    truck_number: Optional[str] = None
+    inspection_date: datetime
+    defects: List[str]
+    cleared: bool
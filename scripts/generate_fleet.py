@@ -0,0 +1,317 @@
+"""
+Genera una flota sintética de reportes de inspección para pruebas de escala.
+
+Llena `inspection_reports`, `truck_inspection_items`, `trailers`,
+`trailer_inspection_items` y las tablas de fotos con inserciones masivas de
+SQLAlchemy core, en una transacción por bloque de `--chunk-size` reportes. Los
+ids se asignan a partir del máximo existente, así que se puede ejecutar varias
+veces sobre la misma base para agregar más reportes.
+
+Las distribuciones son configurables:
+
+- Transportistas con flotas de tamaño desigual (ley de Zipf con `--carrier-skew`).
+- Camiones y trailers asignados a un transportista; cada unidad tiene su propia
+  condición, así que algunos camiones acumulan más defectos que otros.
+- Número de trailers por reporte (`--trailers 0.1,0.3,0.6` = 10 % sin trailer,
+  30 % con uno, 60 % con dos).
+- Tasa de defecto por tipo de unidad y por item (`--item-defect-rate brakes=0.1`).
+- Fotos: la mayoría de los defectos llevan foto y algunos items en buen estado también.
+- Descripciones de defectos (`other_description`) y observaciones en parte de los reportes.
+
+Las fechas avanzan con los ids, como en producción, y el odómetro de cada
+camión crece con la fecha. Al terminar se recalculan los agregados y el estado
+de las unidades (se puede omitir con `--skip-derived`).
+
+Uso:
+    DATABASE_URL=sqlite:///fleet.db python -m scripts.generate_fleet --reports 1000000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import (  # noqa: E402
+    InspectionReportDB,
+    TRAILER_ITEM_KEYS,
+    TRUCK_ITEM_KEYS,
+    TrailerDB,
+    TrailerInspectionItemsDB,
+    TrailerInspectionPhotoDB,
+    TruckInspectionItemsDB,
+    TruckInspectionPhotoDB,
+)
+
+CITIES = (
+    (25.6866, -100.3161),
+    (19.4326, -99.1332),
+    (20.6597, -103.3496),
+    (32.5149, -117.0382),
+    (31.6904, -106.4245),
+    (29.4241, -98.4936),
+    (32.7767, -96.7970),
+)
+DESCRIPTIONS = (
+    "Air leak at the gladhand seal",
+    "Cracked windshield, passenger side",
+    "Brake chamber leaking air",
+    "Tire tread below 4/32 on the outer dual",
+    "Marker light out on the rear left",
+    "Fuga de aire en la línea de servicio",
+    "Parabrisas estrellado del lado del conductor",
+    "Llanta con desgaste irregular",
+    "Cinta reflejante despegada",
+    "Oil leak under the engine",
+)
+REMARKS = (
+    "Unidad en buen estado.",
+    "Se reportó al taller.",
+    "Revisar en la siguiente parada.",
+    "Defecto menor, no impide circular.",
+)
+
+
+@dataclass(frozen=True)
+class FleetProfile:
+    """
+    Distribuciones de la flota sintética.
+    """
+    carriers: int = 20
+    carrier_skew: float = 1.0
+    trucks: int = 2000
+    trailers_per_truck: float = 1.5
+    trailer_weights: tuple = (0.1, 0.3, 0.6)
+    truck_defect_rate: float = 0.03
+    trailer_defect_rate: float = 0.05
+    item_defect_rates: dict = field(default_factory=dict)
+    # Desviación del logaritmo de la condición de cada unidad; 0 = todas iguales
+    unit_variance: float = 0.5
+    defect_photo_rate: float = 0.6
+    # Probabilidad de que una lista con algún defecto lleve `other_description`
+    description_rate: float = 0.3
+    photo_rate: float = 0.01
+    remarks_rate: float = 0.1
+    start: datetime = datetime(2024, 1, 1)
+    days: int = 730
+
+
+class _Checklist:
+    """
+    Tasas de defecto por item de una lista y generación de sus filas.
+    """
+
+    def __init__(self, item_keys, default_rate: float, overrides: dict):
+        self.item_keys = item_keys
+        self.rates = tuple(overrides.get(key, default_rate) for key in item_keys)
+        self.all_pass = (1 << len(item_keys)) - 1
+
+    def draw(self, condition: float, profile: FleetProfile):
+        """
+        Bits de `checks` (1 = en buen estado), fotos (item_key -> photo_ref) y descripción de una inspección.
+        """
+        checks = 0
+        photos = {}
+        for bit, rate in enumerate(self.rates):
+            if random.random() >= rate * condition:
+                checks |= 1 << bit
+            elif random.random() < profile.defect_photo_rate:
+                photos[self.item_keys[bit]] = f"synthetic/{random.getrandbits(64):016x}.jpg"
+        # Una sola tirada por lista: aproxima `photo_rate` por item sin un random() extra por item
+        if random.random() < profile.photo_rate * len(self.item_keys):
+            item_key = random.choice(self.item_keys)
+            photos.setdefault(item_key, f"synthetic/{random.getrandbits(64):016x}.jpg")
+        description = None
+        if checks != self.all_pass and random.random() < profile.description_rate:
+            description = random.choice(DESCRIPTIONS)
+        return checks, photos, description
+
+
+def _zipf_weights(count: int, skew: float):
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def _conditions(count: int, variance: float):
+    # Media 1: la tasa promedio de la flota se mantiene cerca de la configurada
+    return [math.exp(random.gauss(-variance ** 2 / 2, variance)) for _ in range(count)]
+
+
+def _next_id(connection, model) -> int:
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def generate_fleet(engine, reports: int, profile: FleetProfile = FleetProfile(), chunk_size: int = 10000,
+                   progress=None) -> int:
+    """
+    Inserta `reports` reportes sintéticos, un bloque de `chunk_size` por transacción.
+
+    No recalcula agregados ni estado de unidades; eso queda a cargo del llamador.
+    `progress`, si se indica, se llama con el total insertado después de cada bloque.
+    """
+    truck_checklist = _Checklist(TRUCK_ITEM_KEYS, profile.truck_defect_rate, profile.item_defect_rates)
+    trailer_checklist = _Checklist(TRAILER_ITEM_KEYS, profile.trailer_defect_rate, profile.item_defect_rates)
+
+    carrier_weights = _zipf_weights(profile.carriers, profile.carrier_skew)
+    truck_carriers = random.choices(range(profile.carriers), weights=carrier_weights, k=profile.trucks)
+    truck_conditions = _conditions(profile.trucks, profile.unit_variance)
+    truck_odometers = [random.randrange(50000, 800000) for _ in range(profile.trucks)]
+    truck_daily_km = [random.uniform(150, 700) for _ in range(profile.trucks)]
+    truck_cities = [random.choice(CITIES) for _ in range(profile.trucks)]
+
+    # Cada transportista tiene su propio grupo de trailers
+    trailer_pool = {carrier: [] for carrier in range(profile.carriers)}
+    trailer_count = max(1, round(profile.trucks * profile.trailers_per_truck))
+    for number, carrier in enumerate(random.choices(range(profile.carriers), weights=carrier_weights,
+                                                    k=trailer_count)):
+        trailer_pool[carrier].append(number)
+    trailer_conditions = _conditions(trailer_count, profile.unit_variance)
+    trailer_choices = range(len(profile.trailer_weights))
+
+    with engine.connect() as connection:
+        report_id = _next_id(connection, InspectionReportDB)
+        truck_checklist_id = _next_id(connection, TruckInspectionItemsDB)
+        trailer_id = _next_id(connection, TrailerDB)
+        trailer_checklist_id = _next_id(connection, TrailerInspectionItemsDB)
+
+    span_minutes = profile.days * 24 * 60
+    step = span_minutes / max(1, reports)
+    inserted = 0
+    while inserted < reports:
+        rows = {model: [] for model in (InspectionReportDB, TruckInspectionItemsDB, TruckInspectionPhotoDB,
+                                        TrailerDB, TrailerInspectionItemsDB, TrailerInspectionPhotoDB)}
+        for i in range(inserted, min(inserted + chunk_size, reports)):
+            truck = random.randrange(profile.trucks)
+            carrier = truck_carriers[truck]
+            minutes = min(span_minutes - 1, i * step + random.uniform(0, step))
+            latitude, longitude = truck_cities[truck]
+            rows[InspectionReportDB].append(dict(
+                id=report_id,
+                carrier=f"Carrier {carrier}",
+                address=f"Lat: {latitude + random.uniform(-0.2, 0.2):.4f}, "
+                        f"Lng: {longitude + random.uniform(-0.2, 0.2):.4f}",
+                inspection_date=profile.start + timedelta(minutes=minutes),
+                truck_number=f"T-{truck}",
+                odometer_reading=int(truck_odometers[truck] + minutes / 1440 * truck_daily_km[truck]),
+                remarks=random.choice(REMARKS) if random.random() < profile.remarks_rate else None,
+            ))
+
+            checks, photos, description = truck_checklist.draw(truck_conditions[truck], profile)
+            rows[TruckInspectionItemsDB].append(dict(id=truck_checklist_id, report_id=report_id, checks=checks,
+                                                     other_description=description))
+            rows[TruckInspectionPhotoDB].extend(
+                dict(checklist_id=truck_checklist_id, item_key=key, photo_ref=ref) for key, ref in photos.items()
+            )
+            truck_checklist_id += 1
+
+            pool = trailer_pool[carrier]
+            trailer_total = random.choices(trailer_choices, weights=profile.trailer_weights)[0] if pool else 0
+            for number in random.sample(pool, min(trailer_total, len(pool))):
+                rows[TrailerDB].append(dict(id=trailer_id, report_id=report_id, trailer_number=f"TR-{number}"))
+                checks, photos, description = trailer_checklist.draw(trailer_conditions[number], profile)
+                rows[TrailerInspectionItemsDB].append(dict(id=trailer_checklist_id, trailer_id=trailer_id,
+                                                           checks=checks, other_description=description))
+                rows[TrailerInspectionPhotoDB].extend(
+                    dict(checklist_id=trailer_checklist_id, item_key=key, photo_ref=ref)
+                    for key, ref in photos.items()
+                )
+                trailer_id += 1
+                trailer_checklist_id += 1
+            report_id += 1
+
+        with engine.begin() as connection:
+            for model, model_rows in rows.items():
+                if model_rows:
+                    connection.execute(insert(model.__table__), model_rows)
+        inserted += len(rows[InspectionReportDB])
+        if progress is not None:
+            progress(inserted)
+    return inserted
+
+
+def _rates(value: str) -> dict:
+    rates = {}
+    for part in value.split(","):
+        item_key, rate = part.split("=")
+        if item_key not in TRUCK_ITEM_KEYS and item_key not in TRAILER_ITEM_KEYS:
+            raise argparse.ArgumentTypeError(f"item desconocido: {item_key}")
+        rates[item_key] = float(rate)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=1000000)
+    parser.add_argument("--carriers", type=int, default=FleetProfile.carriers)
+    parser.add_argument("--carrier-skew", type=float, default=FleetProfile.carrier_skew,
+                        help="Exponente de Zipf del tamaño de las flotas; 0 = todas iguales")
+    parser.add_argument("--trucks", type=int, default=FleetProfile.trucks)
+    parser.add_argument("--trailers-per-truck", type=float, default=FleetProfile.trailers_per_truck)
+    parser.add_argument("--trailers", default=",".join(map(str, FleetProfile.trailer_weights)),
+                        help="Pesos de 0, 1, 2, ... trailers por reporte")
+    parser.add_argument("--truck-defect-rate", type=float, default=FleetProfile.truck_defect_rate)
+    parser.add_argument("--trailer-defect-rate", type=float, default=FleetProfile.trailer_defect_rate)
+    parser.add_argument("--item-defect-rate", type=_rates, default={}, help="item=tasa,item=tasa,...")
+    parser.add_argument("--unit-variance", type=float, default=FleetProfile.unit_variance)
+    parser.add_argument("--defect-photo-rate", type=float, default=FleetProfile.defect_photo_rate)
+    parser.add_argument("--photo-rate", type=float, default=FleetProfile.photo_rate,
+                        help="Probabilidad de foto de un item en buen estado")
+    parser.add_argument("--description-rate", type=float, default=FleetProfile.description_rate,
+                        help="Probabilidad de descripción en una lista con defectos")
+    parser.add_argument("--remarks-rate", type=float, default=FleetProfile.remarks_rate)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=FleetProfile.start)
+    parser.add_argument("--days", type=int, default=FleetProfile.days)
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Reportes por transacción")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-derived", action="store_true", help="No recalcular agregados ni estado de unidades")
+    args = parser.parse_args()
+
+    from database import Base, engine
+    from rollups import rebuild_rollups
+    from unit_status import rebuild_status
+
+    random.seed(args.seed)
+    profile = FleetProfile(
+        carriers=args.carriers,
+        carrier_skew=args.carrier_skew,
+        trucks=args.trucks,
+        trailers_per_truck=args.trailers_per_truck,
+        trailer_weights=tuple(float(weight) for weight in args.trailers.split(",")),
+        truck_defect_rate=args.truck_defect_rate,
+        trailer_defect_rate=args.trailer_defect_rate,
+        item_defect_rates=args.item_defect_rate,
+        unit_variance=args.unit_variance,
+        defect_photo_rate=args.defect_photo_rate,
+        photo_rate=args.photo_rate,
+        description_rate=args.description_rate,
+        remarks_rate=args.remarks_rate,
+        start=args.start,
+        days=args.days,
+    )
+
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+
+    def progress(inserted: int):
+        elapsed = time.perf_counter() - start
+        print(f"\r{inserted:,} reportes en {elapsed:.0f}s ({inserted / elapsed * 60:,.0f}/min)", end="", flush=True)
+
+    generate_fleet(engine, args.reports, profile, args.chunk_size, progress)
+    print()
+    if not args.skip_derived:
+        derived_start = time.perf_counter()
+        with engine.begin() as connection:
+            rebuild_rollups(connection)
+            rebuild_status(connection)
+        print(f"Agregados y estado de unidades recalculados en {time.perf_counter() - derived_start:.1f}s")
+    print(f"Total: {time.perf_counter() - start:.1f}s")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
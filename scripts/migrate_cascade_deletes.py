@@ -0,0 +1,112 @@
+"""
+Agrega ON DELETE CASCADE a las llaves foráneas que dependen de un reporte
+(items, trailers, fotos y estado de las unidades) en una base existente.
+
+SQLite no permite cambiar una llave foránea, así que cada tabla se reconstruye
+como en `migrate_checklist_bitmask`: se renombra, se crea de nuevo desde los
+modelos, se copian las filas y se elimina la anterior, todo en una sola
+transacción. Las tablas cuyas llaves ya tienen ON DELETE CASCADE se omiten, así
+que el script se puede ejecutar más de una vez. Los triggers de la búsqueda se
+eliminan con las tablas anteriores y se vuelven a crear al final.
+
+Uso:
+    DATABASE_URL=sqlite:///database.db python -m scripts.migrate_cascade_deletes
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, engine  # noqa: E402
+from models import (  # noqa: E402
+    TrailerDB,
+    TrailerInspectionItemsDB,
+    TrailerInspectionPhotoDB,
+    TrailerStatusDB,
+    TruckInspectionItemsDB,
+    TruckInspectionPhotoDB,
+    TruckStatusDB,
+)
+
+CASCADE_MODELS = (
+    TruckInspectionItemsDB,
+    TruckInspectionPhotoDB,
+    TrailerDB,
+    TrailerInspectionItemsDB,
+    TrailerInspectionPhotoDB,
+    TruckStatusDB,
+    TrailerStatusDB,
+)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def migrate_table(connection, model) -> int:
+    """
+    Reconstruye la tabla de `model` y devuelve cuántas filas se copiaron (0 si no hacía falta).
+    """
+    table = model.__table__
+    foreign_keys = connection.exec_driver_sql(f"PRAGMA foreign_key_list({_quote(table.name)})").mappings().all()
+    if not foreign_keys or all(foreign_key["on_delete"] == "CASCADE" for foreign_key in foreign_keys):
+        return 0
+
+    old_name = f"{table.name}_restrict"
+    connection.exec_driver_sql(f"ALTER TABLE {_quote(table.name)} RENAME TO {_quote(old_name)}")
+    # Los índices conservan su nombre al renombrar la tabla; se eliminan para poder recrearlos
+    index_names = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (old_name,),
+    ).scalars().all()
+    for index_name in index_names:
+        connection.exec_driver_sql(f"DROP INDEX {_quote(index_name)}")
+
+    table.create(connection)
+    columns = ", ".join(_quote(column.name) for column in table.columns)
+    connection.exec_driver_sql(
+        f"INSERT INTO {_quote(table.name)} ({columns}) SELECT {columns} FROM {_quote(old_name)}"
+    )
+
+    migrated = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {_quote(old_name)}").scalar()
+    connection.exec_driver_sql(f"DROP TABLE {_quote(old_name)}")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vacuum", action="store_true", help="Compactar el archivo de la base al terminar")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        # Sin esto, SQLite reescribiría las llaves foráneas de las tablas hijas
+        # para que apunten a la tabla renombrada.
+        connection.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+        connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        connection.commit()
+
+        with connection.begin():
+            # pysqlite solo abre la transacción antes de INSERT/UPDATE/DELETE; aquí
+            # también deben quedar dentro los ALTER/CREATE/DROP
+            connection.exec_driver_sql("BEGIN")
+            for model in CASCADE_MODELS:
+                migrated = migrate_table(connection, model)
+                print(f"{model.__tablename__}: {migrated} filas copiadas")
+            # Vuelve a crear los triggers de la búsqueda que se eliminaron con las tablas anteriores
+            Base.metadata.create_all(connection)
+            problems = connection.exec_driver_sql("PRAGMA foreign_key_check").all()
+            if problems:
+                raise RuntimeError(f"Llaves foráneas inválidas después de migrar: {problems[:10]}")
+
+        connection.exec_driver_sql("PRAGMA foreign_keys = ON")
+        connection.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+        if args.vacuum:
+            connection.commit()
+            connection.exec_driver_sql("VACUUM")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Migra las listas de verificación del esquema ancho (una columna Boolean y una
+columna de foto por item) al esquema compacto: bits en `checks` y una fila por
+foto en `truck_inspection_photos` / `trailer_inspection_photos`.
+
+Cada tabla se reconstruye en una sola transacción: se renombra la tabla
+anterior, se crea la nueva desde los modelos, se copian los datos y se elimina
+la anterior. Las tablas que ya tienen la columna `checks` se omiten, así que el
+script se puede ejecutar más de una vez.
+
+Uso:
+    DATABASE_URL=sqlite:///database.db python -m scripts.migrate_checklist_bitmask
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import inspect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, engine  # noqa: E402
+from models import TrailerInspectionItemsDB, TruckInspectionItemsDB  # noqa: E402
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def migrate_checklist(connection, model) -> int:
+    """
+    Convierte la tabla de `model` y devuelve cuántas filas se migraron (0 si ya estaba migrada).
+    """
+    table = model.__table__
+    photo_table = model.photo_class.__table__
+    columns = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    if "checks" in columns:
+        return 0
+
+    old_name = f"{table.name}_wide"
+    connection.exec_driver_sql(f"ALTER TABLE {_quote(table.name)} RENAME TO {_quote(old_name)}")
+    # Los índices conservan su nombre al renombrar la tabla; se eliminan para poder recrearlos
+    index_names = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (old_name,),
+    ).scalars().all()
+    for index_name in index_names:
+        connection.exec_driver_sql(f"DROP INDEX {_quote(index_name)}")
+
+    table.create(connection)
+    photo_table.create(connection, checkfirst=True)
+
+    checks = " | ".join(
+        f"(COALESCE({_quote(item_key)}, 0) << {bit})"
+        for bit, item_key in enumerate(model.ITEM_KEYS)
+    )
+    parent_key = next(column.name for column in table.columns if column.foreign_keys)
+    connection.exec_driver_sql(
+        f"INSERT INTO {_quote(table.name)} (id, {parent_key}, checks, other_description) "
+        f"SELECT id, {parent_key}, {checks}, other_description FROM {_quote(old_name)}"
+    )
+
+    for item_key in model.ITEM_KEYS:
+        photo_column = _quote(f"{item_key}_photo")
+        connection.exec_driver_sql(
+            f"INSERT INTO {_quote(photo_table.name)} (checklist_id, item_key, photo_ref) "
+            f"SELECT id, ?, {photo_column} FROM {_quote(old_name)} WHERE {photo_column} IS NOT NULL",
+            (item_key,),
+        )
+
+    migrated = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {_quote(old_name)}").scalar()
+    connection.exec_driver_sql(f"DROP TABLE {_quote(old_name)}")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vacuum", action="store_true", help="Compactar el archivo de la base al terminar")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        # Sin esto, SQLite reescribiría las llaves foráneas de las tablas de fotos
+        # (si ya existían) para que apunten a la tabla renombrada.
+        connection.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+        connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        connection.commit()
+
+        with connection.begin():
+            # pysqlite solo abre la transacción antes de INSERT/UPDATE/DELETE; aquí
+            # también deben quedar dentro los ALTER/CREATE/DROP
+            connection.exec_driver_sql("BEGIN")
+            for model in (TruckInspectionItemsDB, TrailerInspectionItemsDB):
+                migrated = migrate_checklist(connection, model)
+                print(f"{model.__tablename__}: {migrated} filas migradas")
+            # Crea cualquier otra tabla nueva del modelo
+            Base.metadata.create_all(connection)
+            problems = connection.exec_driver_sql("PRAGMA foreign_key_check").all()
+            if problems:
+                raise RuntimeError(f"Llaves foráneas inválidas después de migrar: {problems[:10]}")
+
+        connection.exec_driver_sql("PRAGMA foreign_keys = ON")
+        connection.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+        if args.vacuum:
+            connection.commit()
+            connection.exec_driver_sql("VACUUM")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Agrega la columna `version` a `inspection_reports` en bases creadas antes de
+que existiera. Los reportes existentes quedan en la versión 1. Si la columna
+ya existe no hace nada.
+
+Uso:
+    DATABASE_URL=sqlite:///database.db python -m scripts.migrate_report_version
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import inspect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    with engine.begin() as connection:
+        columns = {column["name"] for column in inspect(connection).get_columns("inspection_reports")}
+        if "version" in columns:
+            print("inspection_reports.version ya existe")
+        else:
+            connection.exec_driver_sql(
+                "ALTER TABLE inspection_reports ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
+            print("inspection_reports.version agregada")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
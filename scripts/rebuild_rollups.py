@@ -0,0 +1,36 @@
+"""
+Recalcula desde cero los agregados de inspecciones y defectos (`inspection_rollups`
+y `defect_rollups`) a partir de los reportes guardados.
+
+Se ejecuta en una sola transacción, así que la analítica nunca ve agregados a
+medio calcular. Sirve después de migraciones, cargas masivas o si los agregados
+quedaron inconsistentes.
+
+Uso:
+    DATABASE_URL=sqlite:///database.db python -m scripts.rebuild_rollups
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, engine  # noqa: E402
+from rollups import rebuild_rollups  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        rebuild_rollups(connection)
+    print(f"Agregados recalculados en {time.perf_counter() - start:.1f}s")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Recalcula desde cero el índice de búsqueda de texto completo (`report_search`)
+a partir de los reportes guardados.
+
+El índice se crea y se llena solo la primera vez que la aplicación arranca
+sobre una base sin él, y los triggers lo mantienen al día; este script sirve si
+quedó inconsistente o después de cargar datos con los triggers desactivados.
+
+Uso:
+    DATABASE_URL=sqlite:///database.db python -m scripts.rebuild_search_index
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, engine  # noqa: E402
+from search import rebuild_search_index  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        rebuild_search_index(connection)
+    print(f"Índice de búsqueda recalculado en {time.perf_counter() - start:.1f}s")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Recalcula desde cero el estado actual de camiones y trailers (`truck_status` y
+`trailer_status`) a partir de los reportes guardados, en una sola transacción.
+
+Uso:
+    DATABASE_URL=sqlite:///database.db python -m scripts.rebuild_unit_status
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, engine  # noqa: E402
+from unit_status import rebuild_status  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        rebuild_status(connection)
+    print(f"Estado de las unidades recalculado en {time.perf_counter() - start:.1f}s")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
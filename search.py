@@ -0,0 +1,180 @@
+"""
+Búsqueda de texto completo sobre las observaciones y las descripciones de defectos.
+
+`report_search` es una tabla virtual FTS5 con una fila por reporte (rowid = id
+del reporte) y dos columnas: `remarks` del reporte y `descriptions`, las
+`other_description` del camión y de sus trailers. Solo se indexan los reportes
+que tienen algún texto.
+
+La tabla se mantiene con triggers en `inspection_reports`,
+`truck_inspection_items`, `trailers` y `trailer_inspection_items`, así que la
+sincronizan todas las rutas de escritura (ORM, carga masiva, scripts) sin
+código adicional. Cada trigger vuelve a armar la fila del reporte afectado.
+"""
+import os
+import re
+
+from sqlalchemy import text
+
+SEARCH_TABLE = "report_search"
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "2000"))
+
+# Textos de un reporte; sin fila si no tiene ninguno. Es el contenido que indexa `report_search`.
+_REPORT_TEXT = """
+SELECT id, remarks, descriptions FROM (
+    SELECT r.id AS id, r.remarks AS remarks, (
+        SELECT group_concat(description, ' ') FROM (
+            SELECT ci.other_description AS description FROM truck_inspection_items ci
+            WHERE ci.report_id = r.id AND ci.other_description IS NOT NULL
+            UNION ALL
+            SELECT ti.other_description FROM trailers t
+            JOIN trailer_inspection_items ti ON ti.trailer_id = t.id
+            WHERE t.report_id = r.id AND ti.other_description IS NOT NULL
+        )
+    ) AS descriptions
+    FROM inspection_reports r
+    WHERE {condition}
+)
+WHERE remarks IS NOT NULL OR descriptions IS NOT NULL
+"""
+
+
+def _refresh(report_id: str) -> str:
+    return (
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid = {report_id}; "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, remarks, descriptions) "
+        + _REPORT_TEXT.format(condition=f"r.id = {report_id}") + ";"
+    )
+
+
+_TRAILER_REPORT = "(SELECT report_id FROM trailers WHERE id = {}.trailer_id)"
+_INDEXED = f"EXISTS (SELECT 1 FROM {SEARCH_TABLE} WHERE rowid = {{}})"
+
+# (nombre, evento, condición, id del reporte afectado)
+_TRIGGERS = (
+    ("report_search_report_insert", "INSERT ON inspection_reports",
+     "NEW.remarks IS NOT NULL", "NEW.id"),
+    ("report_search_report_update", "UPDATE OF remarks ON inspection_reports",
+     "OLD.remarks IS NOT NEW.remarks", "NEW.id"),
+    ("report_search_truck_insert", "INSERT ON truck_inspection_items",
+     "NEW.other_description IS NOT NULL", "NEW.report_id"),
+    ("report_search_truck_update", "UPDATE OF other_description ON truck_inspection_items",
+     "OLD.other_description IS NOT NEW.other_description", "NEW.report_id"),
+    ("report_search_truck_delete", "DELETE ON truck_inspection_items",
+     "OLD.other_description IS NOT NULL", "OLD.report_id"),
+    ("report_search_trailer_insert", "INSERT ON trailer_inspection_items",
+     "NEW.other_description IS NOT NULL", _TRAILER_REPORT.format("NEW")),
+    ("report_search_trailer_update", "UPDATE OF other_description ON trailer_inspection_items",
+     "OLD.other_description IS NOT NEW.other_description", _TRAILER_REPORT.format("NEW")),
+    ("report_search_trailer_delete", "DELETE ON trailer_inspection_items",
+     "OLD.other_description IS NOT NULL", _TRAILER_REPORT.format("OLD")),
+    # Si los items se eliminan en cascada después del trailer, ya no se puede llegar al reporte desde ellos
+    ("report_search_trailer_remove", "DELETE ON trailers",
+     _INDEXED.format("OLD.report_id"), "OLD.report_id"),
+)
+
+
+def create_search_index(target, connection, **kw):
+    """
+    Crea la tabla FTS5 y sus triggers si no existen (evento `after_create` de los metadatos).
+
+    Cuando la tabla es nueva en una base con reportes, se llena en la misma transacción.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SEARCH_TABLE}
+    ).first()
+    if not exists:
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            "remarks, descriptions, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        rebuild_search_index(connection)
+
+    for name, trigger_event, condition, report_id in _TRIGGERS:
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {trigger_event} "
+            f"WHEN {condition} BEGIN {_refresh(report_id)} END"
+        ))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS report_search_report_delete AFTER DELETE ON inspection_reports "
+        f"BEGIN DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id; END"
+    ))
+
+
+def rebuild_search_index(connection):
+    """
+    Vacía y vuelve a llenar `report_search` a partir de los reportes, dentro de la transacción de `connection`.
+    """
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    connection.execute(text(
+        f"INSERT INTO {SEARCH_TABLE}(rowid, remarks, descriptions) " + _REPORT_TEXT.format(condition="1")
+    ))
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"))
+
+
+_QUERY_TERMS = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def match_expression(query: str) -> str:
+    """
+    Expresión MATCH de FTS5 a partir del texto del usuario.
+
+    Las frases entre comillas se buscan como frase y las demás palabras deben
+    aparecer todas, en cualquier orden. La sintaxis de FTS5 (operadores,
+    paréntesis, columnas) no se interpreta, así que el texto nunca produce un
+    error de sintaxis. Devuelve "" si no hay ninguna palabra.
+    """
+    terms = []
+    for phrase, word in _QUERY_TERMS.findall(query):
+        tokens = re.findall(r"\w+", phrase or word)
+        if tokens:
+            terms.append('"' + " ".join(tokens) + '"')
+    return " ".join(terms)
+
+
+_SNIPPET = f"snippet({SEARCH_TABLE}, -1, '[', ']', '…', 12)"
+
+# bm25 cuesta unos microsegundos por coincidencia: solo se calcula para las
+# SEARCH_RANK_WINDOW coincidencias más recientes (el rowid es el id del reporte).
+# Se lee una más para saber si quedaron coincidencias fuera; la primera fila del
+# resultado siempre existe y lleva `truncated`, aunque la página esté vacía.
+RELEVANCE_QUERY = text(
+    f"WITH hits AS ("
+    f"SELECT rowid AS id, rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match "
+    f"ORDER BY rowid DESC LIMIT :window + 1"
+    f"), ranked AS (SELECT id, rank FROM hits ORDER BY id DESC LIMIT :window), "
+    f"page AS (SELECT id, rank FROM ranked ORDER BY rank, id DESC LIMIT :limit OFFSET :offset), "
+    f"page_hits AS MATERIALIZED ("
+    f"SELECT page.id AS id, page.rank AS rank, {_SNIPPET} AS snippet "
+    f"FROM page JOIN {SEARCH_TABLE} ON {SEARCH_TABLE}.rowid = page.id WHERE {SEARCH_TABLE} MATCH :match) "
+    f"SELECT flag.truncated AS truncated, page_hits.id AS id, page_hits.rank AS rank, page_hits.snippet AS snippet "
+    f"FROM (SELECT count(*) > :window AS truncated FROM hits) AS flag LEFT JOIN page_hits "
+    f"ORDER BY page_hits.rank, page_hits.id DESC"
+)
+RECENT_QUERY = text(
+    f"SELECT rowid AS id, NULL AS rank, {_SNIPPET} AS snippet FROM {SEARCH_TABLE} "
+    f"WHERE {SEARCH_TABLE} MATCH :match ORDER BY rowid DESC LIMIT :limit OFFSET :offset"
+)
+
+
+async def search_reports(db, query: str, limit: int, offset: int = 0, recent: bool = False):
+    """
+    Reportes que coinciden con `query`, del más relevante al menos relevante (bm25).
+
+    La relevancia se calcula sobre las `SEARCH_RANK_WINDOW` coincidencias más
+    recientes, así que una búsqueda muy común no recorre millones de filas; con
+    `recent` el orden es del reporte más reciente al más antiguo, sin ese límite
+    y sin calcular `rank` (bm25 recorre todas las coincidencias para sus estadísticas).
+
+    Devuelve (coincidencias, truncated); `truncated` indica que hubo más de
+    `SEARCH_RANK_WINDOW` coincidencias y que las más antiguas no se ordenaron.
+    """
+    params = {"match": match_expression(query), "limit": limit, "offset": offset}
+    if recent:
+        result = await db.execute(RECENT_QUERY, params)
+        return result.mappings().all(), False
+    rows = (await db.execute(RELEVANCE_QUERY, {**params, "window": SEARCH_RANK_WINDOW})).mappings().all()
+    hits = [{key: row[key] for key in ("id", "rank", "snippet")} for row in rows if row["id"] is not None]
+    return hits, bool(rows[0]["truncated"])
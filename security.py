@@ -1,21 +1,51 @@
 import os
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
-from models import User
+from cache import TTLCache
+from database import get_async_db
+from models import Role, User
 
 SECRET_KEY = os.getenv("SECRET_KEY", "24071999")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
+@dataclass(frozen=True)
+class Principal:
+    """
+    Usuario autenticado de la solicitud; solo los datos necesarios para autorizar.
+    """
+    id: int
+    username: str
+    role: Role
+
+
+# Usuarios ya resueltos, por `sub` del token
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+
+def invalidate_principal(username: str):
+    """
+    Descarta el usuario de la caché; se llama al modificarlo o eliminarlo, después del commit.
+
+    También descarta las lecturas en curso (ver `TTLCache.generation`): una consulta que empezó
+    antes del commit no puede volver a guardar el rol anterior o un usuario eliminado.
+    """
+    principal_cache.invalidate(username)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Genera un token JWT
@@ -30,9 +60,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
     """
-    Extrae los datos del token y busca el usuario en la base de datos
+    Extrae los datos del token y busca el usuario, primero en la caché y luego en la base de datos
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,9 +78,16 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except jwt.PyJWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+
+    # Si el usuario se modifica o elimina mientras se consulta, lo leído no se guarda en la caché
+    generation = principal_cache.generation
+    user = await db.scalar(select(User).where(User.username == username))
     if not user:
         raise credentials_exception
 
-    return user
-
+    principal = Principal(id=user.id, username=user.username, role=user.role)
+    principal_cache.set(username, principal, generation)
+    return principal
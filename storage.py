@@ -0,0 +1,131 @@
+import hashlib
+import os
+import re
+import tempfile
+from typing import BinaryIO, Optional
+
+PHOTO_STORAGE_DIR = os.getenv("PHOTO_STORAGE_DIR", "photos")
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(20 * 1024 * 1024)))
+CHUNK_SIZE = 1024 * 1024
+# Bytes iniciales con los que se identifica el formato
+_HEAD_SIZE = 16
+
+MEDIA_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "heic": "image/heic",
+}
+_PHOTO_REF_PATTERN = re.compile(r"[0-9a-f]{64}\.(jpg|png|webp|heic)")
+
+
+class PhotoTooLarge(Exception):
+    pass
+
+
+class UnsupportedPhotoType(Exception):
+    pass
+
+
+def _detect_extension(head: bytes) -> Optional[str]:
+    """
+    Identifica el formato de la imagen por sus primeros bytes.
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1", b"ftypmsf1"):
+        return "heic"
+    return None
+
+
+def is_valid_photo_ref(photo_ref: str) -> bool:
+    return _PHOTO_REF_PATTERN.fullmatch(photo_ref) is not None
+
+
+def photo_path(photo_ref: str) -> str:
+    """
+    Ruta en disco de una foto a partir de su referencia `<sha256>.<ext>`.
+    """
+    return os.path.join(PHOTO_STORAGE_DIR, photo_ref[:2], photo_ref)
+
+
+def derivative_path(photo_ref: str, variant: str) -> str:
+    """
+    Ruta en disco de una versión reducida (`thumb`, `medium`) de una foto.
+    """
+    digest = photo_ref.split(".", 1)[0]
+    return os.path.join(PHOTO_STORAGE_DIR, photo_ref[:2], f"{digest}.{variant}.webp")
+
+
+class PhotoWriter:
+    """
+    Guarda una foto recibida por bloques bajo el hash SHA-256 de su contenido.
+
+    Los bloques se escriben en un archivo temporal mientras se calcula el hash;
+    `finish` lo mueve a su ruta definitiva y devuelve la referencia. Si ya existe
+    una foto con el mismo contenido, se conserva la existente. `discard` borra el
+    archivo temporal si la foto no se terminó de guardar.
+    """
+
+    def __init__(self):
+        os.makedirs(PHOTO_STORAGE_DIR, exist_ok=True)
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self._head = b""
+        self._extension = None
+        fd, self._tmp_path = tempfile.mkstemp(dir=PHOTO_STORAGE_DIR, suffix=".upload")
+        self._tmp = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes):
+        if self._extension is None:
+            # El formato se identifica por los primeros bytes, aunque lleguen en varios bloques
+            self._head += data[:_HEAD_SIZE - len(self._head)]
+            if len(self._head) == _HEAD_SIZE:
+                self._detect()
+        self._size += len(data)
+        if self._size > PHOTO_MAX_BYTES:
+            raise PhotoTooLarge()
+        self._digest.update(data)
+        self._tmp.write(data)
+
+    def _detect(self):
+        self._extension = _detect_extension(self._head)
+        if self._extension is None:
+            raise UnsupportedPhotoType()
+
+    def finish(self) -> str:
+        if self._extension is None:
+            self._detect()
+        self._tmp.close()
+
+        photo_ref = f"{self._digest.hexdigest()}.{self._extension}"
+        path = photo_path(photo_ref)
+        if os.path.exists(path):
+            os.remove(self._tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._tmp_path, path)
+        return photo_ref
+
+    def discard(self):
+        self._tmp.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def save_photo(source: BinaryIO) -> str:
+    """
+    Guarda una foto leída de un archivo, por bloques de `CHUNK_SIZE`, y devuelve su referencia.
+    """
+    writer = PhotoWriter()
+    try:
+        while chunk := source.read(CHUNK_SIZE):
+            writer.write(chunk)
+        return writer.finish()
+    except BaseException:
+        writer.discard()
+        raise
@@ -0,0 +1,128 @@
+"""
+Configuración común de las pruebas.
+
+La aplicación se importa una sola vez contra una base SQLite temporal; las
+variables de entorno se fijan antes de importar cualquier módulo del proyecto,
+porque `database.py` y `config.py` las leen al importarse.
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import count
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_database_dir = tempfile.mkdtemp(prefix="vehicle-inspection-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+os.environ["PHOTO_STORAGE_DIR"] = os.path.join(_database_dir, "photos")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Una ruta que excede su `query_budget` responde 500
+os.environ["SQL_PROFILE"] = "1"
+os.environ["SQL_QUERY_BUDGET_STRICT"] = "1"
+sys.path.insert(0, ROOT)
+# `main.py` monta `frontend` con una ruta relativa
+os.chdir(ROOT)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, func, select  # noqa: E402
+
+API_PREFIX = "/vehicle_inspection_reports/vehicle-inspection-reports"
+
+_report_dates = count()
+
+
+def report_payload(truck_number: str = "T-1", trailers: int = 1, defects: bool = True) -> dict:
+    """
+    Reporte válido con `trailers` trailers; con `defects`, algunos items fallan y llevan foto.
+    """
+    from models import TRAILER_ITEM_KEYS, TRUCK_ITEM_KEYS
+
+    def checklist(item_keys):
+        items = {key: True for key in item_keys}
+        if defects:
+            items[item_keys[0]] = False
+            items[f"{item_keys[0]}_photo"] = f"{item_keys[0]}.jpg"
+        return items
+
+    return {
+        "carrier": "Carrier 1",
+        "address": "Lat: 25.6866, Lng: -100.3161",
+        "inspection_date": (datetime(2024, 1, 1) + timedelta(minutes=next(_report_dates))).isoformat(),
+        "truck_number": truck_number,
+        "odometer_reading": 120000,
+        "truck_inspection_items": checklist(TRUCK_ITEM_KEYS),
+        "trailers": [
+            {"trailer_number": f"{truck_number}-TR-{position}", "inspection_items": checklist(TRAILER_ITEM_KEYS)}
+            for position in range(trailers)
+        ],
+        "remarks": None,
+    }
+
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+    shutil.rmtree(_database_dir, ignore_errors=True)
+
+
+def _headers(client, username: str, role: str) -> dict:
+    response = client.post("/users/", json={"username": username, "password": "secreto", "role": role})
+    assert response.status_code == 200, response.text
+    response = client.post("/users/login", json={"username": username, "password": "secreto"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return _headers(client, "admin", "admin")
+
+
+@pytest.fixture(scope="session")
+def inspector_headers(client):
+    return _headers(client, "inspector", "user")
+
+
+@pytest.fixture
+def create_report(client, inspector_headers):
+    """
+    Crea un reporte por la API y devuelve su id.
+    """
+    from database import engine
+    from models import InspectionReportDB
+
+    def create(**kwargs) -> int:
+        response = client.post(f"{API_PREFIX}/", json=report_payload(**kwargs), headers=inspector_headers)
+        assert response.status_code == 200, response.text
+        with engine.connect() as connection:
+            return connection.scalar(select(func.max(InspectionReportDB.id)))
+
+    return create
+
+
+@contextmanager
+def count_statements():
+    """
+    Lista de las sentencias SQL que ejecuta la aplicación dentro del bloque.
+    """
+    from database import async_engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
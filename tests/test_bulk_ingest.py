@@ -0,0 +1,61 @@
+"""
+La carga masiva exige un arreglo JSON bien formado: exactamente una coma entre elementos.
+"""
+import json
+
+import pytest
+
+from conftest import API_PREFIX, report_payload
+
+
+def _post(client, headers, body: str):
+    return client.post(f"{API_PREFIX}/bulk", content=body.encode(),
+                       headers={**headers, "Content-Type": "application/json"})
+
+
+def _count(client, headers, truck_number: str) -> int:
+    response = client.get(f"{API_PREFIX}/", params={"truck_number": truck_number}, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(response.json()["items"])
+
+
+def test_array_with_separators(client, admin_headers, inspector_headers):
+    report = json.dumps(report_payload("T-BULK-OK"))
+    response = _post(client, inspector_headers, f"[ {report} ,\n{report} ]")
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 2
+    assert _post(client, inspector_headers, "[]").json()["created"] == 0
+
+
+@pytest.mark.parametrize("case, template", enumerate([
+    "[{0} {0}]",
+    "[,{0}]",
+    "[{0},,{0}]",
+    "[{0},]",
+    "[,]",
+]))
+def test_malformed_separators_are_rejected(client, admin_headers, inspector_headers, case, template):
+    truck_number = f"T-BULK-COMMA-{case}"
+    report = json.dumps(report_payload(truck_number))
+    headers = {**inspector_headers, "Idempotency-Key": f"bulk-comma-{case}"}
+    response = _post(client, headers, template.format(report))
+    assert response.status_code == 400, response.text
+    assert _count(client, admin_headers, truck_number) == 0
+
+    # La clave se libera: el cliente puede corregir el cuerpo y reintentar
+    response = _post(client, headers, f"[{report}]")
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 1
+
+
+def test_malformed_after_saved_batch(client, admin_headers, inspector_headers, monkeypatch):
+    import routers.vehicle_inspection_reports as reports
+
+    monkeypatch.setattr(reports, "BULK_BATCH_SIZE", 1)
+    report = json.dumps(report_payload("T-BULK-PARTIAL"))
+    response = _post(client, inspector_headers, f"[{report},{report} {report}]")
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["created"] == 2 and body["failed"] == 1
+    assert body["results"][2]["errors"][0]["type"] == "json_invalid"
+    assert _count(client, admin_headers, "T-BULK-PARTIAL") == 2
@@ -0,0 +1,57 @@
+"""
+La subida de fotos escribe el archivo directamente en el almacenamiento, sin dejar temporales.
+"""
+import io
+import os
+
+from PIL import Image
+
+
+def _png(color: str = "red") -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(output, format="PNG")
+    return output.getvalue()
+
+
+def _leftovers() -> list:
+    from storage import PHOTO_STORAGE_DIR
+
+    return [name for name in os.listdir(PHOTO_STORAGE_DIR) if name.endswith(".upload")]
+
+
+def test_upload_and_download(client, inspector_headers):
+    content = _png()
+    response = client.post("/photos/", files={"note": ("nota.txt", b"ignorado"), "photo": ("foto.png", content)},
+                           headers=inspector_headers)
+    assert response.status_code == 201, response.text
+    photo_ref = response.json()["photo_ref"]
+    assert photo_ref.endswith(".png")
+
+    # El mismo contenido da la misma referencia
+    again = client.post("/photos/", files={"photo": ("otra.png", content)}, headers=inspector_headers)
+    assert again.json()["photo_ref"] == photo_ref
+
+    download = client.get(f"/photos/{photo_ref}")
+    assert download.status_code == 200 and download.content == content
+    assert _leftovers() == []
+
+
+def test_rejected_uploads_leave_no_files(client, inspector_headers, monkeypatch):
+    import storage
+
+    response = client.post("/photos/", files={"photo": ("foto.txt", b"no es una imagen" * 4)},
+                           headers=inspector_headers)
+    assert response.status_code == 415, response.text
+
+    monkeypatch.setattr(storage, "PHOTO_MAX_BYTES", 100)
+    response = client.post("/photos/", files={"photo": ("foto.png", _png("blue"))}, headers=inspector_headers)
+    assert response.status_code == 413, response.text
+    monkeypatch.undo()
+
+    response = client.post("/photos/", files={"other": ("foto.png", _png("green"))}, headers=inspector_headers)
+    assert response.status_code == 422, response.text
+
+    response = client.post("/photos/", content=_png("green"),
+                           headers={**inspector_headers, "Content-Type": "image/png"})
+    assert response.status_code == 400, response.text
+    assert _leftovers() == []
@@ -0,0 +1,80 @@
+"""
+Cada ruta con `query_budget` se llama en su peor caso con `SQL_QUERY_BUDGET_STRICT=1`
+(ver `conftest.py`): si excede su presupuesto responde 500.
+
+Antes de cada llamada se vacían las cachés de usuarios y de reportes, para que
+cuenten también las consultas que se ahorran cuando están llenas.
+"""
+import pytest
+
+from conftest import API_PREFIX, report_payload
+from schemas import MAX_TRAILERS
+
+
+@pytest.fixture(autouse=True)
+def cold_caches():
+    from routers.vehicle_inspection_reports import report_cache
+    from security import principal_cache
+
+    principal_cache.clear()
+    report_cache.clear()
+
+
+def _check(response, expected_status: int):
+    assert response.status_code == expected_status, response.text
+    assert "x-sql-queries" in response.headers
+
+
+def _bulk(client, headers, reports: list) -> list:
+    response = client.post(f"{API_PREFIX}/bulk", json=reports, headers=headers)
+    _check(response, 200)
+    assert response.json()["failed"] == 0
+    return [result["id"] for result in response.json()["results"]]
+
+
+def test_create_with_max_trailers(client, inspector_headers):
+    payload = report_payload("BUDGET-CREATE", trailers=MAX_TRAILERS)
+    payload["remarks"] = "Fuga de aire en la línea del trailer"
+    response = client.post(f"{API_PREFIX}/", json=payload,
+                           headers={**inspector_headers, "Idempotency-Key": "budget-create"})
+    _check(response, 200)
+
+
+def test_create_rejects_too_many_trailers(client, inspector_headers):
+    response = client.post(f"{API_PREFIX}/", json=report_payload("BUDGET-TOO-MANY", trailers=MAX_TRAILERS + 1),
+                           headers=inspector_headers)
+    assert response.status_code == 422, response.text
+
+
+def test_list_largest_page(client, admin_headers, inspector_headers):
+    from routers.vehicle_inspection_reports import LIST_MAX_LIMIT
+
+    # Página máxima más el registro extra que indica si hay otra página
+    _bulk(client, inspector_headers,
+          [report_payload("BUDGET-LIST", trailers=MAX_TRAILERS) for _ in range(LIST_MAX_LIMIT + 1)])
+
+    response = client.get(f"{API_PREFIX}/", params={"truck_number": "BUDGET-LIST", "limit": LIST_MAX_LIMIT},
+                          headers=admin_headers)
+    _check(response, 200)
+    assert len(response.json()["items"]) == LIST_MAX_LIMIT
+    assert response.json()["next_cursor"] is not None
+
+    response = client.get(f"{API_PREFIX}/", params={"trailer_number": "BUDGET-LIST-TR-0", "limit": LIST_MAX_LIMIT},
+                          headers=admin_headers)
+    _check(response, 200)
+
+
+def test_detail_search_and_delete(client, admin_headers, inspector_headers):
+    payload = report_payload("BUDGET-DETAIL", trailers=MAX_TRAILERS)
+    payload["remarks"] = "Espejo roto del lado del conductor"
+    # Con una inspección anterior de las mismas unidades, eliminar el reporte recalcula su estado
+    [_, report_id] = _bulk(client, inspector_headers, [report_payload("BUDGET-DETAIL", trailers=MAX_TRAILERS), payload])
+
+    _check(client.get(f"{API_PREFIX}/{report_id}", headers=admin_headers), 200)
+    _check(client.get(f"{API_PREFIX}/search", params={"q": "espejo"}, headers=admin_headers), 200)
+    _check(client.delete(f"{API_PREFIX}/{report_id}", headers=admin_headers), 204)
+
+
+def test_login_and_me(client, admin_headers):
+    _check(client.post("/users/login", json={"username": "admin", "password": "secreto"}), 200)
+    _check(client.get("/users/me", headers=admin_headers), 200)
@@ -0,0 +1,62 @@
+"""
+El listado y el detalle de reportes cargan sus relaciones con selectin, y la
+creación inserta tabla por tabla: el número de consultas no depende de cuántos
+reportes, trailers o fotos haya.
+"""
+from conftest import API_PREFIX, count_statements, report_payload
+
+
+def _list_statements(client, headers, truck_number: str) -> int:
+    with count_statements() as statements:
+        response = client.get(f"{API_PREFIX}/", params={"truck_number": truck_number}, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def _detail_statements(client, headers, report_id: int) -> int:
+    from routers.vehicle_inspection_reports import report_cache
+
+    # Sin la caché de cuerpos, para medir la carga completa del reporte
+    report_cache.clear()
+    with count_statements() as statements:
+        response = client.get(f"{API_PREFIX}/{report_id}", headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_list_query_count_does_not_grow_with_reports_or_trailers(client, admin_headers, create_report):
+    create_report(truck_number="LIST-SMALL", trailers=1)
+    for _ in range(12):
+        create_report(truck_number="LIST-LARGE", trailers=3)
+    # La primera solicitud resuelve al usuario; las siguientes lo toman de la caché
+    _list_statements(client, admin_headers, "LIST-SMALL")
+
+    small = _list_statements(client, admin_headers, "LIST-SMALL")
+    large = _list_statements(client, admin_headers, "LIST-LARGE")
+
+    assert len(client.get(f"{API_PREFIX}/", params={"truck_number": "LIST-LARGE"},
+                          headers=admin_headers).json()["items"]) == 12
+    assert small == large
+
+
+def test_detail_query_count_does_not_grow_with_trailers(client, admin_headers, create_report):
+    one_trailer = create_report(truck_number="DETAIL-1", trailers=1)
+    many_trailers = create_report(truck_number="DETAIL-5", trailers=5)
+    _detail_statements(client, admin_headers, one_trailer)
+
+    assert _detail_statements(client, admin_headers, one_trailer) == _detail_statements(
+        client, admin_headers, many_trailers
+    )
+
+
+
+def test_create_query_count_does_not_grow_with_trailers(client, inspector_headers):
+    def create_statements(truck_number: str, trailers: int) -> int:
+        with count_statements() as statements:
+            response = client.post(f"{API_PREFIX}/", json=report_payload(truck_number, trailers=trailers),
+                                   headers=inspector_headers)
+        assert response.status_code == 200, response.text
+        return len(statements)
+
+    create_statements("CREATE-WARMUP", 2)
+    assert create_statements("CREATE-2", 2) == create_statements("CREATE-8", 8)
@@ -0,0 +1,35 @@
+"""
+Filtros del listado de reportes.
+"""
+from sqlalchemy import select
+
+from conftest import API_PREFIX
+
+
+def test_trailer_filter_returns_reports_with_that_trailer(client, admin_headers, create_report):
+    first = create_report(truck_number="FILTER-A", trailers=2)
+    create_report(truck_number="FILTER-B", trailers=1)
+    second = create_report(truck_number="FILTER-A", trailers=1)
+
+    response = client.get(f"{API_PREFIX}/", params={"trailer_number": "FILTER-A-TR-0"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()["items"]] == [second, first]
+
+    response = client.get(f"{API_PREFIX}/", params={"trailer_number": "FILTER-A-TR-1", "carrier": "Otro"},
+                          headers=admin_headers)
+    assert response.json()["items"] == []
+
+
+def test_trailer_filter_starts_from_trailer_index(client):
+    from database import engine
+    from models import InspectionReportDB
+    from routers.vehicle_inspection_reports import _filter_reports
+
+    query = _filter_reports(select(InspectionReportDB.id), None, None, "TR-1", None, None)
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+        ).all()
+    details = [row[-1] for row in plan]
+    assert any("ix_trailers_number_report" in detail for detail in details), details
+    assert not any(detail.startswith("SCAN inspection_reports") for detail in details), details
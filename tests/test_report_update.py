@@ -0,0 +1,67 @@
+"""
+Las ediciones concurrentes de un reporte no pueden asignar la misma versión.
+"""
+from sqlalchemy import select, update
+
+from conftest import API_PREFIX
+
+
+def _version(report_id: int) -> int:
+    from database import engine
+    from models import InspectionReportDB
+
+    with engine.connect() as connection:
+        return connection.scalar(select(InspectionReportDB.version).where(InspectionReportDB.id == report_id))
+
+
+def test_patch_bumps_version(client, admin_headers, create_report):
+    report_id = create_report(truck_number="T-PATCH")
+    etag = client.get(f"{API_PREFIX}/{report_id}", headers=admin_headers).headers["ETag"]
+
+    response = client.patch(f"{API_PREFIX}/{report_id}", json={"remarks": "Revisado"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert _version(report_id) == 2
+    assert client.get(f"{API_PREFIX}/{report_id}", headers=admin_headers).headers["ETag"] != etag
+
+
+def test_concurrent_patch_conflicts(client, admin_headers, create_report, monkeypatch):
+    from database import engine
+    from models import InspectionReportDB
+    import routers.vehicle_inspection_reports as reports
+
+    report_id = create_report(truck_number="T-RACE")
+    apply_report_changes = reports.apply_report_changes
+
+    def apply_after_other_write(db_report, report_data):
+        # Otra solicitud guarda su edición entre la lectura del reporte y el UPDATE de esta
+        with engine.begin() as connection:
+            connection.execute(
+                update(InspectionReportDB)
+                .where(InspectionReportDB.id == report_id)
+                .values(version=InspectionReportDB.version + 1, remarks="Otra edición")
+            )
+        return apply_report_changes(db_report, report_data)
+
+    monkeypatch.setattr(reports, "apply_report_changes", apply_after_other_write)
+    response = client.patch(f"{API_PREFIX}/{report_id}", json={"remarks": "Revisado"}, headers=admin_headers)
+    assert response.status_code == 409, response.text
+    assert _version(report_id) == 2
+
+    detail = client.get(f"{API_PREFIX}/{report_id}", headers=admin_headers).json()
+    assert detail["remarks"] == "Otra edición"
+
+
+def test_patch_cannot_exceed_max_trailers(client, admin_headers, create_report):
+    from schemas import MAX_TRAILERS
+
+    report_id = create_report(truck_number="T-CAP", trailers=MAX_TRAILERS)
+    response = client.patch(f"{API_PREFIX}/{report_id}", json={"trailers": [{"trailer_number": "T-CAP-EXTRA"}]},
+                            headers=admin_headers)
+    assert response.status_code == 400, response.text
+
+    response = client.patch(
+        f"{API_PREFIX}/{report_id}",
+        json={"trailers": [{"trailer_number": "T-CAP-EXTRA"}], "remove_trailers": ["T-CAP-TR-0"]},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200, response.text
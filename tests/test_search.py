@@ -0,0 +1,31 @@
+"""
+El orden por relevancia indica cuándo quedaron coincidencias fuera de la ventana.
+"""
+from conftest import API_PREFIX, report_payload
+
+
+def _search(client, headers, **params):
+    response = client.get(f"{API_PREFIX}/search", params={"q": "balatas", **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_relevance_reports_truncated_window(client, admin_headers, inspector_headers, monkeypatch):
+    import search
+
+    for position in range(3):
+        payload = report_payload(f"T-SEARCH-{position}")
+        payload["remarks"] = "Balatas gastadas" + " balatas" * position
+        response = client.post(f"{API_PREFIX}/", json=payload, headers=inspector_headers)
+        assert response.status_code == 200, response.text
+
+    results = _search(client, admin_headers)
+    assert len(results["items"]) == 3 and not results["truncated"]
+
+    monkeypatch.setattr(search, "SEARCH_RANK_WINDOW", 2)
+    results = _search(client, admin_headers)
+    assert len(results["items"]) == 2 and results["truncated"]
+    assert _search(client, admin_headers, offset=10) == {"items": [], "truncated": True}
+
+    results = _search(client, admin_headers, sort="recent")
+    assert len(results["items"]) == 3 and not results["truncated"]
@@ -0,0 +1,53 @@
+"""
+"other" solo habilita la descripción libre: no cuenta como defecto en el
+estado de las unidades ni en los agregados.
+"""
+from sqlalchemy import select
+
+from conftest import API_PREFIX, report_payload
+
+
+def _defect_rollups(connection) -> set:
+    from models import DefectRollupDB
+
+    # Al eliminar reportes los contadores bajan a 0 sin borrar la fila; la reconstrucción no las crea
+    return set(connection.execute(select(
+        DefectRollupDB.granularity, DefectRollupDB.carrier, DefectRollupDB.truck_number,
+        DefectRollupDB.period_start, DefectRollupDB.unit, DefectRollupDB.item_key, DefectRollupDB.defects,
+    ).where(DefectRollupDB.defects != 0)).all())
+
+
+def test_other_is_not_a_defect(client, admin_headers, inspector_headers):
+    from database import engine
+    from models import DefectRollupDB
+    from rollups import rebuild_rollups
+
+    payload = report_payload("T-OTHER", trailers=1, defects=False)
+    payload["truck_inspection_items"]["other"] = False
+    payload["trailers"][0]["inspection_items"]["other"] = False
+    response = client.post(f"{API_PREFIX}/", json=payload, headers=inspector_headers)
+    assert response.status_code == 200, response.text
+
+    truck = client.get("/trucks/T-OTHER/status", headers=admin_headers).json()
+    assert truck["defects"] == [] and truck["cleared"]
+    trailer = client.get("/trailers/T-OTHER-TR-0/status", headers=admin_headers).json()
+    assert trailer["defects"] == [] and trailer["cleared"]
+
+    with engine.begin() as connection:
+        incremental = _defect_rollups(connection)
+        assert not connection.scalar(select(DefectRollupDB.item_key).where(DefectRollupDB.item_key == "other"))
+        rebuild_rollups(connection)
+        assert _defect_rollups(connection) == incremental
+
+
+def test_delete_falls_back_to_previous_inspection(client, admin_headers, create_report):
+    older = create_report(truck_number="T-REFRESH", trailers=2, defects=False)
+    newer = create_report(truck_number="T-REFRESH", trailers=2, defects=True)
+    assert client.get("/trucks/T-REFRESH/status", headers=admin_headers).json()["report_id"] == newer
+
+    assert client.delete(f"{API_PREFIX}/{newer}", headers=admin_headers).status_code == 204
+    truck = client.get("/trucks/T-REFRESH/status", headers=admin_headers).json()
+    assert truck["report_id"] == older and truck["cleared"]
+    for position in range(2):
+        trailer = client.get(f"/trailers/T-REFRESH-TR-{position}/status", headers=admin_headers).json()
+        assert trailer["report_id"] == older and trailer["cleared"]
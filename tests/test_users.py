@@ -0,0 +1,37 @@
+"""
+`GET /users/me` devuelve el usuario del token, y la caché de usuarios no guarda
+lecturas que una modificación concurrente dejó obsoletas.
+"""
+
+
+def test_me_returns_token_user(client, admin_headers):
+    response = client.get("/users/me", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["username"] == "admin"
+    assert response.json()["role"] == "admin"
+
+
+def test_me_requires_token(client):
+    assert client.get("/users/me").status_code == 401
+
+
+def test_update_during_lookup_is_not_cached():
+    import asyncio
+    from types import SimpleNamespace
+
+    from models import Role
+    from security import create_access_token, get_current_user, invalidate_principal, principal_cache
+
+    class RacingSession:
+        """
+        Devuelve el usuario como estaba antes de una modificación que se confirma durante la consulta.
+        """
+        async def scalar(self, statement):
+            invalidate_principal("racer")
+            return SimpleNamespace(id=99, username="racer", role=Role.ADMIN)
+
+    principal_cache.clear()
+    token = create_access_token({"sub": "racer"})
+    principal = asyncio.run(get_current_user(token, RacingSession()))
+    assert principal.role == Role.ADMIN
+    assert principal_cache.get("racer") is None
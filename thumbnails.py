@@ -0,0 +1,141 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from storage import derivative_path, photo_path
+
+logger = logging.getLogger(__name__)
+
+# Lado mayor, en pixeles, de cada versión reducida
+VARIANTS = {
+    "thumb": 320,
+    "medium": 1280,
+}
+WEBP_QUALITY = 80
+
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", str(os.cpu_count() or 1)))
+THUMBNAIL_QUEUE_SIZE = int(os.getenv("THUMBNAIL_QUEUE_SIZE", "256"))
+THUMBNAIL_MAX_ATTEMPTS = int(os.getenv("THUMBNAIL_MAX_ATTEMPTS", "3"))
+THUMBNAIL_RETRY_DELAY = float(os.getenv("THUMBNAIL_RETRY_DELAY", "2"))
+
+# Formatos que Pillow puede abrir sin plugins adicionales
+SUPPORTED_EXTENSIONS = {"jpg", "png", "webp"}
+
+
+def render_derivatives(photo_ref: str) -> str:
+    """
+    Genera las versiones reducidas de una foto en formato WebP.
+
+    Se aplica la orientación EXIF a los pixeles antes de re-codificar, y la
+    imagen se guarda sin metadatos (EXIF, GPS, etc.). Se ejecuta en un proceso
+    del pool, por lo que solo recibe y devuelve la referencia de la foto.
+    """
+    with Image.open(photo_path(photo_ref)) as original:
+        # En JPEG decodifica directamente a una escala reducida (nunca menor que la versión más grande)
+        largest = max(VARIANTS.values())
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+
+        for variant, size in VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+            path = derivative_path(photo_ref, variant)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            resized.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+            os.replace(tmp_path, path)
+
+    return photo_ref
+
+
+def has_derivatives(photo_ref: str) -> bool:
+    return all(os.path.exists(derivative_path(photo_ref, variant)) for variant in VARIANTS)
+
+
+class DerivativePipeline:
+    """
+    Pool de procesos que genera las versiones reducidas fuera del ciclo de la solicitud.
+
+    La cola está acotada a `max_pending` fotos entre pendientes y en proceso;
+    cuando está llena, `submit` devuelve False y la foto se sigue sirviendo en su
+    tamaño original. Los fallos se reintentan hasta `max_attempts` veces.
+    """
+
+    def __init__(self, workers: int, max_pending: int, max_attempts: int, retry_delay: float):
+        self._workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn evita heredar hilos y conexiones abiertas del proceso del servidor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def submit(self, photo_ref: str) -> bool:
+        """
+        Encola una foto; devuelve False si el formato no es soportado o la cola está llena.
+        """
+        if photo_ref.rsplit(".", 1)[-1] not in SUPPORTED_EXTENSIONS:
+            return False
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Cola de miniaturas llena, se omite %s", photo_ref)
+            return False
+        self._run(photo_ref, attempt=1)
+        return True
+
+    def _run(self, photo_ref: str, attempt: int):
+        try:
+            future = self._get_executor().submit(render_derivatives, photo_ref)
+        except RuntimeError:
+            # El pool ya se cerró
+            self._slots.release()
+            return
+        future.add_done_callback(lambda f: self._on_done(f, photo_ref, attempt))
+
+    def _on_done(self, future, photo_ref: str, attempt: int):
+        if future.cancelled():
+            self._slots.release()
+            return
+
+        error = future.exception()
+        if error is None:
+            self._slots.release()
+            return
+
+        # Un archivo que no es una imagen válida no se arregla reintentando
+        if attempt >= self._max_attempts or isinstance(error, UnidentifiedImageError):
+            logger.error("No se pudieron generar las miniaturas de %s: %s", photo_ref, error)
+            self._slots.release()
+            return
+
+        logger.warning("Reintentando miniaturas de %s (intento %d): %s", photo_ref, attempt, error)
+        timer = threading.Timer(self._retry_delay * attempt, self._run, args=(photo_ref, attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+pipeline = DerivativePipeline(
+    workers=THUMBNAIL_WORKERS,
+    max_pending=THUMBNAIL_QUEUE_SIZE,
+    max_attempts=THUMBNAIL_MAX_ATTEMPTS,
+    retry_delay=THUMBNAIL_RETRY_DELAY,
+)
@@ -0,0 +1,164 @@
+"""
+Estado actual de cada camión y trailer: la última inspección y sus defectos.
+
+Al crear un reporte basta un upsert condicionado a que el reporte sea más
+reciente que el guardado. Al modificar o eliminar uno, el reporte afectado
+puede haber sido el último de la unidad, así que el estado de las unidades
+involucradas se recalcula desde los reportes con el índice
+(truck_number, inspection_date, id).
+"""
+from typing import Iterable
+
+from sqlalchemy import delete, func, select, text, tuple_
+from sqlalchemy.dialects.sqlite import insert
+
+from models import (
+    InspectionReportDB,
+    TrailerDB,
+    TrailerInspectionItemsDB,
+    TrailerStatusDB,
+    TruckInspectionItemsDB,
+    TruckStatusDB,
+)
+
+
+def defect_bits(checks: int, model) -> int:
+    """
+    Bits de los items marcados con defecto (los que no están en `checks`), sin "other".
+    """
+    return model.DEFECT_MASK & ~(checks or 0)
+
+
+def defect_mask(items, model) -> int:
+    """
+    Igual que `defect_bits`, a partir de una lista de verificación (o una fila con `checks`).
+    """
+    return defect_bits(items.checks if items is not None else 0, model)
+
+
+def _upsert_if_newer(model, key: str):
+    stmt = insert(model)
+    columns = [column.name for column in model.__table__.columns if column.name != key]
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={name: getattr(stmt.excluded, name) for name in columns},
+        where=tuple_(model.inspection_date, model.report_id)
+        < tuple_(stmt.excluded.inspection_date, stmt.excluded.report_id),
+    )
+
+
+async def record_status_rows(db, truck_rows: list, trailer_rows: list):
+    """
+    Registra reportes recién creados como última inspección de sus unidades, si son más recientes.
+
+    Una fila por unidad, con el id del reporte ya asignado.
+    """
+    if truck_rows:
+        await db.execute(_upsert_if_newer(TruckStatusDB, "truck_number"), truck_rows)
+    if trailer_rows:
+        await db.execute(_upsert_if_newer(TrailerStatusDB, "trailer_number"), trailer_rows)
+
+
+def _position(unit_number):
+    return func.row_number().over(
+        partition_by=unit_number,
+        order_by=(InspectionReportDB.inspection_date.desc(), InspectionReportDB.id.desc()),
+    ).label("position")
+
+
+async def refresh_status(db, truck_numbers: Iterable[str], trailer_numbers: Iterable[str]):
+    """
+    Recalcula el estado de las unidades indicadas a partir de los reportes.
+
+    Se llama después de modificar o eliminar un reporte, con los números de
+    unidad de antes y después del cambio. Los cambios pendientes de la sesión
+    se envían primero para que la consulta los vea.
+    """
+    truck_numbers = set(truck_numbers)
+    trailer_numbers = set(trailer_numbers)
+    # Se eliminan antes del flush para que la llave foránea no impida borrar el reporte
+    if truck_numbers:
+        await db.execute(delete(TruckStatusDB).where(TruckStatusDB.truck_number.in_(truck_numbers)))
+    if trailer_numbers:
+        await db.execute(delete(TrailerStatusDB).where(TrailerStatusDB.trailer_number.in_(trailer_numbers)))
+    await db.flush()
+
+    # Una consulta por tipo de unidad, sin importar cuántas haya: ROW_NUMBER elige el reporte más reciente de cada una
+    truck_rows = []
+    if truck_numbers:
+        latest = select(
+            InspectionReportDB.truck_number,
+            InspectionReportDB.id.label("report_id"),
+            InspectionReportDB.inspection_date,
+            InspectionReportDB.odometer_reading,
+            TruckInspectionItemsDB.checks,
+            _position(InspectionReportDB.truck_number),
+        ).outerjoin(
+            TruckInspectionItemsDB, TruckInspectionItemsDB.report_id == InspectionReportDB.id
+        ).where(InspectionReportDB.truck_number.in_(truck_numbers)).subquery()
+        for row in await db.execute(select(latest).where(latest.c.position == 1)):
+            truck_rows.append(dict(
+                truck_number=row.truck_number,
+                report_id=row.report_id,
+                inspection_date=row.inspection_date,
+                odometer_reading=row.odometer_reading,
+                defects=defect_mask(row, TruckInspectionItemsDB),
+            ))
+
+    trailer_rows = []
+    if trailer_numbers:
+        latest = select(
+            TrailerDB.trailer_number,
+            InspectionReportDB.id.label("report_id"),
+            InspectionReportDB.truck_number,
+            InspectionReportDB.inspection_date,
+            TrailerInspectionItemsDB.checks,
+            _position(TrailerDB.trailer_number),
+        ).join(
+            InspectionReportDB, TrailerDB.report_id == InspectionReportDB.id
+        ).outerjoin(
+            TrailerInspectionItemsDB, TrailerInspectionItemsDB.trailer_id == TrailerDB.id
+        ).where(TrailerDB.trailer_number.in_(trailer_numbers)).subquery()
+        for row in await db.execute(select(latest).where(latest.c.position == 1)):
+            trailer_rows.append(dict(
+                trailer_number=row.trailer_number,
+                report_id=row.report_id,
+                truck_number=row.truck_number,
+                inspection_date=row.inspection_date,
+                defects=defect_mask(row, TrailerInspectionItemsDB),
+            ))
+
+    if truck_rows:
+        await db.execute(insert(TruckStatusDB), truck_rows)
+    if trailer_rows:
+        await db.execute(insert(TrailerStatusDB), trailer_rows)
+
+
+def rebuild_status(connection):
+    """
+    Vacía y recalcula el estado de todas las unidades, dentro de la transacción de `connection`.
+    """
+    connection.execute(delete(TrailerStatusDB))
+    connection.execute(delete(TruckStatusDB))
+    truck_items = TruckInspectionItemsDB.DEFECT_MASK
+    trailer_items = TrailerInspectionItemsDB.DEFECT_MASK
+    # ROW_NUMBER elige el reporte más reciente de cada unidad en un solo recorrido
+    connection.execute(text(
+        "INSERT INTO truck_status (truck_number, report_id, inspection_date, odometer_reading, defects) "
+        "SELECT truck_number, id, inspection_date, odometer_reading, defects FROM ("
+        "  SELECT r.truck_number, r.id, r.inspection_date, r.odometer_reading, "
+        f"  {truck_items} & ~COALESCE(ci.checks, 0) AS defects, "
+        "  ROW_NUMBER() OVER (PARTITION BY r.truck_number ORDER BY r.inspection_date DESC, r.id DESC) AS position "
+        "  FROM inspection_reports r LEFT JOIN truck_inspection_items ci ON ci.report_id = r.id"
+        ") WHERE position = 1"
+    ))
+    connection.execute(text(
+        "INSERT INTO trailer_status (trailer_number, report_id, truck_number, inspection_date, defects) "
+        "SELECT trailer_number, id, truck_number, inspection_date, defects FROM ("
+        "  SELECT t.trailer_number, r.id, r.truck_number, r.inspection_date, "
+        f"  {trailer_items} & ~COALESCE(ci.checks, 0) AS defects, "
+        "  ROW_NUMBER() OVER (PARTITION BY t.trailer_number ORDER BY r.inspection_date DESC, r.id DESC) AS position "
+        "  FROM trailers t JOIN inspection_reports r ON r.id = t.report_id "
+        "  LEFT JOIN trailer_inspection_items ci ON ci.trailer_id = t.id"
+        ") WHERE position = 1"
+    ))